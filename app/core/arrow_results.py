@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import os
+import json
+import pandas as pd
+from utils.arrow_files import write_frame, read_frame, ARROW_FILE_EXTENSION
+from core.data_processor import ProcessingResult
+from core.stats_cube import StatsCube
+
+
+def write_result(result: ProcessingResult, directory: str, prefix: str) -> dict:
+    """Écrit le résultat d'un traitement en fichiers Arrow IPC (un par tableau).
+
+    Args:
+        result (ProcessingResult): Résultat à écrire
+        directory (str): Dossier des fichiers
+        prefix (str): Préfixe des noms de fichiers
+
+    Returns:
+        dict: Description sérialisable en JSON du résultat (voir `read_result`)
+    """
+    entry = {
+        'params': result.params,
+        'timings': result.timings,
+        'directory_version': result.directory_version,
+        'from_cache': result.from_cache,
+        'processed_data': None,
+        'stats': {}
+    }
+    if result.processed_data is not None:
+        entry['processed_data'] = f"{prefix}_processed{ARROW_FILE_EXTENSION}"
+        write_frame(result.processed_data, os.path.join(directory, entry['processed_data']))
+    for position, (key, value) in enumerate(result.stats.items()):
+        file_name = f"{prefix}_stats{position}{ARROW_FILE_EXTENSION}"
+        if isinstance(value, pd.DataFrame):
+            write_frame(value, os.path.join(directory, file_name))
+            entry['stats'][key] = {'kind': 'table', 'file': file_name}
+        elif isinstance(value, StatsCube):
+            write_frame(value.cells, os.path.join(directory, file_name))
+            entry['stats'][key] = {'kind': 'cube', 'file': file_name, 'dimensions': value.dimensions}
+        else:
+            try:
+                entry['stats'][key] = {'kind': 'value', 'value': json.loads(json.dumps(value))}
+            except TypeError:
+                print(f"Statistique '{key}' non écrite (type non pris en charge).")
+    return entry
+
+
+def read_result(entry: dict, directory: str) -> ProcessingResult:
+    """Relit un résultat écrit par `write_result` (tableaux projetés en mémoire).
+
+    Args:
+        entry (dict): Description du résultat
+        directory (str): Dossier des fichiers
+
+    Returns:
+        ProcessingResult: Le résultat du traitement
+    """
+    processed_data = None
+    if entry['processed_data']:
+        processed_data = read_frame(os.path.join(directory, entry['processed_data']))
+    stats = {}
+    for key, item in entry['stats'].items():
+        if item['kind'] == 'table':
+            stats[key] = read_frame(os.path.join(directory, item['file']))
+        elif item['kind'] == 'cube':
+            stats[key] = StatsCube(read_frame(os.path.join(directory, item['file'])), list(item['dimensions']))
+        else:
+            stats[key] = item['value']
+    return ProcessingResult(
+        processed_data=processed_data,
+        stats=stats,
+        params=dict(entry['params']),
+        timings=dict(entry.get('timings') or {}),
+        directory_version=entry['directory_version'],
+        from_cache=entry.get('from_cache', False)
+    )
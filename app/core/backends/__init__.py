@@ -0,0 +1,36 @@
+"""
+Module Backends - Moteurs d'exécution alternatifs du traitement des données.
+"""
+
+# Moteurs disponibles : 'pandas' correspond au traitement en mémoire intégré à DataProcessor
+AVAILABLE_BACKENDS = ['pandas', 'duckdb', 'polars', 'partitioned']
+
+
+def get_backend(name='pandas', **options):
+    """Instancie un moteur d'exécution à partir de son nom.
+
+    Les dépendances optionnelles ne sont importées qu'à la demande.
+
+    Args:
+        name (str, optional): Nom du moteur ('pandas', 'duckdb', 'polars' ou 'partitioned')
+        **options: Options transmises au constructeur du moteur
+
+    Returns:
+        ProcessingBackend: Le moteur, ou None pour le traitement pandas intégré
+
+    Raises:
+        ValueError: Si le nom de moteur est inconnu
+    """
+    name = (name or 'pandas').lower()
+    if name == 'pandas':
+        return None
+    if name == 'duckdb':
+        from core.backends.duckdb_backend import DuckDBBackend
+        return DuckDBBackend(**options)
+    if name == 'polars':
+        from core.backends.polars_backend import PolarsBackend
+        return PolarsBackend(**options)
+    if name == 'partitioned':
+        from core.backends.partitioned_backend import PartitionedBackend
+        return PartitionedBackend(**options)
+    raise ValueError(f"Moteur d'exécution inconnu: {name} (disponibles: {', '.join(AVAILABLE_BACKENDS)})")
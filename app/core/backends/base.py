@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import pandas as pd
+from typing import NamedTuple, Optional, List, Dict
+
+# --- Colonnes utilisées par les statistiques ---
+DEPT_COLUMN = 'departement'
+UNIT_COLUMN = 'abrege_unite'
+MATERIAL_COLUMN = 'type_materiel'
+TERMINAL_COLUMN = 'code_unite_terminal_de_saisie'
+IDPP_COLUMN = 'idpp'
+GROUPING_COLUMNS = [DEPT_COLUMN, UNIT_COLUMN, MATERIAL_COLUMN, TERMINAL_COLUMN]
+
+# Colonnes de l'annuaire conservées pour les lignes de type 'SM'
+DIRECTORY_COLUMNS_FOR_SM = ['key', 'abrege_unite', 'departement']
+
+
+class BackendResult(NamedTuple):
+    """Résultat d'un traitement exécuté par un moteur.
+
+    Attributes:
+        processed_data: Données fusionnées (None si elles ont été écrites directement sur disque)
+        columns: Colonnes des données fusionnées
+        aggregates: Agrégats bruts ('global', 'sm', 'sm_dept'), None si non calculables
+    """
+    processed_data: Optional[pd.DataFrame]
+    columns: List[str]
+    aggregates: Dict[str, Optional[pd.DataFrame]]
+
+
+class ProcessingBackend:
+    """Interface commune des moteurs d'exécution du traitement.
+
+    Un moteur réalise le formatage de la clé, la fusion (conditionnelle) avec l'annuaire
+    et les agrégats GASPARD. La mise en forme des tables de statistiques reste assurée
+    par `DataProcessor`, ce qui garantit des tables identiques quel que soit le moteur.
+    """
+
+    name = None
+
+    def reads_source(self, source_path) -> bool:
+        """Indique si le moteur lit lui-même le fichier d'origine (données non importées).
+
+        Args:
+            source_path (str): Fichier d'origine des données
+
+        Returns:
+            bool: True si `process` peut être appelé sans données en mémoire
+        """
+        return False
+
+    def process(self, data, directory_data, directory_column, type_column=None,
+                columns_to_delete=None, source_path=None) -> BackendResult:
+        """Exécute le traitement.
+
+        Args:
+            data (pandas.DataFrame): Données importées (None si le moteur lit le fichier
+                d'origine, voir `reads_source`)
+            directory_data (pandas.DataFrame): Annuaire (colonne 'key' formatée)
+            directory_column (str): Colonne clé des données
+            type_column (str, optional): Colonne du type de signalisation
+            columns_to_delete (list[str], optional): Colonnes à supprimer avant fusion
+            source_path (str, optional): Fichier d'origine des données
+
+        Returns:
+            BackendResult: Données fusionnées et agrégats
+        """
+        raise NotImplementedError
+
+
+def output_columns(data_columns, directory_columns, directory_column, sm_first=False):
+    """Calcule les colonnes des données fusionnées, comme le chemin pandas.
+
+    Les colonnes de l'annuaire déjà présentes dans les données sont ignorées, la colonne
+    'key' de l'annuaire n'est pas conservée et les colonnes suffixées '_annuaire' sont retirées.
+
+    Args:
+        data_columns (list[str]): Colonnes des données après suppression
+        directory_columns (list[str]): Colonnes de l'annuaire
+        directory_column (str): Colonne clé des données
+        sm_first (bool, optional): True si des lignes 'SM' précèdent les autres
+            (leurs colonnes d'annuaire apparaissent alors en premier)
+
+    Returns:
+        tuple: (colonnes issues des données, colonnes issues de l'annuaire)
+    """
+    kept_data = [
+        col for col in data_columns
+        if not (col == 'key' and directory_column != 'key') and not col.endswith('_annuaire')
+    ]
+    added = [
+        col for col in directory_columns
+        if col != 'key' and col not in data_columns and not col.endswith('_annuaire')
+    ]
+    if sm_first:
+        sm_cols = [col for col in DIRECTORY_COLUMNS_FOR_SM if col in added]
+        added = sm_cols + [col for col in added if col not in sm_cols]
+    return kept_data, added
+
+
+def safe_columns_to_delete(data_columns, columns_to_delete, directory_column, type_column):
+    """Retourne les colonnes pouvant être supprimées (jamais la clé ni le type).
+
+    Args:
+        data_columns (list[str]): Colonnes des données importées
+        columns_to_delete (list[str]): Colonnes demandées
+        directory_column (str): Colonne clé
+        type_column (str): Colonne type
+
+    Returns:
+        list[str]: Colonnes effectivement supprimables
+    """
+    return [
+        col for col in (columns_to_delete or [])
+        if col in data_columns and col != directory_column and col != type_column
+    ]
+
+
+def aggregate_gaspard(df, grouping_cols):
+    """Compte les signalisations et les signalisations GASPARD par groupe.
+    
+    Une signalisation est GASPARD si la colonne idpp contient une valeur non vide.
+    Les lignes dont une colonne de groupement est vide sont ignorées.
+    
+    Args:
+        df (pandas.DataFrame): Données à agréger
+        grouping_cols (list[str]): Colonnes de groupement
+        
+    Returns:
+        pandas.DataFrame: Colonnes de groupement, 'nombre_signalisation'
+                          et 'nombre_signalisation_gaspard'
+    """
+    idpp = df[IDPP_COLUMN]
+    is_gaspard = (idpp.notna() & (idpp.astype(str).str.strip() != '')).astype(int)
+    return pd.DataFrame({col: df[col] for col in grouping_cols}).assign(
+        is_gaspard=is_gaspard.to_numpy()
+    ).groupby(grouping_cols).agg(
+        nombre_signalisation=(grouping_cols[0], 'size'),
+        nombre_signalisation_gaspard=('is_gaspard', 'sum')
+    ).reset_index()
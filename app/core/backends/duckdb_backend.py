@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import os
+import shutil
+import tempfile
+from core.backends.base import (ProcessingBackend, BackendResult, DIRECTORY_COLUMNS_FOR_SM,
+                                GROUPING_COLUMNS, IDPP_COLUMN, DEPT_COLUMN,
+                                output_columns, safe_columns_to_delete)
+from utils.file_handlers import detect_csv_delimiter
+
+try:
+    import duckdb
+except ImportError:  # Dépendance optionnelle
+    duckdb = None
+
+# Formatage GN + 8 chiffres, équivalent SQL de DirectoryManager._format_gn_value
+FORMAT_GN_MACRO = r"""
+CREATE OR REPLACE TEMP MACRO format_gn(v) AS (
+    CASE
+        WHEN v IS NULL OR regexp_full_match(v, '\s*') THEN 'GN00000000'
+        WHEN regexp_full_match(v, 'GN[0-9]{8}') THEN v
+        ELSE CASE
+            WHEN regexp_replace(
+                CASE
+                    WHEN strpos(v, '.') > 0
+                         AND TRY_CAST(v AS DOUBLE) = floor(TRY_CAST(v AS DOUBLE))
+                    THEN CAST(CAST(TRY_CAST(v AS DOUBLE) AS HUGEINT) AS VARCHAR)
+                    ELSE v
+                END, '[^0-9]', '', 'g') = ''
+            THEN 'GN00000000'
+            ELSE 'GN' || lpad(right(regexp_replace(
+                CASE
+                    WHEN strpos(v, '.') > 0
+                         AND TRY_CAST(v AS DOUBLE) = floor(TRY_CAST(v AS DOUBLE))
+                    THEN CAST(CAST(TRY_CAST(v AS DOUBLE) AS HUGEINT) AS VARCHAR)
+                    ELSE v
+                END, '[^0-9]', '', 'g'), 8), 8, '0')
+        END
+    END
+)
+"""
+
+
+# Marque d'ordre des octets écrite en tête des exports CSV (comme `export_data`, encodage utf-8-sig)
+UTF8_BOM = '\ufeff'
+# Caractères qui font entourer un nom de colonne de guillemets dans l'en-tête CSV
+_CSV_QUOTED_CHARS = (';', '"', '\n', '\r')
+
+
+def _prepend_bom(path):
+    """Ajoute la marque d'ordre des octets en tête d'un fichier (copie par blocs)."""
+    tmp_path = path + '.bom'
+    with open(path, 'rb') as source, open(tmp_path, 'wb') as target:
+        target.write(UTF8_BOM.encode('utf-8'))
+        shutil.copyfileobj(source, target, 16 * 1024 * 1024)
+    os.replace(tmp_path, path)
+
+
+def _quote(identifier):
+    """Protège un nom de colonne pour l'insérer dans une requête SQL."""
+    return '"' + str(identifier).replace('"', '""') + '"'
+
+
+def _literal(value):
+    """Protège une chaîne pour l'insérer comme littéral dans une requête SQL."""
+    return "'" + str(value).replace("'", "''") + "'"
+
+
+class DuckDBBackend(ProcessingBackend):
+    """Moteur hors mémoire basé sur DuckDB (moteur SQL colonnaire embarqué).
+
+    Le fichier CSV source est lu directement par DuckDB, la clé est formatée en SQL, la
+    jointure avec l'annuaire et les agrégats GASPARD sont exécutés par le moteur, qui
+    déborde sur disque lorsque la limite mémoire est atteinte.
+    """
+
+    name = 'duckdb'
+
+    def __init__(self, memory_limit: str = None, temp_directory: str = None,
+                 threads: int = None, output_path: str = None):
+        """Initialise le moteur.
+
+        Args:
+            memory_limit (str, optional): Limite mémoire DuckDB (ex: '4GB')
+            temp_directory (str, optional): Répertoire de débordement sur disque
+            threads (int, optional): Nombre de threads utilisés par DuckDB
+            output_path (str, optional): Si renseigné, les données fusionnées sont écrites
+                dans ce fichier CSV par DuckDB au lieu d'être chargées en mémoire
+        """
+        if duckdb is None:
+            raise ImportError("Le moteur DuckDB n'est pas installé (pip install duckdb).")
+        self.memory_limit = memory_limit
+        self.temp_directory = temp_directory or os.path.join(tempfile.gettempdir(), 'csf_gaspard_duckdb')
+        self.threads = threads
+        self.output_path = output_path
+
+    def reads_source(self, source_path) -> bool:
+        return bool(source_path) and source_path.lower().endswith('.csv') and os.path.isfile(source_path)
+
+    def _connect(self):
+        """Ouvre une connexion en mémoire configurée pour le débordement sur disque."""
+        os.makedirs(self.temp_directory, exist_ok=True)
+        con = duckdb.connect(database=':memory:')
+        con.execute(f"SET temp_directory = {_literal(self.temp_directory)}")
+        if self.memory_limit:
+            con.execute(f"SET memory_limit = {_literal(self.memory_limit)}")
+        if self.threads:
+            con.execute(f"SET threads = {int(self.threads)}")
+        con.execute(FORMAT_GN_MACRO)
+        return con
+
+    def _register_source(self, con, data, source_path):
+        """Expose les données sources sous le nom `source_data`.
+
+        Le fichier CSV est lu directement lorsqu'il est disponible, sinon les données
+        déjà en mémoire sont exposées sans copie.
+        """
+        if self.reads_source(source_path):
+            delimiter = detect_csv_delimiter(source_path)
+            con.execute(
+                f"CREATE TEMP VIEW source_data AS SELECT * FROM read_csv("
+                f"{_literal(source_path)}, delim = {_literal(delimiter)}, header = true)"
+            )
+            print(f"DuckDB: lecture directe du fichier {source_path}")
+        else:
+            con.register('source_data', data)
+        return [row[0] for row in con.execute("DESCRIBE source_data").fetchall()]
+
+    def process(self, data, directory_data, directory_column, type_column=None,
+                columns_to_delete=None, source_path=None) -> BackendResult:
+        con = self._connect()
+        try:
+            source_columns = self._register_source(con, data, source_path)
+            con.register('directory_data', directory_data)
+            directory_columns = list(directory_data.columns)
+
+            deleted = safe_columns_to_delete(source_columns, columns_to_delete, directory_column, type_column)
+            data_columns = [col for col in source_columns if col not in deleted]
+            use_type_split = bool(type_column) and type_column in data_columns
+
+            # --- Normalisation de la clé et du type ---
+            select_data = []
+            for col in data_columns:
+                if col == directory_column:
+                    select_data.append(f"format_gn(CAST({_quote(col)} AS VARCHAR)) AS {_quote(col)}")
+                elif use_type_split and col == type_column:
+                    select_data.append(f"CAST({_quote(col)} AS VARCHAR) AS {_quote(col)}")
+                else:
+                    select_data.append(_quote(col))
+            is_sm_expr = (f"coalesce(upper(CAST({_quote(type_column)} AS VARCHAR)) = 'SM', false)"
+                          if use_type_split else "false")
+            con.execute(f"""
+                CREATE TEMP VIEW normalized AS
+                SELECT {', '.join(select_data)}, {is_sm_expr} AS __is_sm,
+                       row_number() OVER () AS __row_id
+                FROM source_data
+            """)
+
+            has_sm = False
+            if use_type_split:
+                sm_rows, other_rows = con.execute(
+                    "SELECT count(*) FILTER (WHERE __is_sm), count(*) FILTER (WHERE NOT __is_sm) FROM normalized"
+                ).fetchone()
+                has_sm = sm_rows > 0
+                print(f"Lignes type SM: {sm_rows}, Lignes autres types: {other_rows}")
+
+            # --- Jointure (conditionnelle) avec l'annuaire ---
+            kept_data, added = output_columns(data_columns, directory_columns, directory_column, sm_first=has_sm)
+            select_joined = [f"n.{_quote(col)}" for col in kept_data]
+            for col in added:
+                if use_type_split and col not in DIRECTORY_COLUMNS_FOR_SM:
+                    # Les lignes SM ne reçoivent que la partie réduite de l'annuaire
+                    select_joined.append(f"CASE WHEN n.__is_sm THEN NULL ELSE d.{_quote(col)} END AS {_quote(col)}")
+                else:
+                    select_joined.append(f"d.{_quote(col)}")
+            # Lignes SM d'abord (ordre d'origine), puis les autres types
+            order_by = "__is_sm DESC, __row_id" if use_type_split else "__row_id"
+            con.execute(f"""
+                CREATE TEMP VIEW processed AS
+                SELECT {', '.join(select_joined)}, n.__is_sm, n.__row_id
+                FROM normalized n
+                LEFT JOIN directory_data d ON n.{_quote(directory_column)} = d."key"
+            """)
+            columns = kept_data + added
+            print("DuckDB: jointure avec l'annuaire préparée.")
+
+            processed_data = None
+            projection = ', '.join(_quote(col) for col in columns)
+            if self.output_path:
+                # Fichier identique à `export_data` (utf-8-sig) : la marque d'ordre des octets
+                # est portée par le nom de la première colonne de l'en-tête, sans recopie
+                header_bom = not any(char in str(columns[0]) for char in _CSV_QUOTED_CHARS)
+                copy_projection = projection
+                if header_bom:
+                    copy_projection = ', '.join([f"{_quote(columns[0])} AS {_quote(UTF8_BOM + str(columns[0]))}"] +
+                                                [_quote(col) for col in columns[1:]])
+                con.execute(
+                    f"COPY (SELECT {copy_projection} FROM processed ORDER BY {order_by}) "
+                    f"TO {_literal(self.output_path)} (HEADER, DELIMITER ';')"
+                )
+                if not header_bom:
+                    _prepend_bom(self.output_path)
+                print(f"DuckDB: données fusionnées écrites dans {self.output_path}")
+            else:
+                processed_data = con.execute(
+                    f"SELECT {projection} FROM processed ORDER BY {order_by}"
+                ).df()
+
+            aggregates = self._aggregate(con, columns, type_column)
+            return BackendResult(processed_data, columns, aggregates)
+        finally:
+            con.close()
+
+    def _aggregate(self, con, columns, type_column):
+        """Calcule les agrégats GASPARD globaux, SM et par département (SM)."""
+        aggregates = {'global': None, 'sm': None, 'sm_dept': None}
+        if any(col not in columns for col in GROUPING_COLUMNS + [IDPP_COLUMN]):
+            return aggregates
+
+        is_gaspard = (f"CASE WHEN {_quote(IDPP_COLUMN)} IS NOT NULL "
+                      f"AND NOT regexp_full_match(CAST({_quote(IDPP_COLUMN)} AS VARCHAR), '\\s*') "
+                      f"THEN 1 ELSE 0 END")
+
+        def grouped(group_cols, where):
+            keys = ', '.join(_quote(col) for col in group_cols)
+            not_null = ' AND '.join(f"{_quote(col)} IS NOT NULL" for col in group_cols)
+            result = con.execute(f"""
+                SELECT {keys}, count(*) AS nombre_signalisation,
+                       CAST(sum({is_gaspard}) AS BIGINT) AS nombre_signalisation_gaspard
+                FROM processed
+                WHERE {not_null} AND {where}
+                GROUP BY {keys}
+            """).df()
+            # Même ordre que pandas.groupby (clés triées)
+            return result.sort_values(group_cols, kind='mergesort').reset_index(drop=True)
+
+        aggregates['global'] = grouped(GROUPING_COLUMNS, 'true')
+        if type_column and type_column in columns:
+            sm_filter = f"upper(CAST({_quote(type_column)} AS VARCHAR)) = 'SM'"
+            aggregates['sm'] = grouped(GROUPING_COLUMNS, sm_filter)
+            aggregates['sm_dept'] = grouped([DEPT_COLUMN], sm_filter)
+        return aggregates
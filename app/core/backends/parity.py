@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Contrôle de parité des moteurs d'exécution.
+
+Compare les statistiques produites par un moteur alternatif à celles du traitement
+pandas de référence. Utilisable en ligne de commande depuis la racine du projet :
+
+    PYTHONPATH=app python3 -m core.backends.parity extraction.csv --key code_service --type type_signalisation
+"""
+
+import io
+import sys
+import argparse
+import contextlib
+import pandas as pd
+from core.backends import get_backend, AVAILABLE_BACKENDS
+
+def compare_stats(reference, candidate):
+    """Compare deux dictionnaires de statistiques.
+
+    Les valeurs, l'ordre des lignes et des colonnes doivent être identiques ; seule la
+    représentation des chaînes (object ou string) peut différer d'un moteur à l'autre.
+
+    Args:
+        reference (dict): Statistiques du moteur de référence
+        candidate (dict): Statistiques du moteur comparé
+
+    Returns:
+        list[str]: Différences constatées (vide si les statistiques sont identiques)
+    """
+    differences = []
+    keys = sorted(set(reference) | set(candidate))
+    # Tables de statistiques (DataFrame) et messages d'erreur (chaînes) de la spécification
+    table_keys = [key for key in keys if isinstance(reference.get(key, candidate.get(key)), pd.DataFrame)]
+    error_keys = [key for key in keys if isinstance(reference.get(key, candidate.get(key)), str)]
+    for key in error_keys:
+        if reference.get(key) != candidate.get(key):
+            differences.append(f"{key}: {reference.get(key)!r} != {candidate.get(key)!r}")
+    for key in table_keys:
+        expected = reference.get(key, pd.DataFrame())
+        actual = candidate.get(key, pd.DataFrame())
+        try:
+            pd.testing.assert_frame_equal(
+                expected.reset_index(drop=True), actual.reset_index(drop=True),
+                check_dtype=False
+            )
+        except AssertionError as e:
+            differences.append(f"{key}: {e}")
+    return differences
+
+
+def check_backend_parity(directory_manager, data, backend_name, directory_column,
+                         type_column=None, columns_to_delete=None, source_path=None):
+    """Exécute le traitement avec pandas et avec un autre moteur puis compare les statistiques.
+
+    Args:
+        directory_manager (DirectoryManager): Gestionnaire d'annuaire
+        data (pandas.DataFrame): Données importées
+        backend_name (str): Nom du moteur à comparer
+        directory_column (str): Colonne clé
+        type_column (str, optional): Colonne type
+        columns_to_delete (list[str], optional): Colonnes à supprimer
+        source_path (str, optional): Fichier d'origine des données
+
+    Returns:
+        list[str]: Différences constatées (vide si parité)
+    """
+    from core.data_processor import DataProcessor
+
+    results = []
+    for backend in (None, get_backend(backend_name)):
+        processor = DataProcessor(directory_manager, backend=backend)
+        processor.set_data(data, source_path=source_path)
+        with contextlib.redirect_stdout(io.StringIO()):
+            success = processor.process_with_directory(
+                directory_column, type_column=type_column, columns_to_delete=columns_to_delete
+            )
+        if not success:
+            return [f"Échec du traitement avec le moteur '{backend.name if backend else 'pandas'}'"]
+        results.append(processor.get_stats())
+    return compare_stats(*results)
+
+
+def main(argv=None):
+    """Point d'entrée en ligne de commande du contrôle de parité."""
+    from utils.directory_manager import DirectoryManager
+    from utils.file_handlers import import_data
+
+    parser = argparse.ArgumentParser(description="Contrôle de parité des moteurs d'exécution")
+    parser.add_argument('file', help="Fichier de données à traiter")
+    parser.add_argument('--key', required=True, help="Colonne clé")
+    parser.add_argument('--type', dest='type_column', help="Colonne type")
+    parser.add_argument('--delete', nargs='*', default=[], help="Colonnes à supprimer")
+    parser.add_argument('--backends', nargs='*', default=[b for b in AVAILABLE_BACKENDS if b != 'pandas'],
+                        help="Moteurs à comparer au traitement pandas")
+    args = parser.parse_args(argv)
+
+    directory_manager = DirectoryManager()
+    data = import_data(args.file)
+    failed = False
+    for backend_name in args.backends:
+        differences = check_backend_parity(directory_manager, data, backend_name, args.key,
+                                           args.type_column, args.delete, source_path=args.file)
+        if differences:
+            failed = True
+            print(f"[{backend_name}] ÉCART avec pandas :")
+            for difference in differences:
+                print(f"  - {difference}")
+        else:
+            print(f"[{backend_name}] Statistiques identiques à pandas.")
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import os
+import multiprocessing
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+from core.backends.base import (ProcessingBackend, BackendResult, DIRECTORY_COLUMNS_FOR_SM,
+                                GROUPING_COLUMNS, IDPP_COLUMN, DEPT_COLUMN,
+                                output_columns, safe_columns_to_delete, aggregate_gaspard)
+from utils.directory_manager import format_gn_value
+
+# Colonnes techniques ajoutées pendant le traitement partitionné
+ROW_ID_COLUMN = '__row_id'
+IS_SM_COLUMN = '__is_sm'
+
+
+def normalize_keys(values):
+    """Formate une série de clés au format GN + 8 chiffres.
+
+    Chaque valeur distincte n'est formatée qu'une seule fois.
+
+    Args:
+        values (pandas.Series): Clés brutes
+
+    Returns:
+        pandas.Series: Clés formatées
+    """
+    as_str = values.astype(str)
+    uniques = pd.unique(as_str)
+    mapping = dict(zip(uniques, (format_gn_value(value) for value in uniques)))
+    return as_str.map(mapping)
+
+
+def _process_partition(partition, directory_subset, directory_column, use_type_split):
+    """Fusionne et agrège une partition (exécuté dans un processus de travail).
+
+    Args:
+        partition (pandas.DataFrame): Lignes de la partition (clé déjà formatée)
+        directory_subset (pandas.DataFrame): Lignes de l'annuaire concernées par la partition
+        directory_column (str): Colonne clé des données
+        use_type_split (bool): True si la fusion est conditionnelle au type 'SM'
+
+    Returns:
+        tuple: (données fusionnées de la partition, agrégats partiels)
+    """
+    merge_options = dict(left_on=directory_column, right_on='key', how='left', suffixes=('', '_annuaire'))
+    if use_type_split:
+        is_sm = partition[IS_SM_COLUMN].to_numpy()
+        sm_cols = [col for col in DIRECTORY_COLUMNS_FOR_SM if col in directory_subset.columns]
+        parts = []
+        if is_sm.any():
+            parts.append(pd.merge(partition[is_sm], directory_subset[sm_cols], **merge_options))
+        if not is_sm.all():
+            parts.append(pd.merge(partition[~is_sm], directory_subset, **merge_options))
+        merged = pd.concat(parts, ignore_index=True)
+    else:
+        merged = pd.merge(partition, directory_subset, **merge_options)
+
+    aggregates = {'global': None, 'sm': None, 'sm_dept': None}
+    if all(col in merged.columns for col in GROUPING_COLUMNS + [IDPP_COLUMN]):
+        aggregates['global'] = aggregate_gaspard(merged, GROUPING_COLUMNS)
+        if use_type_split:
+            sm_rows = merged[merged[IS_SM_COLUMN]]
+            aggregates['sm'] = aggregate_gaspard(sm_rows, GROUPING_COLUMNS)
+            aggregates['sm_dept'] = aggregate_gaspard(sm_rows, [DEPT_COLUMN])
+    return merged, aggregates
+
+
+def _combine_partial_aggregates(partials, group_cols):
+    """Concatène les agrégats partiels des partitions.
+
+    Les partitions étant disjointes par département, la ré-agrégation ne fusionne des
+    groupes que si un même groupe apparaît dans plusieurs partitions (département
+    provenant des données plutôt que de l'annuaire).
+    """
+    partials = [partial for partial in partials if partial is not None]
+    if not partials:
+        return None
+    combined = pd.concat(partials, ignore_index=True)
+    return combined.groupby(group_cols).agg(
+        nombre_signalisation=('nombre_signalisation', 'sum'),
+        nombre_signalisation_gaspard=('nombre_signalisation_gaspard', 'sum')
+    ).reset_index()
+
+
+class PartitionedBackend(ProcessingBackend):
+    """Moteur parallèle partitionné par département.
+
+    L'annuaire associe chaque clé GN à un seul département : les lignes sont réparties
+    par hachage du département de leur clé, chaque partition est fusionnée et agrégée
+    dans son propre processus, puis les résultats partiels sont concaténés.
+    """
+
+    name = 'partitioned'
+
+    def __init__(self, workers: int = None, min_rows_per_worker: int = 50000):
+        """Initialise le moteur.
+
+        Args:
+            workers (int, optional): Nombre de processus (par défaut, nombre de cœurs)
+            min_rows_per_worker (int, optional): En dessous de ce volume par processus,
+                le traitement reste dans le processus courant
+        """
+        self.workers = workers or os.cpu_count() or 1
+        self.min_rows_per_worker = min_rows_per_worker
+
+    def process(self, data, directory_data, directory_column, type_column=None,
+                columns_to_delete=None, source_path=None) -> BackendResult:
+        deleted = safe_columns_to_delete(list(data.columns), columns_to_delete, directory_column, type_column)
+        prepared = data.drop(columns=deleted, errors='ignore')
+        data_columns = list(prepared.columns)
+        use_type_split = bool(type_column) and type_column in data_columns
+
+        # --- Normalisation de la clé et du type ---
+        prepared[directory_column] = normalize_keys(prepared[directory_column])
+        prepared[ROW_ID_COLUMN] = np.arange(len(prepared))
+        if use_type_split:
+            prepared[type_column] = prepared[type_column].astype(str)
+            prepared[IS_SM_COLUMN] = (prepared[type_column].str.upper() == 'SM').to_numpy()
+            sm_rows = int(prepared[IS_SM_COLUMN].sum())
+            print(f"Lignes type SM: {sm_rows}, Lignes autres types: {len(prepared) - sm_rows}")
+        else:
+            prepared[IS_SM_COLUMN] = False
+        has_sm = bool(prepared[IS_SM_COLUMN].any())
+
+        # --- Partitionnement par département de l'annuaire ---
+        directory = directory_data.reset_index(drop=True)
+        key_to_dept = directory.dropna(subset=['key']).drop_duplicates('key').set_index('key')
+        key_to_dept = key_to_dept[DEPT_COLUMN] if DEPT_COLUMN in key_to_dept.columns else pd.Series(dtype=object)
+        row_dept = prepared[directory_column].map(key_to_dept).astype(str)
+        n_partitions = max(1, min(self.workers, len(prepared) // max(1, self.min_rows_per_worker)))
+        partition_ids = pd.util.hash_array(row_dept.to_numpy(dtype=object)) % n_partitions
+        directory_dept = pd.util.hash_array(directory['key'].map(key_to_dept).astype(str).to_numpy(dtype=object)) % n_partitions
+
+        tasks = []
+        for partition_id in range(n_partitions):
+            partition = prepared[partition_ids == partition_id]
+            if partition.empty:
+                continue
+            # Seules les lignes de l'annuaire dont les clés sont présentes dans la partition
+            subset = directory[(directory_dept == partition_id) & directory['key'].isin(partition[directory_column])]
+            tasks.append((partition, subset, directory_column, use_type_split))
+        print(f"Traitement partitionné: {len(tasks)} partition(s), {self.workers} processus.")
+
+        if len(tasks) > 1:
+            # Processus démarrés à neuf (spawn) : le moteur est utilisé depuis des processus
+            # multithreads (service, démon, interface), où un fork peut se bloquer
+            with ProcessPoolExecutor(max_workers=min(self.workers, len(tasks)),
+                                     mp_context=multiprocessing.get_context('spawn')) as executor:
+                results = list(executor.map(_process_partition, *zip(*tasks)))
+        else:
+            results = [_process_partition(*task) for task in tasks]
+
+        # --- Assemblage : lignes SM d'abord (ordre d'origine), puis les autres types ---
+        kept_data, added = output_columns(data_columns, list(directory.columns), directory_column, sm_first=has_sm)
+        columns = kept_data + added
+        processed = pd.concat([merged for merged, _ in results], ignore_index=True)
+        processed = processed.sort_values(
+            [IS_SM_COLUMN, ROW_ID_COLUMN], ascending=[False, True], kind='mergesort'
+        )
+        processed = processed.reindex(columns=columns).reset_index(drop=True)
+
+        aggregates = {
+            'global': _combine_partial_aggregates([agg['global'] for _, agg in results], GROUPING_COLUMNS),
+            'sm': _combine_partial_aggregates([agg['sm'] for _, agg in results], GROUPING_COLUMNS),
+            'sm_dept': _combine_partial_aggregates([agg['sm_dept'] for _, agg in results], [DEPT_COLUMN]),
+        }
+        return BackendResult(processed, columns, aggregates)
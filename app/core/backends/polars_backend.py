@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import os
+from core.backends.base import (ProcessingBackend, BackendResult, DIRECTORY_COLUMNS_FOR_SM,
+                                GROUPING_COLUMNS, IDPP_COLUMN, DEPT_COLUMN,
+                                output_columns, safe_columns_to_delete)
+from utils.file_handlers import detect_csv_delimiter
+
+try:
+    import polars as pl
+except ImportError:  # Dépendance optionnelle
+    pl = None
+
+
+def format_gn_expr(column):
+    """Expression Polars équivalente à DirectoryManager._format_gn_value.
+
+    Args:
+        column (str): Nom de la colonne à formater
+
+    Returns:
+        polars.Expr: Expression produisant la valeur au format GN + 8 chiffres
+    """
+    value = pl.col(column).cast(pl.Utf8)
+    # float() ignore les espaces autour du nombre (ex: " 12.0 ")
+    as_float = value.str.strip_chars().cast(pl.Float64, strict=False)
+    # Entier exact sur 128 bits comme int() (nul au-delà : la valeur d'origine est conservée)
+    as_integer = as_float.cast(pl.Int128, strict=False)
+    # Cas des nombres entiers écrits avec décimale (ex: "123.0")
+    cleaned = (
+        pl.when(value.str.contains('.', literal=True) & as_integer.is_not_null() & (as_float == as_float.floor()))
+        .then(as_integer.cast(pl.Utf8))
+        .otherwise(value)
+    )
+    digits = cleaned.str.replace_all(r'\D', '')
+    return (
+        pl.when(value.is_null() | value.str.contains(r'^\s*$')).then(pl.lit('GN00000000'))
+        .when(value.str.contains(r'^GN\d{8}$')).then(value)
+        .when(digits.str.len_chars() == 0).then(pl.lit('GN00000000'))
+        .otherwise(pl.lit('GN') + digits.str.slice(-8).str.zfill(8))
+    )
+
+
+class PolarsBackend(ProcessingBackend):
+    """Moteur multithread basé sur Polars (format colonnaire Arrow, requêtes paresseuses).
+
+    Le formatage de la clé, la fusion conditionnelle et les agrégats GASPARD sont
+    exprimés comme une requête paresseuse optimisée puis exécutée en parallèle.
+    """
+
+    name = 'polars'
+
+    def __init__(self, scan_csv: bool = True):
+        """Initialise le moteur.
+
+        Args:
+            scan_csv (bool, optional): Lire directement le fichier CSV source lorsqu'il est
+                disponible plutôt que les données déjà chargées par pandas
+        """
+        if pl is None:
+            raise ImportError("Le moteur Polars n'est pas installé (pip install polars pyarrow).")
+        self.scan_csv = scan_csv
+
+    def _source_frame(self, data, source_path):
+        """Retourne les données sources sous forme de LazyFrame Polars."""
+        if self.scan_csv and source_path and source_path.lower().endswith('.csv') and os.path.isfile(source_path):
+            print(f"Polars: lecture directe du fichier {source_path}")
+            return pl.scan_csv(source_path, separator=detect_csv_delimiter(source_path),
+                               infer_schema_length=10000)
+        return pl.from_pandas(data).lazy()
+
+    def process(self, data, directory_data, directory_column, type_column=None,
+                columns_to_delete=None, source_path=None) -> BackendResult:
+        source = self._source_frame(data, source_path)
+        source_columns = source.collect_schema().names()
+        directory = pl.from_pandas(directory_data).lazy().with_row_index('__dir_row')
+        directory_columns = list(directory_data.columns)
+
+        deleted = safe_columns_to_delete(source_columns, columns_to_delete, directory_column, type_column)
+        data_columns = [col for col in source_columns if col not in deleted]
+        use_type_split = bool(type_column) and type_column in data_columns
+
+        # --- Normalisation de la clé et du type ---
+        normalized = source.select(data_columns).with_row_index('__row_id').with_columns(
+            format_gn_expr(directory_column).alias(directory_column)
+        )
+        if use_type_split:
+            normalized = normalized.with_columns(pl.col(type_column).cast(pl.Utf8)).with_columns(
+                (pl.col(type_column).str.to_uppercase() == 'SM').fill_null(False).alias('__is_sm')
+            )
+        else:
+            normalized = normalized.with_columns(pl.lit(False).alias('__is_sm'))
+
+        has_sm = False
+        if use_type_split:
+            counts = normalized.select(
+                pl.col('__is_sm').sum().alias('sm'), (~pl.col('__is_sm')).sum().alias('other')
+            ).collect()
+            has_sm = counts['sm'][0] > 0
+            print(f"Lignes type SM: {counts['sm'][0]}, Lignes autres types: {counts['other'][0]}")
+
+        # --- Jointure (conditionnelle) avec l'annuaire ---
+        kept_data, added = output_columns(data_columns, directory_columns, directory_column, sm_first=has_sm)
+        right = directory.select(['key', '__dir_row'] + added).rename(
+            {col: f"{col}__annuaire" for col in added}
+        )
+        joined = normalized.join(right, left_on=directory_column, right_on='key', how='left')
+        select_joined = [pl.col(col) for col in kept_data]
+        for col in added:
+            source_col = pl.col(f"{col}__annuaire")
+            if use_type_split and col not in DIRECTORY_COLUMNS_FOR_SM:
+                # Les lignes SM ne reçoivent que la partie réduite de l'annuaire
+                source_col = pl.when(pl.col('__is_sm')).then(None).otherwise(source_col)
+            select_joined.append(source_col.alias(col))
+        # Lignes SM d'abord (ordre d'origine), puis les autres types
+        processed = joined.sort(['__is_sm', '__row_id', '__dir_row'],
+                                descending=[True, False, False], nulls_last=True)
+        processed = processed.select(select_joined).collect()
+        columns = kept_data + added
+        print("Polars: jointure avec l'annuaire terminée.")
+
+        aggregates = self._aggregate(processed, columns, type_column)
+        return BackendResult(processed.to_pandas(), columns, aggregates)
+
+    def _aggregate(self, processed, columns, type_column):
+        """Calcule les agrégats GASPARD globaux, SM et par département (SM)."""
+        aggregates = {'global': None, 'sm': None, 'sm_dept': None}
+        if any(col not in columns for col in GROUPING_COLUMNS + [IDPP_COLUMN]):
+            return aggregates
+
+        idpp = pl.col(IDPP_COLUMN)
+        is_gaspard = (idpp.is_not_null() & ~idpp.cast(pl.Utf8).str.contains(r'^\s*$')).cast(pl.Int64)
+        frame = processed.lazy().with_columns(is_gaspard.alias('__is_gaspard'))
+
+        def grouped(group_cols, sm_only):
+            query = frame.drop_nulls(group_cols)
+            if sm_only:
+                query = query.filter(pl.col(type_column).cast(pl.Utf8).str.to_uppercase() == 'SM')
+            result = query.group_by(group_cols).agg(
+                pl.len().cast(pl.Int64).alias('nombre_signalisation'),
+                pl.col('__is_gaspard').sum().cast(pl.Int64).alias('nombre_signalisation_gaspard')
+            ).collect().to_pandas()
+            # Même ordre que pandas.groupby (clés triées)
+            return result.sort_values(group_cols, kind='mergesort').reset_index(drop=True)
+
+        aggregates['global'] = grouped(GROUPING_COLUMNS, False)
+        if type_column and type_column in columns:
+            aggregates['sm'] = grouped(GROUPING_COLUMNS, True)
+            aggregates['sm_dept'] = grouped([DEPT_COLUMN], True)
+        return aggregates
@@ -1,396 +1,926 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
+import os
+import time
 import pandas as pd
 import numpy as np
-from utils.directory_manager import DirectoryManager
-from typing import Optional, List
-
-class DataProcessor:
-    """Classe responsable du traitement des données et des statistiques."""
-    
-    def __init__(self, directory_manager: DirectoryManager):
-        """Initialise le processeur de données.
-        
-        Args:
-            directory_manager (DirectoryManager): L'instance partagée du gestionnaire d'annuaire.
-        """
-        self.data = None
-        self.processed_data = None
-        self.stats = None
-        self.directory_manager = directory_manager
-        self.processing_params = {} # Ajouter pour stocker les paramètres de traitement
-    
-    def set_data(self, data):
-        """Définit les données à traiter.
-        
-        Args:
-            data (pandas.DataFrame): Les données à traiter
-        """
+from utils.directory_manager import DirectoryManager, DirectorySnapshot, format_gn_value
+from utils.result_cache import ResultCache
+from utils.file_handlers import detect_csv_delimiter
+from core.stats_cube import StatsCube
+from core.stats_history import StatsHistory
+from core.join_diagnostics import JOIN_DIAGNOSTICS_KEY, join_diagnostics, grouping_losses
+from core.stats_spec import StatsSpec, StatsPlanner, SUMMARY_COLUMN_LABELS, SAMPLE_ROWS_COLUMN, filter_key
+from core.deduplication import DEDUPLICATION_KEY, FingerprintStore, deduplicate
+from core.sampling import DEFAULT_PREVIEW_ROWS, uniform_sample, stratified_sample, wilson_interval
+from core.backends.base import ProcessingBackend, DEPT_COLUMN, GROUPING_COLUMNS, DIRECTORY_COLUMNS_FOR_SM
+from typing import Optional, List, Callable, NamedTuple
+
+# Format des résultats mis en cache (à incrémenter si le contenu des statistiques change)
+RESULT_CACHE_FORMAT = 2
+# Poids de sondage des lignes de l'aperçu (retiré des données traitées)
+PREVIEW_WEIGHT_COLUMN = '__poids'
+# Libellés des bornes de l'intervalle de confiance ajoutées aux pourcentages estimés
+CONFIDENCE_LOW_SUFFIX = '(IC 95 % bas)'
+CONFIDENCE_HIGH_SUFFIX = '(IC 95 % haut)'
+
+
+class ProcessingResult(NamedTuple):
+    """Résultat d'un traitement, à considérer comme immuable.
+
+    Chaque traitement produit son propre résultat : les données fusionnées et les
+    statistiques ne sont partagées ni avec les autres traitements, ni avec le cache.
+    """
+    processed_data: Optional[pd.DataFrame]
+    stats: dict
+    params: dict
+    timings: dict
+    directory_version: Optional[str] = None
+    from_cache: bool = False
+
+
+class _ProcessingRun:
+    """État d'un traitement en cours (données, annuaire figé, étapes, durées).
+
+    Un objet est créé par traitement : plusieurs traitements peuvent ainsi s'exécuter
+    simultanément avec le même `DataProcessor`.
+    """
+
+    def __init__(self, processor, data, params, source_path, directory, stage_cache, progress_callback,
+                 backend=None):
+        self.processor = processor
+        self.stats_planner = processor.stats_planner
+        self.backend = backend if backend is not None else processor.backend
+        self.result_cache = processor.result_cache
+        self.stats_history = processor.stats_history
+        self.fingerprint_store = processor.fingerprint_store
         self.data = data
-        self.processed_data = None
-        self.stats = None
-        # Réinitialiser aussi les paramètres
-        self.processing_params = {}
-    
-    def has_data(self):
-        """Vérifie si des données sont disponibles.
-        
+        self.params = params
+        self.source_path = source_path
+        self.directory = directory
+        self.stage_cache = stage_cache if stage_cache is not None else {}
+        self.progress_callback = progress_callback
+        self.timings = {}
+        self.source_id = None
+
+    def _report_progress(self, step, progress):
+        """Transmet l'avancement du traitement à la fonction de suivi, si elle existe."""
+        if self.progress_callback is not None:
+            self.progress_callback(step, progress)
+
+    def _get_data_fingerprint(self):
+        """Retourne l'empreinte du contenu des données importées.
+
+        L'empreinte du fichier source est utilisée si elle est disponible, sinon celle
+        du DataFrame en mémoire. Elle n'est calculée qu'une fois par jeu de données.
+
         Returns:
-            bool: True si des données sont disponibles, False sinon
+            str: Empreinte hexadécimale des données
         """
-        return self.data is not None and not self.data.empty
-    
-    def get_data(self):
-        """Retourne les données actuelles.
-        
-        Returns:
-            pandas.DataFrame: Les données actuelles
+        fingerprint = self.stage_cache.get('data_fingerprint')
+        if fingerprint is None:
+            if self.source_path and os.path.isfile(self.source_path):
+                fingerprint = ResultCache.hash_file(self.source_path)
+            else:
+                fingerprint = ResultCache.hash_dataframe(self.data)
+            self.stage_cache['data_fingerprint'] = fingerprint
+        return fingerprint
+
+    def _result(self, processed_data, stats, directory_version, from_cache=False):
+        """Construit le résultat du traitement."""
+        return ProcessingResult(
+            processed_data=processed_data,
+            stats=dict(stats),
+            params=dict(self.params),
+            timings=dict(self.timings),
+            directory_version=directory_version,
+            from_cache=from_cache
+        )
+
+    def _record_history(self, stats):
+        """Enregistre le cube des statistiques dans l'historique mensuel, s'il est configuré.
+
+        Le mois enregistré est celui de l'annuaire utilisé (`directory_date`), à défaut
+        le mois courant. Le cube d'un traitement dédoublonné ne couvre que les lignes
+        nouvelles : il est enregistré pour sa source, en complément du mois, au lieu de
+        le remplacer. Un échec d'enregistrement n'interrompt pas le traitement.
         """
-        return self.data if self.has_data() else pd.DataFrame()
-    
-    def process_with_directory(self, directory_column: str, 
-                               type_column: Optional[str] = None, 
-                               columns_to_delete: Optional[List[str]] = None):
-        """Traite les données en utilisant l'annuaire, avec fusion conditionnelle basée sur le type.
+        if self.stats_history is None or stats.get('cube') is None:
+            return
+        source = self._source_id() if DEDUPLICATION_KEY in stats else None
+        try:
+            self.stats_history.record(stats['cube'], month=self.params.get('directory_date'), source=source)
+        except Exception as e:
+            print(f"Erreur lors de l'enregistrement dans l'historique des statistiques: {e}")
 
-        Args:
-            directory_column (str): Nom de la colonne contenant la clé pour la fusion.
-            type_column (str, optional): Nom de la colonne contenant le type de signalisation (ex: 'SM').
-            columns_to_delete (list[str], optional): Colonnes à supprimer des données AVANT fusion.
+    def _source_id(self):
+        """Identifiant du jeu de données dans le magasin d'empreintes (début de son empreinte).
+
+        Calculé sur les données importées, avant dédoublonnage.
         """
-        if not self.has_data() or directory_column not in self.data.columns:
-            print("Erreur: Données manquantes ou colonne clé invalide.")
-            return False
-        
-        # Vérifier si la colonne type existe si elle est fournie
-        if type_column and type_column not in self.data.columns:
-            print(f"Erreur: La colonne type '{type_column}' n'existe pas dans les données importées.")
-            return False
+        if self.source_id is None:
+            self.source_id = self._get_data_fingerprint()[:16]
+        return self.source_id
 
-        # Faire une copie des données originales pour le traitement
-        data_to_process = self.data.copy()
+    def _deduplicate(self, dedup_columns):
+        """Écarte les lignes en double avant la fusion (étape mémorisée).
 
-        # --- Suppression des colonnes (AVANT formatage et fusion) ---
-        if columns_to_delete:
-            cols_safe_to_delete = [
-                col for col in columns_to_delete 
-                if col in data_to_process.columns and col != directory_column and col != type_column
-            ]
-            if cols_safe_to_delete:
-                print(f"Suppression des colonnes : {cols_safe_to_delete}")
-                data_to_process.drop(columns=cols_safe_to_delete, inplace=True, errors='ignore')
+        Si des lignes sont écartées, les étapes suivantes sont calculées sur les données
+        dédoublonnées et mémorisées séparément de celles des données complètes.
+
+        Args:
+            dedup_columns (list[str]): Colonnes comparées (liste vide : toutes les colonnes)
+
+        Returns:
+            DedupResult: Le résultat du dédoublonnage
+        """
+        store = self.fingerprint_store
+        # Identifiant calculé sur les données importées, avant que le dédoublonnage ne les réduise
+        source_id = self._source_id()
+        signature = (tuple(dedup_columns), store.signature(source_id) if store is not None else None)
+        try:
+            dedup = self._run_stage(
+                'deduplication', signature,
+                lambda: deduplicate(self.data, dedup_columns or None, store=store, source_id=source_id)
+            )
+        except ValueError as e:
+            raise ValueError(f"Erreur lors du dédoublonnage: {e}")
+        print(f"Dédoublonnage: {dedup.duplicate_rows} doublons dans le fichier, "
+              f"{dedup.previously_seen_rows} lignes déjà traitées, {len(dedup.positions)} lignes conservées.")
+        if len(dedup.positions) < len(self.data):
+            self.data = self.data.iloc[dedup.positions].reset_index(drop=True)
+            # Le fichier d'origine ne correspond plus aux données (pas de relecture directe par un moteur)
+            self.source_path = None
+            self.stage_cache = self.stage_cache.setdefault(('deduplicated', signature), {})
+        return dedup
+
+    def _record_fingerprints(self, dedup):
+        """Enregistre les empreintes du jeu de données pour les traitements suivants."""
+        if self.fingerprint_store is None or dedup is None:
+            return
+        try:
+            self.fingerprint_store.record(dedup.fingerprints, self._source_id(),
+                                          month=self.params.get('directory_date'))
+        except Exception as e:
+            print(f"Erreur lors de l'enregistrement des empreintes de dédoublonnage: {e}")
+
+    def execute(self) -> ProcessingResult:
+        """Exécute le traitement (voir `DataProcessor.run`)."""
+        started = time.perf_counter()
+        directory_column = self.params['directory_column']
+        type_column = self.params['type_column']
+        columns_to_delete = self.params['columns_to_delete']
+        dedup_columns = self.params.get('dedup_columns')
+
+        if self.data is None and self.backend is not None and self.backend.reads_source(self.source_path):
+            # Le moteur lit directement le fichier d'origine : seul son en-tête est contrôlé
+            if dedup_columns is not None:
+                raise ValueError("Le dédoublonnage nécessite les données importées en mémoire.")
+            data_columns = list(pd.read_csv(self.source_path, sep=detect_csv_delimiter(self.source_path),
+                                            nrows=0).columns)
+        elif self.data is None or self.data.empty:
+            raise ValueError("Données manquantes ou colonne clé invalide.")
+        else:
+            data_columns = list(self.data.columns)
+        if directory_column not in data_columns:
+            raise ValueError("Données manquantes ou colonne clé invalide.")
+
+        # Vérifier si la colonne type existe si elle est fournie
+        if type_column and type_column not in data_columns:
+            raise ValueError(f"La colonne type '{type_column}' n'existe pas dans les données importées.")
+
+        directory_version = self.directory.get_version()
+
+        # --- Consultation du cache de résultats ---
+        cache_key = None
+        if self.result_cache is not None:
+            cache_params = {
+                'directory_column': directory_column,
+                'type_column': type_column,
+                'columns_to_delete': sorted(columns_to_delete or []),
+                'stats_spec': self.stats_planner.spec.fingerprint,
+                'format': RESULT_CACHE_FORMAT
+            }
+            if dedup_columns is not None:
+                # Le résultat dépend aussi des empreintes enregistrées par les autres traitements
+                store = self.fingerprint_store
+                cache_params['dedup'] = {
+                    'columns': list(dedup_columns),
+                    'store': store.signature(self._source_id()) if store is not None else None
+                }
+            cache_key = ResultCache.make_key(self._get_data_fingerprint(), directory_version, cache_params)
+            cached = self.result_cache.get(cache_key)
+            if cached is not None:
+                processed_data, stats = cached
+                print("Résultat retrouvé dans le cache, traitement ignoré.")
+                self._record_history(stats)
+                self.timings['total'] = time.perf_counter() - started
+                self._report_progress("Résultat retrouvé dans le cache", 1.0)
+                return self._result(processed_data, stats, directory_version, from_cache=True)
 
         # --- Récupération et préparation de l'annuaire ---
-        directory_data = self.directory_manager.get_directory()
+        directory_data = self.directory.get_directory()
         if directory_data is None or directory_data.empty or 'key' not in directory_data.columns:
-            print("Erreur: Annuaire vide ou invalide (colonne 'key' manquante). Traitement annulé.")
             # Ne pas continuer le traitement si l'annuaire est inutilisable
-            self.processed_data = None # Assurer que les données traitées sont vides
-            self.stats = {'global_error': "Annuaire vide ou invalide", 'sm_error': "Annuaire vide ou invalide"} # Optionnel: définir erreurs
-            return False # Indiquer l'échec du traitement
+            raise ValueError("Annuaire vide ou invalide (colonne 'key' manquante). Traitement annulé.")
+
+        # --- Dédoublonnage des données importées (avant la fusion) ---
+        dedup = None
+        if dedup_columns is not None:
+            total_rows = len(self.data)
+            dedup = self._deduplicate(dedup_columns)
+            if self.data.empty:
+                raise ValueError("Toutes les lignes ont déjà été traitées (dédoublonnage) : rien à traiter.")
+
+        # --- Exécution déléguée à un moteur alternatif ---
+        if self.backend is not None:
+            processed_data, stats = self._process_with_backend(directory_data)
+        else:
+            processed_data, stats = self._process_with_pandas(directory_data, directory_version)
+        if dedup is not None:
+            stats[DEDUPLICATION_KEY] = dedup.summary(total_rows)
+
+        # Mémoriser le résultat pour les prochaines exécutions identiques
+        if cache_key is not None and processed_data is not None:
+            self.result_cache.put(cache_key, processed_data, stats)
+        self._record_history(stats)
+        self._record_fingerprints(dedup)
+        self.timings['total'] = time.perf_counter() - started
+        self._report_progress("Traitement terminé", 1.0)
+        return self._result(processed_data, stats, directory_version)
+
+    def _process_with_pandas(self, directory_data, directory_version):
+        """Exécute le traitement en mémoire avec pandas.
 
-        # --- Formatage de la colonne clé dans les données à traiter ---
+        Returns:
+            tuple: (données fusionnées, dictionnaire des statistiques)
+        """
+        directory_column = self.params['directory_column']
+        type_column = self.params['type_column']
+        columns_to_delete = self.params['columns_to_delete']
+
+        # --- Étape 1 : formatage de la colonne clé (dépend uniquement de la colonne clé) ---
         print(f"Formatage de la colonne clé: {directory_column}")
+        self._report_progress("Formatage de la colonne clé", 0.1)
         try:
-             # Assurer que la colonne clé est de type string avant le formatage
-            data_to_process[directory_column] = data_to_process[directory_column].astype(str)
-            data_to_process[directory_column] = data_to_process[directory_column].apply(
-                self.directory_manager._format_gn_value
+            normalized_key = self._run_stage(
+                'normalized_key', (directory_column,),
+                lambda: self._compute_normalized_key(directory_column)
             )
         except Exception as e:
-            print(f"Erreur lors du formatage de la colonne clé '{directory_column}': {e}")
-            return False
+            raise ValueError(f"Erreur lors du formatage de la colonne clé '{directory_column}': {e}")
+
+        # --- Étape 2 : correspondance ligne à ligne avec l'annuaire (clé + version de l'annuaire) ---
+        self._report_progress("Correspondance avec l'annuaire", 0.3)
+        left_rows, right_rows = self._run_stage(
+            'join_mapping', (directory_column, directory_version),
+            lambda: self._compute_join_mapping(normalized_key, directory_data)
+        )
+        # Diagnostics déduits de la même correspondance (pas de second parcours)
+        diagnostics = self._run_stage(
+            'join_diagnostics', (directory_column, directory_version),
+            lambda: join_diagnostics(self.data[directory_column], normalized_key, left_rows, right_rows)
+        )
 
-        # --- Logique de fusion conditionnelle ---
+        # --- Étape 3 : suppression des colonnes (AVANT fusion) ---
+        merge_started = time.perf_counter()
+        cols_safe_to_delete = []
+        if columns_to_delete:
+            cols_safe_to_delete = [
+                col for col in columns_to_delete
+                if col in self.data.columns and col != directory_column and col != type_column
+            ]
+            if cols_safe_to_delete:
+                print(f"Suppression des colonnes : {cols_safe_to_delete}")
+        # drop() retourne une nouvelle trame : les données originales restent intactes
+        data_to_process = self.data.drop(columns=cols_safe_to_delete, errors='ignore')
+        data_to_process[directory_column] = normalized_key
+
+        # --- Étape 4 : assemblage de la fusion (conditionnelle si colonne type) ---
+        self._report_progress("Fusion avec l'annuaire", 0.5)
         if type_column and type_column in data_to_process.columns:
             print(f"Application de la fusion conditionnelle basée sur la colonne '{type_column}'.")
-            
-            # Séparer les données en fonction du type 'SM'
+
             # Assurer que la colonne type est de type string pour la comparaison
             data_to_process[type_column] = data_to_process[type_column].astype(str)
-            df_sm = data_to_process[data_to_process[type_column].str.upper() == 'SM'].copy()
-            df_other = data_to_process[data_to_process[type_column].str.upper() != 'SM'].copy()
-            print(f"Lignes type SM: {len(df_sm)}, Lignes autres types: {len(df_other)}")
+            is_sm = self._run_stage(
+                'type_mask', (type_column,),
+                lambda: (self.data[type_column].astype(str).str.upper() == 'SM').to_numpy()
+            )
+            print(f"Lignes type SM: {int(is_sm.sum())}, Lignes autres types: {int((~is_sm).sum())}")
 
             # Préparer l'annuaire pour la fusion partielle (SM)
-            directory_cols_for_sm = ['key', 'abrege_unite', 'departement']
             # S'assurer que ces colonnes existent dans l'annuaire
-            valid_dir_cols_sm = [col for col in directory_cols_for_sm if col in directory_data.columns]
-            directory_sm_subset = directory_data[valid_dir_cols_sm].copy()
+            valid_dir_cols_sm = [col for col in DIRECTORY_COLUMNS_FOR_SM if col in directory_data.columns]
             print(f"Colonnes de l'annuaire pour SM : {valid_dir_cols_sm}")
 
+            # Les lignes SM conservent leur ordre d'origine, suivies des autres types
+            row_is_sm = is_sm[left_rows]
+
             # Fusion pour les lignes SM (partielle)
-            merged_sm = pd.DataFrame() # Initialiser au cas où df_sm est vide
-            if not df_sm.empty:
-                merged_sm = pd.merge(
-                    df_sm,
-                    directory_sm_subset,
-                    left_on=directory_column,
-                    right_on='key',
-                    how='left',
-                    suffixes=('', '_annuaire')
+            merged_sm = pd.DataFrame() # Initialiser au cas où il n'y a pas de ligne SM
+            if is_sm.any():
+                merged_sm = self._assemble_join(
+                    data_to_process, directory_data[valid_dir_cols_sm],
+                    left_rows[row_is_sm], right_rows[row_is_sm], directory_column
                 )
                 print("Fusion partielle pour SM terminée.")
 
             # Fusion pour les autres lignes (complète)
-            merged_other = pd.DataFrame() # Initialiser au cas où df_other est vide
-            if not df_other.empty:
-                merged_other = pd.merge(
-                    df_other,
-                    directory_data, # Utiliser l'annuaire complet
-                    left_on=directory_column,
-                    right_on='key',
-                    how='left',
-                    suffixes=('', '_annuaire')
+            merged_other = pd.DataFrame() # Initialiser au cas où toutes les lignes sont SM
+            if not is_sm.all():
+                merged_other = self._assemble_join(
+                    data_to_process, directory_data, # Utiliser l'annuaire complet
+                    left_rows[~row_is_sm], right_rows[~row_is_sm], directory_column
                 )
                 print("Fusion complète pour les autres types terminée.")
 
             # Combiner les résultats
-            self.processed_data = pd.concat([merged_sm, merged_other], ignore_index=True)
+            processed_data = pd.concat([merged_sm, merged_other], ignore_index=True)
             print("Concaténation des résultats SM et autres terminée.")
 
         else:
             # --- Fusion simple (si pas de colonne type ou invalide) ---
             print("Application de la fusion simple (pas de condition sur le type).")
-            self.processed_data = pd.merge(
-                data_to_process,
-                directory_data,
-                left_on=directory_column,
-                right_on='key',
-                how='left',
-                suffixes=('', '_annuaire')
+            processed_data = self._assemble_join(
+                data_to_process, directory_data, left_rows, right_rows, directory_column
             )
             print("Fusion simple terminée.")
 
         # --- Nettoyage final des colonnes ---
         # Supprimer la colonne 'key' de l'annuaire si redondante
-        if 'key' in self.processed_data.columns and directory_column != 'key':
+        if 'key' in processed_data.columns and directory_column != 'key':
             print("Suppression de la colonne 'key' redondante.")
-            self.processed_data.drop(columns=['key'], inplace=True, errors='ignore')
-        
+            processed_data.drop(columns=['key'], inplace=True, errors='ignore')
+
         # Supprimer les colonnes suffixées '_annuaire' si la colonne originale existe
         # (Peut arriver si une colonne existe dans les deux DFs et n'est pas la clé)
-        cols_to_drop = [col for col in self.processed_data.columns if col.endswith('_annuaire')]
+        cols_to_drop = [col for col in processed_data.columns if col.endswith('_annuaire')]
         if cols_to_drop:
             print(f"Suppression des colonnes suffixées _annuaire: {cols_to_drop}")
-            self.processed_data.drop(columns=cols_to_drop, inplace=True, errors='ignore')
-            
+            processed_data.drop(columns=cols_to_drop, inplace=True, errors='ignore')
+        self.timings['merge'] = time.perf_counter() - merge_started
+        print("Traitement terminé avec succès.")
+
+        # --- Étape 5 : statistiques ---
+        self._report_progress("Calcul des statistiques", 0.8)
+        # Seules les colonnes supprimées utilisées par les statistiques peuvent modifier leur résultat
+        stats_signature = (
+            directory_column, type_column, directory_version, self.stats_planner.spec.fingerprint,
+            tuple(sorted(set(cols_safe_to_delete) & self.stats_planner.spec.input_columns(type_column)))
+        )
+        stats = dict(self._run_stage('stats', stats_signature, lambda: self._compute_stats(processed_data)))
+        stats[JOIN_DIAGNOSTICS_KEY] = dict(diagnostics, grouping_dropped_rows=grouping_losses(
+            stats.get('cube'), self.stats_planner.spec, type_column))
+        return processed_data, stats
+
+    def _process_with_backend(self, directory_data):
+        """Exécute le traitement avec le moteur alternatif configuré.
+
+        Le moteur produit les données fusionnées et les agrégats bruts ; la mise en forme
+        des tables reste celle du chemin pandas.
+
+        Returns:
+            tuple: (données fusionnées, dictionnaire des statistiques)
+        """
+        type_column = self.params['type_column']
+        print(f"Traitement délégué au moteur '{self.backend.name}'.")
+        self._report_progress(f"Traitement par le moteur '{self.backend.name}'", 0.2)
+        backend_started = time.perf_counter()
+        try:
+            result = self.backend.process(
+                self.data, directory_data, self.params['directory_column'],
+                type_column=type_column,
+                columns_to_delete=self.params['columns_to_delete'],
+                source_path=self.source_path
+            )
+        except Exception as e:
+            raise ValueError(f"Erreur du moteur '{self.backend.name}': {e}")
+        self.timings['backend'] = time.perf_counter() - backend_started
+
+        processed_data = result.processed_data
+        self._report_progress("Calcul des statistiques", 0.8)
+        stats_started = time.perf_counter()
+        stats = self._stats_from_aggregates(processed_data, result.columns, result.aggregates, type_column)
+        if processed_data is not None:
+            stats['cube'] = StatsCube.build(processed_data, type_column)
+        # Le moteur ne transmet pas la correspondance ligne à ligne : seules les pertes
+        # au regroupement sont diagnostiquées
+        stats[JOIN_DIAGNOSTICS_KEY] = {'grouping_dropped_rows': grouping_losses(
+            stats.get('cube'), self.stats_planner.spec, type_column)}
+        self.timings['stats'] = time.perf_counter() - stats_started
         print("Traitement terminé avec succès.")
-        # Stocker les paramètres utilisés pour le traitement
-        self.processing_params = {
+        return processed_data, stats
+
+    def _stats_from_aggregates(self, processed_data, columns, aggregates, type_column):
+        """Construit le dictionnaire des statistiques à partir des agrégats d'un moteur.
+
+        Les agrégats 'global', 'sm' et 'sm_dept' produits par le moteur sont réutilisés
+        pour les agrégations identiques de la spécification ; les autres sont calculées
+        par le planificateur sur les données fusionnées lorsqu'elles sont disponibles.
+
+        Args:
+            processed_data (pandas.DataFrame): Données fusionnées (None si non matérialisées)
+            columns (list[str]): Colonnes des données fusionnées
+            aggregates (dict): Agrégats 'global', 'sm' et 'sm_dept'
+            type_column (str): Colonne type utilisée pour le filtre SM
+
+        Returns:
+            dict: Le dictionnaire des statistiques
+        """
+        spec = self.stats_planner.spec
+        sm_key = filter_key({'column': type_column, 'equals': 'SM', 'ignore_case': True}) if type_column else None
+        backend_requests = {'global': (None, tuple(GROUPING_COLUMNS))}
+        if sm_key is not None:
+            backend_requests['sm'] = (sm_key, tuple(GROUPING_COLUMNS))
+            backend_requests['sm_dept'] = (sm_key, (DEPT_COLUMN,))
+        available = {}
+        for name, request in backend_requests.items():
+            aggregated = aggregates.get(name)
+            if aggregated is not None and all(m in aggregated.columns for m in spec.measures):
+                available[request] = aggregated
+
+        needed = []
+        for table in spec.tables:
+            if self.stats_planner.table_error(table, columns, type_column) is None:
+                needed += [r for r in spec.table_requests(table, type_column) if r not in available]
+        if needed and processed_data is not None:
+            available.update(self.stats_planner.execute(processed_data, type_column, requests=needed))
+        return self.stats_planner.build_tables(columns, available, type_column)
+
+    def _run_stage(self, stage_name, signature, compute):
+        """Exécute une étape du pipeline ou réutilise son résultat mémorisé.
+
+        Args:
+            stage_name (str): Nom de l'étape
+            signature (tuple): Valeurs des entrées dont dépend l'étape
+            compute (callable): Fonction calculant le résultat de l'étape
+
+        Returns:
+            Le résultat de l'étape (recalculé uniquement si la signature a changé)
+        """
+        stage_started = time.perf_counter()
+        cached = self.stage_cache.get(stage_name)
+        if cached is not None and cached[0] == signature:
+            print(f"Étape '{stage_name}' réutilisée (entrées inchangées).")
+            result = cached[1]
+        else:
+            result = compute()
+            self.stage_cache[stage_name] = (signature, result)
+        self.timings[stage_name] = time.perf_counter() - stage_started
+        return result
+
+    def _compute_normalized_key(self, directory_column):
+        """Formate la colonne clé des données importées au format GN + 8 chiffres.
+
+        Args:
+            directory_column (str): Nom de la colonne clé
+
+        Returns:
+            pandas.Series: Les clés formatées
+        """
+        # Assurer que la colonne clé est de type string avant le formatage
+        return self.data[directory_column].astype(str).apply(format_gn_value)
+
+    def _compute_join_mapping(self, normalized_key, directory_data):
+        """Calcule la correspondance entre les lignes des données et celles de l'annuaire.
+
+        Args:
+            normalized_key (pandas.Series): Clés formatées des données
+            directory_data (pandas.DataFrame): Annuaire
+
+        Returns:
+            tuple: (positions des lignes de données, positions des lignes de l'annuaire ou -1)
+        """
+        # Annuaire à clés uniques : recherche directe dans l'index maintenu par l'annuaire
+        key_index = self.directory.get_key_index()
+        if key_index is not None and len(key_index) == len(directory_data):
+            right_rows = key_index.get_indexer(normalized_key.to_numpy()).astype(np.int64)
+            return np.arange(len(normalized_key)), right_rows
+
+        left_keys = pd.DataFrame({
+            '_key': normalized_key.to_numpy(),
+            '_left_row': np.arange(len(normalized_key))
+        })
+        right_keys = pd.DataFrame({
+            '_key': directory_data['key'].to_numpy(),
+            '_right_row': np.arange(len(directory_data))
+        })
+        # Jointure gauche sur les seules clés : l'ordre des lignes de gauche est conservé
+        mapping = pd.merge(left_keys, right_keys, on='_key', how='left')
+        right_rows = mapping['_right_row'].fillna(-1).astype(np.int64).to_numpy()
+        return mapping['_left_row'].to_numpy(), right_rows
+
+    @staticmethod
+    def _assemble_join(left_df, right_df, left_rows, right_rows, directory_column):
+        """Assemble le résultat d'une jointure gauche à partir de la correspondance des lignes.
+
+        Reproduit le nommage de `pd.merge(..., suffixes=('', '_annuaire'))`.
+
+        Args:
+            left_df (pandas.DataFrame): Données à enrichir
+            right_df (pandas.DataFrame): Colonnes de l'annuaire à ajouter
+            left_rows (numpy.ndarray): Positions des lignes de données
+            right_rows (numpy.ndarray): Positions des lignes de l'annuaire (-1 si absente)
+            directory_column (str): Nom de la colonne clé des données
+
+        Returns:
+            pandas.DataFrame: Les données fusionnées
+        """
+        left_part = left_df.iloc[left_rows].reset_index(drop=True)
+        # reindex() produit des valeurs manquantes pour les positions -1 (clé sans correspondance)
+        right_part = right_df.reset_index(drop=True).reindex(right_rows).reset_index(drop=True)
+        if directory_column == 'key':
+            right_part = right_part.drop(columns=['key'])
+        overlap = set(left_part.columns) & set(right_part.columns)
+        right_part = right_part.rename(columns={col: f"{col}_annuaire" for col in overlap})
+        return pd.concat([left_part, right_part], axis=1)
+
+    def _compute_stats(self, processed_data):
+        """Génère l'ensemble des statistiques sur les données traitées.
+
+        Les tables sont décrites par la spécification déclarative et calculées par le
+        planificateur en un passage partagé sur les données.
+
+        Returns:
+            dict: Le dictionnaire des statistiques
+        """
+        type_column = self.params['type_column']
+        stats = self.stats_planner.compute(processed_data, type_column)
+        # Cube pré-agrégé pour les découpes interactives de la vue statistiques
+        stats['cube'] = StatsCube.build(processed_data, type_column)
+        return stats
+
+
+class DataProcessor:
+    """Classe responsable du traitement des données et des statistiques.
+
+    `run` traite un jeu de données et retourne un `ProcessingResult` sans modifier
+    l'état du processeur : plusieurs traitements peuvent s'exécuter simultanément
+    (fils ou processus). Les méthodes `set_data` / `process_with_directory` /
+    `get_stats` conservent le dernier résultat pour les vues de l'interface.
+    """
+
+    def __init__(self, directory_manager: Optional[DirectoryManager], result_cache: Optional[ResultCache] = None,
+                 backend: Optional[ProcessingBackend] = None, stats_spec: Optional[StatsSpec] = None,
+                 progress_callback: Optional[Callable[[str, float], None]] = None,
+                 stats_history: Optional[StatsHistory] = None,
+                 fingerprint_store: Optional[FingerprintStore] = None):
+        """Initialise le processeur de données.
+
+        Args:
+            directory_manager (DirectoryManager): L'instance partagée du gestionnaire d'annuaire
+                (None si l'annuaire est toujours fourni à `run`).
+            result_cache (ResultCache, optional): Cache disque des résultats de traitement.
+            backend (ProcessingBackend, optional): Moteur d'exécution alternatif (ex: DuckDB).
+                Par défaut, le traitement est réalisé en mémoire avec pandas.
+            stats_spec (StatsSpec, optional): Spécification des tables de statistiques.
+                Par défaut, celle de `resources/stats_spec.json`.
+            progress_callback (callable, optional): Fonction appelée à chaque étape du
+                traitement avec le libellé de l'étape et l'avancement (0 à 1).
+            stats_history (StatsHistory, optional): Historique mensuel dans lequel le cube
+                des statistiques de chaque traitement réussi est enregistré.
+            fingerprint_store (FingerprintStore, optional): Empreintes des lignes déjà
+                traitées, pour le dédoublonnage d'un traitement à l'autre (`dedup_columns`).
+        """
+        self.data = None
+        self.processed_data = None
+        self.stats = None
+        self.last_result = None
+        self.directory_manager = directory_manager
+        self.result_cache = result_cache
+        self.backend = backend
+        self.stats_history = stats_history
+        self.fingerprint_store = fingerprint_store
+        self.stats_planner = StatsPlanner(stats_spec or StatsSpec.load())
+        self.progress_callback = progress_callback
+        self.source_path = None
+        self._stage_cache = {}
+        self.processing_params = {} # Ajouter pour stocker les paramètres de traitement
+
+    def run(self, data, directory_column: str, type_column: Optional[str] = None,
+            columns_to_delete: Optional[List[str]] = None, source_path: Optional[str] = None,
+            directory: Optional[DirectorySnapshot] = None, directory_date=None,
+            progress_callback: Optional[Callable[[str, float], None]] = None,
+            stage_cache: Optional[dict] = None, dedup_columns: Optional[List[str]] = None,
+            backend: Optional[ProcessingBackend] = None) -> ProcessingResult:
+        """Traite un jeu de données avec l'annuaire, sans modifier l'état du processeur.
+
+        Args:
+            data (pandas.DataFrame): Les données à traiter (non modifiées). Peut être None
+                si le moteur lit directement le fichier d'origine (`backend.reads_source`).
+            directory_column (str): Nom de la colonne contenant la clé pour la fusion.
+            type_column (str, optional): Nom de la colonne contenant le type de signalisation (ex: 'SM').
+            columns_to_delete (list[str], optional): Colonnes à supprimer des données AVANT fusion.
+            source_path (str, optional): Chemin du fichier d'origine (empreinte du cache)
+            directory (DirectorySnapshot, optional): Instantané de l'annuaire à utiliser.
+                Par défaut, un instantané de l'annuaire courant.
+            directory_date (str | datetime.date, optional): Utiliser l'annuaire en vigueur
+                à cette date (retraitement d'une période passée) plutôt que l'annuaire courant
+            progress_callback (callable, optional): Suivi de l'avancement de ce traitement
+            stage_cache (dict, optional): Résultats d'étapes mémorisés pour ce jeu de
+                données, réutilisés d'un traitement à l'autre (propre à l'appelant)
+            dedup_columns (list[str], optional): Écarter avant fusion les lignes en double
+                sur ces colonnes (liste vide : toutes les colonnes), y compris celles déjà
+                traitées avec un autre fichier si un magasin d'empreintes est configuré.
+                Par défaut, aucun dédoublonnage.
+            backend (ProcessingBackend, optional): Moteur à utiliser pour ce traitement
+                (par défaut, celui du processeur)
+
+        Returns:
+            ProcessingResult: Le résultat du traitement
+
+        Raises:
+            ValueError: Si les données, les colonnes ou l'annuaire sont invalides
+        """
+        params = {
             'directory_column': directory_column,
             'type_column': type_column,
             'columns_to_delete': columns_to_delete
         }
-        # Générer les statistiques après le traitement
-        # Appeler les deux fonctions de génération
-        self._generate_global_stats()
-        self._generate_sm_stats()
-        return True
-    
-    def _generate_global_stats(self):
-        """Génère des statistiques agrégées sur TOUTES les données traitées."""
-        if self.processed_data is None or self.processed_data.empty:
-            if isinstance(self.stats, dict):
-                 self.stats['global_summary_table'] = pd.DataFrame() # Table vide
-            else:
-                 self.stats = {'global_summary_table': pd.DataFrame()} # Initialiser stats si besoin
-            print("Aucune donnée traitée disponible pour générer les statistiques globales.")
-            return
+        if directory_date is not None:
+            params['directory_date'] = str(directory_date)
+        if dedup_columns is not None:
+            params['dedup_columns'] = list(dedup_columns)
+        if directory is None:
+            directory = self.directory_manager.snapshot(as_of=directory_date)
+        run = _ProcessingRun(self, data, params, source_path, directory, stage_cache, progress_callback,
+                             backend=backend)
+        return run.execute()
+
+    def preview(self, data, directory_column: str, type_column: Optional[str] = None,
+                columns_to_delete: Optional[List[str]] = None, sample_size: int = DEFAULT_PREVIEW_ROWS,
+                stratify: bool = True, directory_date=None, seed: Optional[int] = 0,
+                dedup_columns: Optional[List[str]] = None) -> ProcessingResult:
+        """Estime les statistiques sur un échantillon des données (aperçu rapide).
+
+        Seul l'échantillon est fusionné avec l'annuaire. Les comptages des tables sont
+        des estimations pondérées (inverse de la fraction de sondage) et chaque
+        pourcentage est accompagné de son intervalle de confiance à 95 % (Wilson,
+        calculé sur le nombre de lignes observées). Le tirage est stratifié par
+        département (selon l'annuaire) afin que chaque département soit représenté.
+        Le résultat n'est ni mis en cache ni enregistré dans l'historique.
 
-        # --- Configuration ---
-        dept_col = 'departement'
-        unit_col = 'abrege_unite'
-        material_col = 'type_materiel'
-        terminal_col = 'code_unite_terminal_de_saisie'
-        idpp_col = 'idpp'
-        grouping_cols = [dept_col, unit_col, material_col, terminal_col]
-        required_cols = grouping_cols + [idpp_col]
-
-        # --- Vérification des colonnes ---
-        missing_cols = [col for col in required_cols if col not in self.processed_data.columns]
-        if missing_cols:
-            err_msg = f"Colonnes manquantes pour stats globales: {', '.join(missing_cols)}"
-            print(f"Attention: {err_msg}")
-            if isinstance(self.stats, dict):
-                self.stats['global_error'] = err_msg
-                self.stats['global_summary_table'] = pd.DataFrame()
-            else:
-                self.stats = {'global_error': err_msg, 'global_summary_table': pd.DataFrame()}
-            return
+        Args:
+            data (pandas.DataFrame): Les données à traiter (non modifiées)
+            directory_column (str): Nom de la colonne contenant la clé pour la fusion.
+            type_column (str, optional): Nom de la colonne contenant le type de signalisation (ex: 'SM').
+            columns_to_delete (list[str], optional): Colonnes à supprimer des données AVANT fusion.
+            sample_size (int, optional): Nombre de lignes de l'échantillon
+            stratify (bool, optional): Tirage stratifié par département (sinon aléatoire simple)
+            directory_date (str | datetime.date, optional): Date de l'annuaire à utiliser
+            seed (int, optional): Graine du tirage (None : tirage différent à chaque appel)
+            dedup_columns (list[str], optional): Écarter les lignes en double dans les données
+                avant le tirage (les empreintes des traitements précédents ne sont pas consultées)
 
-        # --- Calcul des statistiques globales ---
-        print(f"Génération des statistiques globales par groupe: {grouping_cols}")
-        stats_df = self.processed_data.copy()
-
-        # Identification GASPARD (présence d'idpp)
-        is_gaspard_col = 'is_gaspard'
-        stats_df[is_gaspard_col] = stats_df[idpp_col].notna() & (stats_df[idpp_col].astype(str).str.strip() != '')
-        stats_df[is_gaspard_col] = stats_df[is_gaspard_col].astype(int)
-
-        # Groupement et agrégation
-        aggregated_stats = stats_df.groupby(grouping_cols).agg(
-            nombre_signalisation=(grouping_cols[0], 'size'),
-            nombre_signalisation_gaspard=(is_gaspard_col, 'sum')
-        ).reset_index()
-
-        # Calcul du pourcentage
-        aggregated_stats['pourcentage_signalisation_gaspard'] = (
-            (aggregated_stats['nombre_signalisation_gaspard'] / aggregated_stats['nombre_signalisation']) * 100
-        ).round(2)
-        aggregated_stats['pourcentage_signalisation_gaspard'].fillna(0, inplace=True)
-
-        # Renommage
-        aggregated_stats.rename(columns={
-            dept_col: 'Département',
-            unit_col: 'Libellé Unité',
-            material_col: 'Matériel',
-            terminal_col: 'Terminal de saisie',
-            'nombre_signalisation': 'Nombre de signalisation',
-            'nombre_signalisation_gaspard': 'Nombre de signalisation GASPARD',
-            'pourcentage_signalisation_gaspard': 'Pourcentage signalisation GASPARD'
-        }, inplace=True)
-        
-        # --- Formatage du département (ajout du zéro) ---
-        dept_col_renamed = 'Département'
-        if dept_col_renamed in aggregated_stats.columns:
-            aggregated_stats[dept_col_renamed] = aggregated_stats[dept_col_renamed].astype(str).str.zfill(2)
-
-        # Tri simple (Département puis Unité)
-        aggregated_stats.sort_values(by=['Département', 'Libellé Unité'], ascending=[True, True], inplace=True)
-
-        # Stockage
-        if not isinstance(self.stats, dict): self.stats = {}
-        self.stats['global_summary_table'] = aggregated_stats
-        print(f"Statistiques globales générées avec {len(aggregated_stats)} lignes.")
-
-
-    def _generate_sm_stats(self):
-        """Génère des statistiques agrégées sur les données de type 'SM' uniquement."""
-        # Initialisation du slot de stats SM dans le dictionnaire principal
-        if not isinstance(self.stats, dict): self.stats = {}
-        self.stats['sm_summary_table'] = pd.DataFrame() # Préparer table vide
-
-        if self.processed_data is None or self.processed_data.empty:
-            print("Aucune donnée traitée disponible pour générer les statistiques SM.")
-            return
+        Returns:
+            ProcessingResult: Le résultat estimé ; `stats['preview']` décrit l'échantillon
 
-        # --- Configuration pour SM ---
-        dept_col = 'departement'
-        unit_col = 'abrege_unite'
-        material_col = 'type_materiel'
-        terminal_col = 'code_unite_terminal_de_saisie'
-        idpp_col = 'idpp'
-        type_col = self.processing_params.get('type_column') # Nécessaire pour le filtre SM
-        grouping_cols = [dept_col, unit_col, material_col, terminal_col]
-        required_cols = grouping_cols + [idpp_col, type_col]
-
-        # --- Vérification des colonnes pour SM ---
-        if not type_col:
-            err_msg = "Colonne 'type' non spécifiée pour le traitement."
-            print(f"Erreur: {err_msg} Impossible de générer les statistiques SM.")
-            self.stats['sm_error'] = err_msg
-            return
-            
-        missing_cols = [col for col in required_cols if col not in self.processed_data.columns]
-        if missing_cols:
-            err_msg = f"Colonnes manquantes pour stats SM: {', '.join(missing_cols)}"
-            print(f"Attention: {err_msg}")
-            self.stats['sm_error'] = err_msg
-            return
+        Raises:
+            ValueError: Si les données, les colonnes ou l'annuaire sont invalides
+        """
+        started = time.perf_counter()
+        if data is None or data.empty or directory_column not in data.columns:
+            raise ValueError("Données manquantes ou colonne clé invalide.")
+        if type_column and type_column not in data.columns:
+            raise ValueError(f"La colonne type '{type_column}' n'existe pas dans les données importées.")
+        directory = self.directory_manager.snapshot(as_of=directory_date)
+        if dedup_columns is not None:
+            data = data.iloc[deduplicate(data, dedup_columns or None).positions]
+
+        strata = self._preview_strata(data[directory_column], directory) if stratify else None
+        if strata is not None:
+            positions, weights = stratified_sample(strata, sample_size, seed)
+        else:
+            positions, weights = uniform_sample(len(data), sample_size, seed)
+        sample = data.iloc[positions].reset_index(drop=True)
+        sample[PREVIEW_WEIGHT_COLUMN] = weights
+        sampling_time = time.perf_counter() - started
+        print(f"Aperçu sur un échantillon de {len(sample)} lignes sur {len(data)}.")
 
-        # --- Filtrage initial sur le type 'SM' ---
-        print(f"Filtrage des données pour ne garder que le type 'SM' basé sur la colonne '{type_col}'.")
-        sm_data = self.processed_data[
-            self.processed_data[type_col].astype(str).str.upper() == 'SM'
-        ].copy()
-        
-        if sm_data.empty:
-            print("Aucune donnée de type 'SM' trouvée après filtrage. Stats SM resteront vides.")
-            return # Laisse la table vide initialisée plus haut
-        print(f"{len(sm_data)} lignes de type 'SM' trouvées.")
-        # ----------------------------------------
-
-        # --- Calcul des statistiques (maintenant sur sm_data) ---
-        print(f"Génération des statistiques SM par groupe: {grouping_cols}")
-        stats_df = sm_data # Utiliser les données filtrées
-
-        # Identification GASPARD (présence d'idpp sur données SM)
-        is_gaspard_col = 'is_gaspard'
-        stats_df[is_gaspard_col] = stats_df[idpp_col].notna() & (stats_df[idpp_col].astype(str).str.strip() != '')
-        stats_df[is_gaspard_col] = stats_df[is_gaspard_col].astype(int)
-        print(f"Identification des signalisations GASPARD basée sur la présence d'une valeur dans '{idpp_col}' (sur données SM).")
-
-        # Groupement et agrégation (sur données SM)
-        aggregated_stats = stats_df.groupby(grouping_cols).agg(
-            nombre_signalisation=(grouping_cols[0], 'size'),
-            nombre_signalisation_gaspard=(is_gaspard_col, 'sum')
-        ).reset_index()
-
-        # Calcul du pourcentage
-        aggregated_stats['pourcentage_signalisation_gaspard'] = (
-            (aggregated_stats['nombre_signalisation_gaspard'] / aggregated_stats['nombre_signalisation']) * 100
-        ).round(2)
-        aggregated_stats['pourcentage_signalisation_gaspard'].fillna(0, inplace=True)
-
-        # Renommage
-        aggregated_stats.rename(columns={
-            dept_col: 'Département',
-            unit_col: 'Libellé Unité',
-            material_col: 'Matériel',
-            terminal_col: 'Terminal de saisie',
-            'nombre_signalisation': 'Nombre de signalisation',
-            'nombre_signalisation_gaspard': 'Nombre de signalisation GASPARD',
-            'pourcentage_signalisation_gaspard': 'Pourcentage signalisation GASPARD'
-        }, inplace=True)
-
-        # --- Calcul des lignes de synthèse GGD par département (sur données SM) ---
-        dept_summary_list = []
-        dept_grouped = stats_df.groupby(dept_col).agg(
-            dept_total_signalisations=(dept_col, 'size'),
-            dept_gaspard_signalisations=(is_gaspard_col, 'sum')
-        )
-        for dept_val, row in dept_grouped.iterrows():
-            dept_total = row['dept_total_signalisations']
-            dept_gaspard = row['dept_gaspard_signalisations']
-            dept_percentage = round((dept_gaspard / dept_total) * 100, 2) if dept_total > 0 else 0
-            dept_summary_list.append({
-                'Département': dept_val,
-                'Libellé Unité': f"GGD {dept_val}",
-                'Matériel': "NeoDK",
-                'Terminal de saisie': pd.NA,
-                'Nombre de signalisation': dept_total,
-                'Nombre de signalisation GASPARD': dept_gaspard,
-                'Pourcentage signalisation GASPARD': dept_percentage
-            })
-        dept_summary_df = pd.DataFrame(dept_summary_list)
-
-        # --- Concaténer stats SM détaillées et synthèses GGD ---
-        final_sm_stats_df = pd.concat([aggregated_stats, dept_summary_df], ignore_index=True)
-
-        # --- Tri multi-niveaux pour SM (appliqué au DF combiné SM) ---
-        final_sm_stats_df['is_cic'] = (~final_sm_stats_df['Libellé Unité'].astype(str).str.startswith('CIC', na=False)).astype(int)
-        final_sm_stats_df.sort_values(
-            by=['Département', 'is_cic', 'Libellé Unité'],
-            ascending=[True, True, True],
-            inplace=True
+        params = {
+            'directory_column': directory_column,
+            'type_column': type_column,
+            'columns_to_delete': columns_to_delete
+        }
+        if directory_date is not None:
+            params['directory_date'] = str(directory_date)
+        run = _ProcessingRun(self, sample, params, None, directory, None, self.progress_callback)
+        # L'aperçu n'alimente ni le cache ni l'historique, et reste en mémoire (échantillon)
+        run.result_cache = None
+        run.stats_history = None
+        run.fingerprint_store = None
+        run.backend = None
+        result = run.execute()
+
+        # Les lignes de la fusion suivent l'ordre des lignes SM puis des autres : le poids suit chaque ligne
+        processed_data = result.processed_data
+        weights = processed_data.pop(PREVIEW_WEIGHT_COLUMN)
+        stats = self.stats_planner.build_tables(
+            list(processed_data.columns),
+            self.stats_planner.execute(processed_data, type_column, weights=weights),
+            type_column
         )
-        final_sm_stats_df.drop(columns=['is_cic'], inplace=True)
+        self._add_confidence_intervals(stats)
+        stats['cube'] = None
+        stats['preview'] = {
+            'sample_rows': len(sample),
+            'total_rows': len(data),
+            'stratified': strata is not None,
+            'seed': seed
+        }
+        params['preview'] = dict(stats['preview'])
+        if dedup_columns is not None:
+            params['dedup_columns'] = list(dedup_columns)
+        timings = dict(result.timings, sampling=sampling_time, total=time.perf_counter() - started)
+        return result._replace(processed_data=processed_data, stats=stats, params=params, timings=timings)
+
+    @staticmethod
+    def _preview_strata(key_values, directory):
+        """Retourne le département de chaque ligne d'après l'annuaire (strates de l'aperçu).
+
+        Les clés ne sont formatées qu'une fois par valeur distincte. Les clés absentes
+        de l'annuaire forment leur propre strate.
 
-        # Stockage
-        self.stats['sm_summary_table'] = final_sm_stats_df # Stocker le DF final SM
-        print(f"Statistiques SM (avec synthèses GGD) générées avec {len(final_sm_stats_df)} lignes.")
+        Returns:
+            numpy.ndarray: Département de chaque ligne (None si inconnu), ou None si
+                l'annuaire n'a pas de colonne département
+        """
+        directory_data = directory.get_directory()
+        if directory_data is None or DEPT_COLUMN not in directory_data.columns or 'key' not in directory_data.columns:
+            return None
+        codes, uniques = pd.factorize(key_values.astype(str))
+        formatted = pd.Series(uniques).apply(format_gn_value).to_numpy()
+        lookup = directory_data
+        key_index = directory.get_key_index()
+        if key_index is None or len(key_index) != len(directory_data):
+            lookup = directory_data.drop_duplicates(subset='key').reset_index(drop=True)
+            key_index = pd.Index(lookup['key'])
+        rows = np.asarray(key_index.get_indexer(formatted), dtype=np.int64)
+        departments = lookup[DEPT_COLUMN].to_numpy(dtype=object)
+        unique_strata = np.where(rows >= 0, departments[np.maximum(rows, 0)], None)
+        return unique_strata[codes]
+
+    def _add_confidence_intervals(self, stats):
+        """Arrondit les comptages estimés et ajoute l'intervalle de confiance des pourcentages."""
+        labels = self.stats_planner.spec.labels
+        for table in self.stats_planner.spec.tables:
+            table_df = stats.get(table['name'])
+            if not isinstance(table_df, pd.DataFrame) or table_df.empty:
+                continue
+            for name in self.stats_planner.spec.measures:
+                column = labels.get(name, name)
+                table_df[column] = table_df[column].round().astype(np.int64)
+            sample_rows = table_df[labels.get(SAMPLE_ROWS_COLUMN, SAMPLE_ROWS_COLUMN)].to_numpy()
+            for name, derived in self.stats_planner.spec.derived_measures.items():
+                column = labels.get(name, name)
+                scale = derived.get('scale', 1)
+                low, high = wilson_interval(table_df[column].to_numpy(dtype=float) / scale, sample_rows)
+                decimals = derived.get('decimals', 2)
+                position = table_df.columns.get_loc(column) + 1
+                table_df.insert(position, f"{column} {CONFIDENCE_LOW_SUFFIX}", np.round(low * scale, decimals))
+                table_df.insert(position + 1, f"{column} {CONFIDENCE_HIGH_SUFFIX}", np.round(high * scale, decimals))
+
+    def set_data(self, data, source_path: Optional[str] = None, data_fingerprint: Optional[str] = None):
+        """Définit les données à traiter.
+
+        Args:
+            data (pandas.DataFrame): Les données à traiter
+            source_path (str, optional): Chemin du fichier d'origine des données
+            data_fingerprint (str, optional): Empreinte déjà connue des données (ex: session
+                restaurée), évite de la recalculer au prochain traitement
+        """
+        self.data = data
+        self.processed_data = None
+        self.stats = None
+        self.last_result = None
+        self.source_path = source_path
+        if not data_fingerprint and source_path and os.path.isfile(source_path):
+            # Empreinte du fichier prise à l'import : si le fichier est remplacé avant le
+            # traitement, le résultat des données en mémoire ne doit pas être mis en cache
+            # sous l'empreinte du nouveau contenu
+            data_fingerprint = ResultCache.hash_file(source_path)
+        self._stage_cache = {'data_fingerprint': data_fingerprint} if data_fingerprint else {}
+        # Réinitialiser aussi les paramètres
+        self.processing_params = {}
+
+    @property
+    def data_fingerprint(self) -> Optional[str]:
+        """Empreinte des données courantes si elle a déjà été calculée (None sinon)."""
+        return self._stage_cache.get('data_fingerprint')
+
+    def set_result(self, result: ProcessingResult):
+        """Définit le résultat courant sans traitement (ex: session restaurée).
+
+        Args:
+            result (ProcessingResult): Résultat d'un traitement des données courantes
+        """
+        self.last_result = result
+        self.processed_data = result.processed_data
+        self.stats = result.stats
+        self.processing_params = dict(result.params)
+
+    def has_data(self):
+        """Vérifie si des données sont disponibles.
+
+        Returns:
+            bool: True si des données sont disponibles, False sinon
+        """
+        return self.data is not None and not self.data.empty
+
+    def get_data(self):
+        """Retourne les données actuelles.
+
+        Returns:
+            pandas.DataFrame: Les données actuelles
+        """
+        return self.data if self.has_data() else pd.DataFrame()
 
+    def process_with_directory(self, directory_column: str,
+                               type_column: Optional[str] = None,
+                               columns_to_delete: Optional[List[str]] = None,
+                               directory_date=None, dedup_columns: Optional[List[str]] = None):
+        """Traite les données en utilisant l'annuaire, avec fusion conditionnelle basée sur le type.
+
+        Adaptateur de `run` pour l'interface : le résultat est conservé dans le processeur.
+
+        Args:
+            directory_column (str): Nom de la colonne contenant la clé pour la fusion.
+            type_column (str, optional): Nom de la colonne contenant le type de signalisation (ex: 'SM').
+            columns_to_delete (list[str], optional): Colonnes à supprimer des données AVANT fusion.
+            directory_date (str | datetime.date, optional): Date de l'annuaire à utiliser
+                (par défaut, l'annuaire courant).
+            dedup_columns (list[str], optional): Colonnes du dédoublonnage (voir `run`)
+        """
+        try:
+            result = self.run(
+                self.data, directory_column, type_column=type_column,
+                columns_to_delete=columns_to_delete, source_path=self.source_path,
+                directory_date=directory_date, dedup_columns=dedup_columns,
+                progress_callback=self.progress_callback, stage_cache=self._stage_cache
+            )
+        except ValueError as e:
+            print(f"Erreur: {e}")
+            self.set_error(str(e))
+            return False
+
+        self.set_result(result)
+        return True
+
+    def set_error(self, message: str):
+        """Enregistre l'échec d'un traitement (message reporté sur chaque table de statistiques).
+
+        Args:
+            message (str): Message d'erreur
+        """
+        self.last_result = None
+        self.processed_data = None # Assurer que les données traitées sont vides
+        self.stats = {table.get('error_key', table['name'] + '_error'): message
+                      for table in self.stats_planner.spec.tables}
 
     def has_stats(self):
         """Vérifie si au moins un type de statistiques est disponible."""
         # Vérifie si self.stats est un dictionnaire et contient au moins une table de résumé non vide
-        return isinstance(self.stats, dict) and (
-            ('global_summary_table' in self.stats and not self.stats['global_summary_table'].empty) or
-            ('sm_summary_table' in self.stats and not self.stats['sm_summary_table'].empty)
+        return isinstance(self.stats, dict) and any(
+            isinstance(self.stats.get(table['name']), pd.DataFrame) and not self.stats[table['name']].empty
+            for table in self.stats_planner.spec.tables
         )
-    
+
     def get_stats(self):
         """Retourne le dictionnaire complet des statistiques actuelles."""
-        return self.stats if isinstance(self.stats, dict) else {} 
\ No newline at end of file
+        return self.stats if isinstance(self.stats, dict) else {}
+
+    def get_combined_stats(self, stats: Optional[dict] = None):
+        """Assemble les tables de statistiques dans un tableau unique.
+
+        Chaque ligne est précédée d'une colonne 'Type Statistique' contenant le titre de
+        sa table dans la spécification.
+
+        Args:
+            stats (dict, optional): Statistiques d'un `ProcessingResult`.
+                Par défaut, celles du dernier traitement.
+
+        Returns:
+            tuple: (tableau combiné, liste des messages d'erreur)
+        """
+        stats_data = stats if stats is not None else self.get_stats()
+        error_messages = []
+        valid_dfs = []
+        # Une table par entrée de la spécification des statistiques
+        for table in self.stats_planner.spec.tables:
+            title = table.get('title', table['name'])
+            error = stats_data.get(table.get('error_key', table['name'] + '_error'))
+            if error: error_messages.append(f"Erreur {title}: {error}")
+            table_df = stats_data.get(table['name'])
+            if isinstance(table_df, pd.DataFrame) and not table_df.empty:
+                table_df_copy = table_df.copy()
+                table_df_copy['Type Statistique'] = title
+                valid_dfs.append(table_df_copy)
+
+        if not valid_dfs:
+            return pd.DataFrame(), error_messages
+        combined_df = pd.concat(valid_dfs, ignore_index=True)
+        # S'assurer que la colonne 'Type Statistique' est la première
+        cols = ['Type Statistique'] + [col for col in combined_df.columns if col != 'Type Statistique']
+        return combined_df[cols], error_messages
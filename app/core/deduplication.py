@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import os
+import hashlib
+import threading
+import numpy as np
+import pandas as pd
+from typing import Optional, List, NamedTuple
+from core.stats_history import month_of
+
+# Clé des statistiques décrivant le dédoublonnage d'un traitement
+DEDUPLICATION_KEY = 'deduplication'
+FINGERPRINT_FILE_EXTENSION = '.npy'
+# Nombre de mois d'empreintes conservés (les plus récents)
+MAX_FINGERPRINT_MONTHS = 12
+
+
+def row_fingerprints(data: pd.DataFrame, columns: Optional[List[str]] = None) -> np.ndarray:
+    """Calcule l'empreinte 64 bits de chaque ligne sur les colonnes choisies (vectorisé).
+
+    Args:
+        data (pandas.DataFrame): Données importées
+        columns (list[str], optional): Colonnes comparées (par défaut, toutes)
+
+    Returns:
+        numpy.ndarray: Empreintes (uint64), une par ligne
+
+    Raises:
+        ValueError: Si une colonne demandée n'existe pas
+    """
+    if columns:
+        missing = [col for col in columns if col not in data.columns]
+        if missing:
+            raise ValueError(f"Colonnes de dédoublonnage absentes des données: {', '.join(missing)}")
+        data = data[list(columns)]
+    return pd.util.hash_pandas_object(data, index=False).to_numpy(dtype=np.uint64)
+
+
+class DedupResult(NamedTuple):
+    """Résultat du dédoublonnage d'un jeu de données."""
+    positions: np.ndarray # Positions des lignes conservées (ordre d'origine)
+    fingerprints: np.ndarray # Empreintes distinctes des lignes conservées, triées
+    duplicate_rows: int # Copies supplémentaires, dans le jeu de données, de lignes conservées
+    previously_seen_rows: int # Lignes (copies comprises) déjà présentes dans un traitement précédent
+
+    def summary(self, total_rows: int) -> dict:
+        """Retourne le bilan du dédoublonnage (enregistré dans les statistiques)."""
+        return {
+            'rows_in': int(total_rows),
+            'duplicate_rows': self.duplicate_rows,
+            'previously_seen_rows': self.previously_seen_rows,
+            'rows_out': int(len(self.positions))
+        }
+
+
+def deduplicate(data: pd.DataFrame, columns: Optional[List[str]] = None,
+                store: Optional['FingerprintStore'] = None, source_id: Optional[str] = None) -> DedupResult:
+    """Repère les lignes en double, dans les données et par rapport aux traitements précédents.
+
+    La première occurrence de chaque empreinte est conservée. Si un magasin
+    d'empreintes est fourni, les lignes dont l'empreinte a déjà été enregistrée par
+    le traitement d'un autre jeu de données sont également écartées.
+
+    Seules les empreintes des lignes conservées sont retournées pour enregistrement :
+    les segments des sources restent disjoints, et le retraitement d'une source ne
+    perd pas les lignes qu'une source ultérieure avait écartées à cause d'elle. Le
+    bilan vérifie lignes lues = doublons + déjà traitées + conservées.
+
+    Args:
+        data (pandas.DataFrame): Données importées
+        columns (list[str], optional): Colonnes comparées (par défaut, toutes)
+        store (FingerprintStore, optional): Empreintes des traitements précédents
+        source_id (str, optional): Identifiant du jeu de données (ses propres empreintes
+            enregistrées sont ignorées : un retraitement du même fichier ne perd pas de lignes)
+
+    Returns:
+        DedupResult: Lignes conservées, empreintes et bilan
+    """
+    hashes = row_fingerprints(data, columns)
+    unique_hashes, first_rows = np.unique(hashes, return_index=True)
+    seen = np.zeros(len(unique_hashes), dtype=bool)
+    if store is not None:
+        seen = store.contains(unique_hashes, exclude_source=source_id)
+    kept_first = first_rows[~seen]
+    previously_seen = int(np.isin(hashes, unique_hashes[seen], assume_unique=False).sum()) if seen.any() else 0
+    return DedupResult(
+        positions=np.sort(kept_first),
+        fingerprints=unique_hashes[~seen],
+        # Doublons comptés parmi les lignes non encore traitées (pas de double compte)
+        duplicate_rows=int(len(hashes) - previously_seen - len(kept_first)),
+        previously_seen_rows=previously_seen
+    )
+
+
+class FingerprintStore:
+    """Empreintes des lignes déjà traitées, conservées d'un traitement à l'autre.
+
+    Chaque jeu de données traité enregistre les empreintes distinctes des lignes qu'il
+    a conservées (les segments des sources sont disjoints), triées, dans un
+    segment numpy (`AAAA-MM_<source>.npy`). La recherche projette les segments en
+    mémoire et procède par dichotomie : la mémoire utilisée ne dépend que du jeu de
+    données en cours, et seuls les `max_months` mois les plus récents sont conservés.
+    """
+
+    def __init__(self, store_dir: Optional[str] = None, max_months: int = MAX_FINGERPRINT_MONTHS):
+        """Initialise le magasin d'empreintes.
+
+        Args:
+            store_dir (str, optional): Répertoire des segments d'empreintes
+            max_months (int, optional): Nombre de mois conservés
+        """
+        self.store_dir = store_dir or os.path.join('app', 'resources', 'dedup')
+        self.max_months = max_months
+
+    def segments(self) -> list:
+        """Retourne les segments enregistrés, du plus récent au plus ancien.
+
+        Returns:
+            list: Tuples (mois, identifiant de source, chemin)
+        """
+        if not os.path.isdir(self.store_dir):
+            return []
+        segments = []
+        for name in os.listdir(self.store_dir):
+            stem, extension = os.path.splitext(name)
+            month, _, source_id = stem.partition('_')
+            if extension == FINGERPRINT_FILE_EXTENSION and source_id:
+                segments.append((month, source_id, os.path.join(self.store_dir, name)))
+        segments.sort(key=lambda segment: (segment[0], os.path.getmtime(segment[2])), reverse=True)
+        return segments
+
+    def signature(self, exclude_source: Optional[str] = None) -> str:
+        """Empreinte de l'état du magasin vu par un jeu de données (clé du cache de résultats)."""
+        names = sorted(os.path.basename(path) for _, source_id, path in self.segments()
+                       if source_id != exclude_source)
+        return hashlib.sha256('\n'.join(names).encode('utf-8')).hexdigest()
+
+    def contains(self, fingerprints: np.ndarray, exclude_source: Optional[str] = None) -> np.ndarray:
+        """Indique pour chaque empreinte si elle a déjà été enregistrée.
+
+        Args:
+            fingerprints (numpy.ndarray): Empreintes recherchées (uint64)
+            exclude_source (str, optional): Source dont les segments sont ignorés
+
+        Returns:
+            numpy.ndarray: Masque booléen des empreintes déjà vues
+        """
+        fingerprints = np.asarray(fingerprints, dtype=np.uint64)
+        seen = np.zeros(len(fingerprints), dtype=bool)
+        for _, source_id, path in self.segments():
+            if source_id == exclude_source:
+                continue
+            pending = np.flatnonzero(~seen)
+            if len(pending) == 0:
+                break
+            try:
+                stored = np.load(path, mmap_mode='r')
+            except (OSError, ValueError) as e:
+                print(f"Segment d'empreintes illisible, ignoré ({path}): {e}")
+                continue
+            if len(stored) == 0:
+                continue
+            candidates = fingerprints[pending]
+            positions = np.minimum(np.searchsorted(stored, candidates), len(stored) - 1)
+            seen[pending[stored[positions] == candidates]] = True
+        return seen
+
+    def record(self, fingerprints: np.ndarray, source_id: str, month=None):
+        """Enregistre les empreintes des lignes conservées d'un jeu de données (écriture atomique).
+
+        Le segment précédent de la même source est remplacé, puis les mois au-delà
+        des `max_months` plus récents sont supprimés.
+
+        Args:
+            fingerprints (numpy.ndarray): Empreintes distinctes et triées (uint64)
+            source_id (str): Identifiant du jeu de données
+            month (str | datetime.date, optional): Mois du traitement (par défaut, le mois courant)
+        """
+        month = month_of(month)
+        os.makedirs(self.store_dir, exist_ok=True)
+        path = os.path.join(self.store_dir, f"{month}_{source_id}{FINGERPRINT_FILE_EXTENSION}")
+        # np.save ajoute l'extension .npy si elle est absente du nom
+        tmp_path = f"{path}.{os.getpid()}-{threading.get_ident()}.tmp{FINGERPRINT_FILE_EXTENSION}"
+        np.save(tmp_path, np.asarray(fingerprints, dtype=np.uint64))
+        os.replace(tmp_path, path)
+
+        segments = self.segments()
+        kept_months = sorted({segment[0] for segment in segments}, reverse=True)[:self.max_months]
+        for segment_month, segment_source, segment_path in segments:
+            if segment_path == path:
+                continue
+            if segment_source == source_id or segment_month not in kept_months:
+                self._remove(segment_path)
+
+    def clear(self):
+        """Supprime toutes les empreintes enregistrées."""
+        for _, _, path in self.segments():
+            self._remove(path)
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass # Segment encore projeté en mémoire (Windows) : supprimé au prochain enregistrement
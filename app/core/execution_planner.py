@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import os
+import re
+import pandas as pd
+from typing import Optional, List, NamedTuple
+from utils.file_handlers import detect_csv_delimiter
+
+try:
+    import psutil
+except ImportError:  # Dépendance optionnelle (mémoire disponible sur les systèmes sans /proc)
+    psutil = None
+
+try:
+    import duckdb
+except ImportError:  # Dépendance optionnelle (mode par blocs)
+    duckdb = None
+
+# Modes d'exécution
+MODE_IN_MEMORY = 'in_memory' # Import complet, traitement pandas dans le processus courant
+MODE_CHUNKED = 'chunked' # Lecture en flux du fichier par DuckDB, débordement sur disque
+MODE_PARTITIONED = 'partitioned' # Import complet, partitions traitées par plusieurs processus
+EXECUTION_MODE_LABELS = {
+    MODE_IN_MEMORY: "en mémoire",
+    MODE_CHUNKED: "par blocs (lecture en flux)",
+    MODE_PARTITIONED: "partitionné multi-processus"
+}
+
+# Lignes lues pour estimer la largeur d'une ligne
+SAMPLE_ROWS = 5000
+# Pic mémoire du traitement en mémoire rapporté aux données importées et fusionnées
+# (clé formatée, masques, concaténations intermédiaires)
+PEAK_MEMORY_FACTOR = 1.5
+# Volume à partir duquel le traitement multi-processus est rentable
+PARTITIONED_MIN_ROWS = 1000000
+# Part de la mémoire disponible utilisée par défaut
+DEFAULT_BUDGET_SHARE = 0.7
+# Budget par défaut si la mémoire disponible ne peut pas être déterminée
+DEFAULT_MEMORY_BUDGET = 2 * 1024 ** 3
+# Mémoire minimale laissée à DuckDB en lecture en flux (tampons de lecture du CSV)
+MIN_STREAMING_MEMORY = 256 * 1024 ** 2
+MEMORY_UNITS = {'': 1024 ** 2, 'K': 1024, 'M': 1024 ** 2, 'G': 1024 ** 3, 'T': 1024 ** 4}
+
+
+def parse_memory_size(value) -> int:
+    """Convertit une taille mémoire ('4GB', '512M', 2048) en octets.
+
+    Un nombre sans unité est exprimé en mégaoctets.
+
+    Raises:
+        ValueError: Si la taille est invalide
+    """
+    if isinstance(value, (int, float)):
+        return int(value * MEMORY_UNITS[''])
+    match = re.fullmatch(r'\s*([0-9]+(?:[.,][0-9]+)?)\s*([KMGT]?)(?:I?B|O)?\s*', str(value), re.IGNORECASE)
+    if not match:
+        raise ValueError(f"Taille mémoire invalide: {value} (exemples: 4GB, 512MB)")
+    return int(float(match.group(1).replace(',', '.')) * MEMORY_UNITS[match.group(2).upper()])
+
+
+def format_memory_size(size: Optional[int]) -> str:
+    """Met en forme une taille mémoire en Mo ou Go."""
+    if size is None:
+        return "inconnue"
+    if size >= 1024 ** 3:
+        return f"{size / 1024 ** 3:.1f} Go"
+    return f"{size / 1024 ** 2:.0f} Mo"
+
+
+def available_memory() -> Optional[int]:
+    """Retourne la mémoire vive disponible en octets (None si elle ne peut pas être déterminée)."""
+    if psutil is not None:
+        return int(psutil.virtual_memory().available)
+    try:
+        with open('/proc/meminfo', 'r') as f:
+            for line in f:
+                if line.startswith('MemAvailable:'):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    try:
+        return os.sysconf('SC_AVPHYS_PAGES') * os.sysconf('SC_PAGE_SIZE')
+    except (AttributeError, ValueError, OSError):
+        return None
+
+
+class ExecutionPlan(NamedTuple):
+    """Mode d'exécution retenu pour un fichier et les éléments de la décision."""
+    mode: str
+    backend: Optional[str] # Moteur à utiliser (None : traitement pandas intégré)
+    columns: Optional[List[str]] # Colonnes à importer (None : toutes)
+    estimated_rows: Optional[int]
+    estimated_peak_bytes: Optional[int]
+    memory_budget: int
+    available_memory: Optional[int]
+    cores: int
+    reasons: List[str]
+
+    def to_dict(self) -> dict:
+        """Retourne le plan sous forme de dictionnaire sérialisable (rapport d'exécution)."""
+        values = self._asdict()
+        values['columns'] = list(self.columns) if self.columns is not None else None
+        values['reasons'] = list(self.reasons)
+        return values
+
+    def explain(self) -> str:
+        """Explique le choix du mode en une phrase."""
+        return f"Mode d'exécution {EXECUTION_MODE_LABELS[self.mode]} : " + " ; ".join(self.reasons) + "."
+
+
+class ExecutionPlanner:
+    """Choix automatique du mode d'exécution d'un traitement.
+
+    Avant l'import, le planificateur mesure la taille du fichier, la largeur mémoire
+    d'un échantillon de lignes (après suppression des colonnes non conservées) et
+    celle des colonnes ajoutées par l'annuaire, puis estime le pic mémoire du
+    traitement. Selon le budget mémoire et le nombre de cœurs, il retient :
+
+    - le traitement en mémoire si le pic estimé tient dans le budget ;
+    - le traitement partitionné multi-processus pour les gros volumes qui tiennent
+      dans le budget malgré les copies envoyées aux processus ;
+    - la lecture en flux par DuckDB (débordement sur disque, données fusionnées
+      écrites directement dans le fichier d'export) sinon.
+    """
+
+    def __init__(self, memory_budget=None, cores: Optional[int] = None,
+                 partitioned_min_rows: int = PARTITIONED_MIN_ROWS):
+        """Initialise le planificateur.
+
+        Args:
+            memory_budget (str | int, optional): Mémoire utilisable par un traitement
+                ('4GB', '512MB' ou un nombre de Mo). Par défaut, 70 % de la mémoire
+                disponible au moment du traitement.
+            cores (int, optional): Nombre de cœurs utilisables (par défaut, tous)
+            partitioned_min_rows (int, optional): Nombre de lignes à partir duquel le
+                traitement multi-processus est envisagé
+        """
+        self.memory_budget = parse_memory_size(memory_budget) if memory_budget is not None else None
+        self.cores = cores or os.cpu_count() or 1
+        self.partitioned_min_rows = partitioned_min_rows
+
+    def plan(self, source_path: str, directory_column: str, columns_to_delete: Optional[List[str]] = None,
+             type_column: Optional[str] = None, directory_data: Optional[pd.DataFrame] = None,
+             dedup_columns: Optional[List[str]] = None, export_by_department: bool = False) -> ExecutionPlan:
+        """Choisit le mode d'exécution d'un fichier.
+
+        Args:
+            source_path (str): Fichier à traiter
+            directory_column (str): Colonne clé des données
+            columns_to_delete (list[str], optional): Colonnes supprimées avant fusion
+            type_column (str, optional): Colonne du type de signalisation
+            directory_data (pandas.DataFrame, optional): Annuaire (largeur des colonnes ajoutées)
+            dedup_columns (list[str], optional): Dédoublonnage demandé (nécessite un import complet)
+            export_by_department (bool, optional): Export par département demandé (nécessite
+                les données fusionnées en mémoire)
+
+        Returns:
+            ExecutionPlan: Le plan d'exécution
+        """
+        available = available_memory()
+        if self.memory_budget is not None:
+            budget = self.memory_budget
+            budget_origin = "budget configuré"
+        elif available is not None:
+            budget = int(available * DEFAULT_BUDGET_SHARE)
+            budget_origin = f"{int(DEFAULT_BUDGET_SHARE * 100)} % de la mémoire disponible"
+        else:
+            budget = DEFAULT_MEMORY_BUDGET
+            budget_origin = "budget par défaut (mémoire disponible inconnue)"
+        if available is not None and budget > available:
+            budget = available
+            budget_origin = "mémoire disponible, inférieure au budget configuré"
+        reasons = [f"budget mémoire {format_memory_size(budget)} ({budget_origin}), {self.cores} cœur(s)"]
+
+        def make_plan(mode, backend, columns, rows, peak):
+            return ExecutionPlan(mode, backend, columns, rows, peak, budget, available, self.cores, reasons)
+
+        if not source_path.lower().endswith('.csv'):
+            reasons.append("fichier Excel : lecture complète nécessaire")
+            return make_plan(MODE_IN_MEMORY, None, None, None, None)
+
+        # --- Échantillon : largeur disque et mémoire d'une ligne ---
+        file_size = os.path.getsize(source_path)
+        delimiter = detect_csv_delimiter(source_path)
+        sample = pd.read_csv(source_path, sep=delimiter, nrows=SAMPLE_ROWS)
+        with open(source_path, 'rb') as f:
+            header_bytes = len(f.readline())
+            sample_bytes = sum(len(f.readline()) for _ in range(len(sample)))
+        if sample.empty or sample_bytes == 0:
+            reasons.append("fichier sans données")
+            return make_plan(MODE_IN_MEMORY, None, None, 0, 0)
+        estimated_rows = int((file_size - header_bytes) / (sample_bytes / len(sample)))
+
+        protected = {directory_column, type_column}
+        deleted = {col for col in (columns_to_delete or []) if col in sample.columns and col not in protected}
+        # Le dédoublonnage compare les lignes importées : toutes les colonnes sont alors lues
+        columns = None
+        if deleted and dedup_columns is None:
+            columns = [col for col in sample.columns if col not in deleted]
+        projected = sample[columns] if columns is not None else sample
+        row_bytes = projected.memory_usage(index=False, deep=True).sum() / len(sample)
+        added_bytes = 0.0
+        if directory_data is not None and len(directory_data):
+            added = [col for col in directory_data.columns if col != 'key' and col not in projected.columns]
+            added_bytes = directory_data[added].memory_usage(index=False, deep=True).sum() / len(directory_data)
+        peak = int(estimated_rows * (2 * row_bytes + added_bytes) * PEAK_MEMORY_FACTOR)
+        reasons.append(f"{format_memory_size(file_size)} sur disque, ~{estimated_rows} lignes de "
+                       f"{row_bytes:.0f} octets en mémoire" + (f" ({len(deleted)} colonne(s) non importée(s))"
+                                                             if columns is not None else ""))
+        reasons.append(f"pic mémoire estimé {format_memory_size(peak)}")
+
+        if peak <= budget:
+            # Copie des partitions envoyées aux processus et de leurs résultats
+            partitioned_peak = peak + int(estimated_rows * (row_bytes + added_bytes))
+            if self.cores > 1 and estimated_rows >= self.partitioned_min_rows and partitioned_peak <= budget:
+                reasons.append(f"volume suffisant pour répartir le traitement sur {self.cores} processus")
+                return make_plan(MODE_PARTITIONED, 'partitioned', columns, estimated_rows, partitioned_peak)
+            reasons.append("les données tiennent dans le budget")
+            return make_plan(MODE_IN_MEMORY, None, columns, estimated_rows, peak)
+
+        if duckdb is None:
+            reasons.append("budget dépassé mais DuckDB n'est pas installé : traitement en mémoire")
+        elif dedup_columns is not None:
+            reasons.append("budget dépassé mais le dédoublonnage nécessite un import complet : traitement en mémoire")
+        elif export_by_department:
+            reasons.append("budget dépassé mais l'export par département nécessite les données en mémoire : "
+                           "traitement en mémoire")
+        else:
+            reasons.append("budget dépassé : lecture en flux par DuckDB avec débordement sur disque")
+            return make_plan(MODE_CHUNKED, 'duckdb', columns, estimated_rows, peak)
+        return make_plan(MODE_IN_MEMORY, None, columns, estimated_rows, peak)
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import numpy as np
+import pandas as pd
+from typing import Optional
+from utils.directory_manager import format_gn_value
+from core.stats_cube import TYPE_DIMENSION, COUNT_MEASURE
+from core.stats_spec import filter_key
+
+# Entrée du dictionnaire des statistiques contenant les diagnostics de jointure
+JOIN_DIAGNOSTICS_KEY = 'join_diagnostics'
+# Clé produite par le formatage d'une valeur vide ou sans chiffre
+COLLAPSED_KEY = format_gn_value('')
+# Nombre de clés les plus fréquentes conservées
+DEFAULT_TOP_KEYS = 10
+# Libellé des clés absentes ou blanches dans les clés les plus fréquentes
+EMPTY_KEY_LABEL = "(vide)"
+
+
+def _top_values(values, top_n):
+    """Retourne les valeurs les plus fréquentes sous forme de liste [valeur, nombre].
+
+    Les valeurs manquantes ou blanches, principale cause des clés ramenées à
+    GN00000000, sont comptées sous le libellé « (vide) ».
+    """
+    if len(values) == 0:
+        return []
+    values = pd.Series(values, dtype=object)
+    text = values.astype(str)
+    text = text.where(values.notna() & (text.str.strip() != ''), EMPTY_KEY_LABEL)
+    counts = text.value_counts(dropna=False).head(top_n)
+    return [[value, int(count)] for value, count in counts.items()]
+
+
+def join_diagnostics(raw_keys, normalized_key, left_rows, right_rows, top_n: int = DEFAULT_TOP_KEYS) -> dict:
+    """Calcule les diagnostics de la correspondance entre les données et l'annuaire.
+
+    Les diagnostics sont déduits de la correspondance ligne à ligne déjà calculée
+    pour la fusion : aucun parcours supplémentaire de l'annuaire n'est nécessaire.
+
+    Args:
+        raw_keys (pandas.Series): Clés telles qu'importées
+        normalized_key (pandas.Series): Clés formatées (GN + 8 chiffres)
+        left_rows (numpy.ndarray): Positions des lignes de données dans la fusion
+        right_rows (numpy.ndarray): Positions des lignes de l'annuaire (-1 si absente)
+        top_n (int, optional): Nombre de clés les plus fréquentes à conserver
+
+    Returns:
+        dict: Taux de correspondance, clés sans correspondance les plus fréquentes
+            (brutes et formatées) et clés ramenées à GN00000000
+    """
+    rows = len(normalized_key)
+    unmatched = np.zeros(rows, dtype=bool)
+    unmatched[left_rows[right_rows < 0]] = True
+    unmatched_rows = int(unmatched.sum())
+    collapsed = (normalized_key.to_numpy() == COLLAPSED_KEY)
+    raw_values = raw_keys.to_numpy()
+    return {
+        'rows': rows,
+        'matched_rows': rows - unmatched_rows,
+        'unmatched_rows': unmatched_rows,
+        'match_rate': round((rows - unmatched_rows) / rows, 4) if rows else None,
+        # Lignes ajoutées par des clés en double dans l'annuaire
+        'duplicate_match_rows': int(len(left_rows) - rows),
+        'top_unmatched_raw_keys': _top_values(raw_values[unmatched], top_n),
+        'top_unmatched_keys': _top_values(normalized_key.to_numpy()[unmatched], top_n),
+        'collapsed_rows': int(collapsed.sum()),
+        'top_collapsed_raw_keys': _top_values(raw_values[collapsed], top_n)
+    }
+
+
+def grouping_losses(cube, spec, type_column: Optional[str] = None) -> dict:
+    """Nombre de lignes écartées par le regroupement de chaque table de statistiques.
+
+    Une ligne est écartée lorsqu'une des dimensions de la table est vide (le plus
+    souvent faute de correspondance dans l'annuaire). Le calcul utilise les cellules
+    du cube, qui conservent les valeurs manquantes.
+
+    Args:
+        cube (StatsCube): Cube des données traitées
+        spec (StatsSpec): Spécification des tables
+        type_column (str, optional): Colonne type utilisée par les filtres
+
+    Returns:
+        dict: Nom de table -> nombre de lignes écartées (None si non calculable)
+    """
+    losses = {}
+    for table in spec.tables:
+        losses[table['name']] = None
+        if cube is None or not all(dim in cube.dimensions for dim in table['dimensions']):
+            continue
+        cells = cube.cells
+        key = filter_key(table.get('filter'), type_column)
+        if key is not None:
+            column, accepted, ignore_case = key
+            # Le cube conserve le type de signalisation en majuscules
+            if column != type_column or not ignore_case or TYPE_DIMENSION not in cube.dimensions:
+                continue
+            cells = cells[cells[TYPE_DIMENSION].isin(accepted)]
+        dropped = cells[table['dimensions']].isna().any(axis=1)
+        losses[table['name']] = int(cells.loc[dropped, COUNT_MEASURE].sum())
+    return losses
+
+
+def format_diagnostics(diagnostics: dict, spec=None) -> list:
+    """Met en forme les diagnostics de jointure pour un rapport.
+
+    Args:
+        diagnostics (dict): Diagnostics (voir `join_diagnostics` et `grouping_losses`)
+        spec (StatsSpec, optional): Spécification des tables (titres des tables)
+
+    Returns:
+        list[str]: Lignes du rapport
+    """
+    if not diagnostics:
+        return ["Diagnostics de jointure indisponibles."]
+    lines = []
+    if diagnostics.get('rows') is not None:
+        rate = diagnostics['match_rate']
+        lines.append(f"Correspondance avec l'annuaire: {diagnostics['matched_rows']}/{diagnostics['rows']} lignes"
+                     + (f" ({rate * 100:.2f} %)" if rate is not None else ""))
+        if diagnostics['unmatched_rows']:
+            keys = ", ".join(f"{value} ({count})" for value, count in diagnostics['top_unmatched_raw_keys'])
+            lines.append(f"  Clés sans correspondance les plus fréquentes: {keys}")
+        if diagnostics['collapsed_rows']:
+            keys = ", ".join(f"'{value}' ({count})" for value, count in diagnostics['top_collapsed_raw_keys'])
+            lines.append(f"  Lignes dont la clé est ramenée à {COLLAPSED_KEY}: {diagnostics['collapsed_rows']} ({keys})")
+        if diagnostics['duplicate_match_rows']:
+            lines.append(f"  Lignes ajoutées par des clés en double dans l'annuaire: {diagnostics['duplicate_match_rows']}")
+    titles = {table['name']: table.get('title', table['name']) for table in (spec.tables if spec else [])}
+    for name, dropped in (diagnostics.get('grouping_dropped_rows') or {}).items():
+        if dropped:
+            lines.append(f"  Lignes écartées des statistiques {titles.get(name, name)} (dimension vide): {dropped}")
+    return lines
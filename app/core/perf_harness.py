@@ -0,0 +1,500 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Banc de non-régression : sorties de référence et budgets de performance.
+
+Des données synthétiques fixes (annuaire GN, annuaire des matériels, extraction) sont
+générées de façon reproductible puis traitées étape par étape : formatage des clés,
+combinaison des doublons, fusion des annuaires, traitement des données et tables de
+statistiques (globale, SM et lignes GGD). Chaque sortie est comparée à sa référence
+enregistrée (empreinte du CSV ; les tables sont aussi enregistrées en clair), chaque
+moteur d'exécution disponible doit produire exactement les mêmes données et tables,
+le dédoublonnage de deux extractions qui se recouvrent doit conserver toutes les lignes
+distinctes dans l'historique, et la durée et le pic mémoire de chaque étape, mesurés
+sur un volume fixe, doivent rester dans leur budget. Utilisable en ligne de commande depuis la racine du projet :
+
+    PYTHONPATH=app python3 -m core.perf_harness            # contrôle (code de retour 1 si écart)
+    PYTHONPATH=app python3 -m core.perf_harness --update   # enregistre références et budgets
+
+Les budgets sont les mesures enregistrées multipliées par une tolérance : ils dépendent
+de la machine et sont à enregistrer (`--update`) sur celle qui effectue le contrôle,
+après revue d'une modification qui change volontairement les résultats.
+"""
+
+import io
+import os
+import sys
+import json
+import time
+import shutil
+import hashlib
+import argparse
+import tempfile
+import tracemalloc
+import contextlib
+import numpy as np
+import pandas as pd
+from typing import NamedTuple, Optional, List
+from core.backends import get_backend, AVAILABLE_BACKENDS
+
+GOLDEN_DIR = os.path.join('app', 'resources', 'perf_golden')
+GOLDEN_FILE_NAME = 'golden.json'
+SEED = 20240501
+# Volume des sorties de référence (contrôle de parité)
+GOLDEN_ROWS = 5000
+GOLDEN_UNITS = 300
+# Volume des mesures de performance
+PERF_ROWS = 200000
+PERF_UNITS = 17000
+# Budget = mesure de référence x tolérance
+TIME_TOLERANCE = 1.5
+MEMORY_TOLERANCE = 1.25
+# En dessous de cette durée, le budget n'est pas significatif (bruit de mesure)
+MIN_TIME_BUDGET = 0.05
+# Durée retenue : la meilleure de plusieurs exécutions
+TIME_REPEATS = 3
+
+KEY_COLUMN = 'code_service'
+TYPE_COLUMN = 'type_signalisation'
+DIRECTORY_KEY_COLUMN = 'code_unite'
+COLUMNS_TO_DELETE = ['commentaire']
+TABLE_KEYS = ['global_summary_table', 'sm_summary_table']
+# Étapes contrôlées, dans l'ordre d'exécution
+STAGES = ['normalized_keys', 'combine_duplicates', 'merged_directory', 'processed_data', 'stats'] + TABLE_KEYS
+
+
+class HarnessInputs(NamedTuple):
+    """Données synthétiques d'une exécution du banc."""
+    units: pd.DataFrame # Annuaire GN (clés brutes de formats variés, doublons, clés absentes)
+    materials: pd.DataFrame # Annuaire des matériels de saisie
+    extract: pd.DataFrame # Extraction à traiter
+
+
+class StageMeasure(NamedTuple):
+    """Durée et pic mémoire d'une étape."""
+    seconds: float
+    peak_bytes: int
+
+
+# Formats des numéros d'unité dans les fichiers sources (dont flottants entourés d'espaces)
+KEY_TEMPLATES = ('{}', 'GN{:08d}', '{}.0', ' {} ', 'gn-{}', ' {}.0 ')
+# Clés invalides de l'extraction (dont un nombre hors de la plage des entiers 64 bits)
+INVALID_KEYS = ['XX', '', None, '99999999999999999999.0']
+
+
+def _raw_codes(rng, numbers):
+    """Écrit des numéros d'unité sous les formats rencontrés dans les fichiers sources."""
+    formats = rng.integers(0, len(KEY_TEMPLATES), len(numbers))
+    codes = np.empty(len(numbers), dtype=object)
+    for kind, template in enumerate(KEY_TEMPLATES):
+        selected = formats == kind
+        codes[selected] = [template.format(int(n)) for n in numbers[selected]]
+    return codes
+
+
+def synthetic_inputs(rows: int, units: int, seed: int = SEED) -> HarnessInputs:
+    """Génère des données synthétiques reproductibles.
+
+    Les colonnes ont les types produits par l'import d'un CSV (chaînes pour les codes).
+
+    Args:
+        rows (int): Nombre de lignes de l'extraction
+        units (int): Nombre d'unités de l'annuaire GN
+        seed (int, optional): Graine du générateur
+
+    Returns:
+        HarnessInputs: Les annuaires et l'extraction
+    """
+    rng = np.random.default_rng(seed)
+    numbers = np.sort(rng.choice(np.arange(1, 10 ** 6), units, replace=False))
+    departments = np.array([f"{d:02d}" for d in range(1, 96) if d != 20] + ['2A', '2B'], dtype=object)
+    unit_departments = rng.choice(departments, units)
+    kinds = rng.choice(['BTA', 'COB', 'PSIG', 'CIC', 'GGD', 'EDSR'], units, p=[.4, .25, .15, .08, .07, .05])
+    abbreviations = np.array([f"{kind} {dept}-{i}" for i, (kind, dept) in enumerate(zip(kinds, unit_departments))],
+                             dtype=object)
+    units_df = pd.DataFrame({
+        DIRECTORY_KEY_COLUMN: _raw_codes(rng, numbers),
+        'nom_unite': [f"Unité {abbreviation.lower()}" for abbreviation in abbreviations],
+        'abrege_unite': abbreviations,
+        # Départements sur un ou deux caractères (zéro initial parfois absent)
+        'departement': [d.lstrip('0') if rng.random() < .3 else d for d in unit_departments],
+        'type_unite': rng.choice(['038P', '041A', '052C'], units),
+    })
+    # Doublons de clé (valeurs complémentaires) et lignes sans clé
+    duplicates = units_df.sample(frac=.03, random_state=seed).copy()
+    duplicates['nom_unite'] = None
+    duplicates['type_unite'] = 'DOUBLON'
+    missing = units_df.sample(frac=.01, random_state=seed + 1).copy()
+    missing[DIRECTORY_KEY_COLUMN] = None
+    units_df = pd.concat([units_df, duplicates, missing], ignore_index=True)
+
+    equipped = rng.random(units) < .7
+    materials_df = pd.DataFrame({
+        DIRECTORY_KEY_COLUMN: _raw_codes(rng, numbers[equipped]),
+        'type_materiel': rng.choice(['NeoDK', 'Scanner', 'Borne'], int(equipped.sum())),
+        'code_unite_terminal_de_saisie': rng.choice(['20061', '20062', '30001'], int(equipped.sum())),
+    })
+
+    # Extraction : clés connues, inconnues et invalides, types et idpp variés
+    codes = _raw_codes(rng, rng.choice(numbers, rows))
+    unknown = rng.random(rows) < .02
+    codes[unknown] = _raw_codes(rng, rng.integers(10 ** 6, 10 ** 7, int(unknown.sum())))
+    invalid = rng.random(rows) < .005
+    codes[invalid] = rng.choice(np.array(INVALID_KEYS, dtype=object), int(invalid.sum()))
+    idpp = np.where(rng.random(rows) < .4, pd.Series(rng.integers(0, 10 ** 6, rows)).map('ID{}'.format), None)
+    idpp[rng.random(rows) < .01] = '  '
+    extract = pd.DataFrame({
+        KEY_COLUMN: codes,
+        TYPE_COLUMN: rng.choice(['SM', 'sm', 'PV', 'AUTRE'], rows, p=[.45, .05, .4, .1]),
+        'idpp': idpp,
+        'type_materiel': rng.choice(['NeoDK', 'Scanner', 'Borne'], rows),
+        'code_unite_terminal_de_saisie': rng.choice(['20061', '20062', '30001'], rows),
+        'commentaire': 'x',
+    })
+    return HarnessInputs(units_df, materials_df, extract)
+
+
+def frame_text(frame: pd.DataFrame) -> str:
+    """Représentation CSV d'une sortie (base des comparaisons exactes)."""
+    return frame.to_csv(index=False, lineterminator='\n')
+
+
+def frame_summary(frame: pd.DataFrame) -> dict:
+    """Nombre de lignes, colonnes et empreinte d'une sortie."""
+    return {
+        'rows': int(len(frame)),
+        'columns': [str(col) for col in frame.columns],
+        'sha256': hashlib.sha256(frame_text(frame).encode('utf-8')).hexdigest()
+    }
+
+
+class _Pipeline:
+    """Exécute les étapes contrôlées sur des données synthétiques, dans un dossier temporaire."""
+
+    def __init__(self, inputs: HarnessInputs, work_dir: str):
+        from utils.directory_manager import DirectoryManager
+        self.inputs = inputs
+        self.work_dir = work_dir
+        with contextlib.redirect_stdout(io.StringIO()):
+            self.directory_manager = DirectoryManager(os.path.join(work_dir, 'directory.csv'))
+        self.outputs = {}
+
+    def normalized_keys(self):
+        from utils.directory_manager import format_gn_value
+        raw = self.inputs.extract[KEY_COLUMN].astype(str)
+        return pd.DataFrame({'brut': raw, 'cle': raw.apply(format_gn_value)})
+
+    def combine_duplicates(self):
+        units = self.inputs.units.copy()
+        units[DIRECTORY_KEY_COLUMN] = units[DIRECTORY_KEY_COLUMN].apply(self.directory_manager._format_gn_value)
+        return self.directory_manager._combine_duplicate_rows(units, DIRECTORY_KEY_COLUMN)
+
+    def merged_directory(self):
+        if not self.directory_manager.merge_directories(
+                os.path.join(self.work_dir, 'unites.csv'), os.path.join(self.work_dir, 'materiels.csv'),
+                DIRECTORY_KEY_COLUMN, DIRECTORY_KEY_COLUMN, how='left',
+                data1=self.inputs.units, data2=self.inputs.materials, effective_date='2024-01-01'):
+            raise ValueError("Échec de la fusion des annuaires synthétiques.")
+        return self.directory_manager.get_directory()
+
+    def processed_data(self, backend=None):
+        from core.data_processor import DataProcessor
+        processor = DataProcessor(self.directory_manager, backend=backend)
+        result = processor.run(self.inputs.extract, KEY_COLUMN, type_column=TYPE_COLUMN,
+                               columns_to_delete=COLUMNS_TO_DELETE)
+        self.outputs['result'] = result
+        return result.processed_data
+
+    def stats(self):
+        from core.data_processor import DataProcessor
+        planner = DataProcessor(None).stats_planner
+        return planner.compute(self.outputs['processed_data'], TYPE_COLUMN)
+
+    def run(self, stage, measure=False, repeats=TIME_REPEATS):
+        """Exécute une étape et mémorise sa sortie.
+
+        Returns:
+            StageMeasure: Durée (meilleure de `repeats` exécutions) et pic mémoire, si `measure`
+        """
+        compute = getattr(self, stage)
+        best, peak = None, 0
+        for attempt in range(repeats if measure else 1):
+            with contextlib.redirect_stdout(io.StringIO()):
+                if measure and attempt == 0:
+                    tracemalloc.start()
+                started = time.perf_counter()
+                output = compute()
+                elapsed = time.perf_counter() - started
+                if measure and attempt == 0:
+                    peak = tracemalloc.get_traced_memory()[1]
+                    tracemalloc.stop()
+            best = elapsed if best is None else min(best, elapsed)
+        self.outputs[stage] = output
+        return StageMeasure(best, peak) if measure else None
+
+    def stage_frames(self):
+        """Sorties comparées aux références (les tables sont extraites des statistiques)."""
+        frames = {stage: self.outputs[stage] for stage in STAGES if stage in self.outputs and stage != 'stats'}
+        stats = self.outputs['result'].stats
+        for key in TABLE_KEYS:
+            frames[key] = stats.get(key, pd.DataFrame())
+        return frames
+
+
+def run_pipeline(inputs: HarnessInputs, measure: bool = False, repeats: int = TIME_REPEATS):
+    """Exécute toutes les étapes sur les données fournies.
+
+    Args:
+        inputs (HarnessInputs): Données synthétiques
+        measure (bool, optional): Mesurer la durée et le pic mémoire de chaque étape
+        repeats (int, optional): Nombre d'exécutions par étape mesurée
+
+    Returns:
+        tuple: (sorties par étape, mesures par étape)
+    """
+    work_dir = tempfile.mkdtemp(prefix='csf_gaspard_bench_')
+    try:
+        pipeline = _Pipeline(inputs, work_dir)
+        measures = {}
+        for stage in STAGES:
+            if stage in TABLE_KEYS:
+                continue
+            measures[stage] = pipeline.run(stage, measure=measure, repeats=repeats)
+        return pipeline.stage_frames(), measures
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def check_backends(inputs: HarnessInputs, golden: dict, backends: Optional[List[str]] = None) -> List[str]:
+    """Vérifie que chaque moteur produit exactement les données et tables de référence.
+
+    Args:
+        inputs (HarnessInputs): Données synthétiques de référence
+        golden (dict): Empreintes de référence par étape
+        backends (list[str], optional): Moteurs contrôlés (par défaut, tous sauf pandas)
+
+    Returns:
+        list[str]: Écarts constatés
+    """
+    differences = []
+    work_dir = tempfile.mkdtemp(prefix='csf_gaspard_bench_')
+    try:
+        pipeline = _Pipeline(inputs, work_dir)
+        pipeline.run('merged_directory')
+        for name in backends or [b for b in AVAILABLE_BACKENDS if b != 'pandas']:
+            try:
+                options = {'min_rows_per_worker': 1000} if name == 'partitioned' else {}
+                backend = get_backend(name, **options)
+            except ImportError as e:
+                print(f"[{name}] ignoré : {e}")
+                continue
+            with contextlib.redirect_stdout(io.StringIO()):
+                processed = pipeline.processed_data(backend=backend)
+            frames = {'processed_data': processed}
+            frames.update({key: pipeline.outputs['result'].stats.get(key, pd.DataFrame()) for key in TABLE_KEYS})
+            found = [f"[{name}] {difference}" for difference in compare_to_golden(frames, golden)]
+            print(f"[{name}] " + ("ÉCART avec les références" if found else "identique aux références"))
+            differences += found
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    return differences
+
+
+def check_deduplication(inputs: HarnessInputs) -> List[str]:
+    """Vérifie le dédoublonnage de deux extractions qui se recouvrent (A, B, puis A retraité).
+
+    Après chaque traitement, le bilan doit vérifier lignes lues = doublons + déjà
+    traitées + conservées, et le total du mois dans l'historique doit égaler celui du
+    traitement des lignes distinctes de toutes les extractions déjà vues : le
+    retraitement de A ne doit pas perdre les lignes communes avec B.
+
+    Args:
+        inputs (HarnessInputs): Données synthétiques de référence
+
+    Returns:
+        list[str]: Écarts constatés
+    """
+    from core.data_processor import DataProcessor
+    from core.deduplication import DEDUPLICATION_KEY, FingerprintStore
+    from core.stats_history import StatsHistory
+    from core.stats_cube import COUNT_MEASURE
+    if not StatsHistory.is_available():
+        print("[dédoublonnage] ignoré : pyarrow n'est pas installé.")
+        return []
+    extract = inputs.extract
+    third = len(extract) // 3
+    sources = {'A': extract.iloc[:2 * third].reset_index(drop=True),
+               'B': extract.iloc[third:].reset_index(drop=True)}
+    month = '2024-06-01'
+    differences = []
+    work_dir = tempfile.mkdtemp(prefix='csf_gaspard_bench_')
+    try:
+        pipeline = _Pipeline(inputs, work_dir)
+        pipeline.run('merged_directory')
+        history = StatsHistory(os.path.join(work_dir, 'history'))
+        store = FingerprintStore(os.path.join(work_dir, 'dedup'))
+        processed = []
+        for name in ('A', 'B', 'A'):
+            data = sources[name]
+            with contextlib.redirect_stdout(io.StringIO()):
+                result = DataProcessor(pipeline.directory_manager, stats_history=history,
+                                       fingerprint_store=store).run(
+                    data, KEY_COLUMN, type_column=TYPE_COLUMN, columns_to_delete=COLUMNS_TO_DELETE,
+                    directory_date=month, dedup_columns=[])
+            summary = result.stats[DEDUPLICATION_KEY]
+            if summary['rows_in'] != summary['duplicate_rows'] + summary['previously_seen_rows'] + summary['rows_out']:
+                differences.append(f"dédoublonnage {name}: bilan incohérent {summary}")
+            processed.append(data)
+            # Référence : lignes distinctes des extractions vues, traitées sans magasin d'empreintes
+            with contextlib.redirect_stdout(io.StringIO()):
+                expected = DataProcessor(pipeline.directory_manager).run(
+                    pd.concat(processed, ignore_index=True), KEY_COLUMN, type_column=TYPE_COLUMN,
+                    columns_to_delete=COLUMNS_TO_DELETE, directory_date=month, dedup_columns=[])
+            expected_rows = int(expected.stats['cube'].cells[COUNT_MEASURE].sum())
+            recorded_rows = int(history.trend()[COUNT_MEASURE].sum())
+            if recorded_rows != expected_rows:
+                differences.append(f"dédoublonnage après {name}: {recorded_rows} lignes dans l'historique "
+                                   f"au lieu de {expected_rows}")
+        print("[dédoublonnage] " + ("ÉCART" if differences else "historique et bilans cohérents (A, B, A)"))
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    return differences
+
+
+def compare_to_golden(frames: dict, golden: dict, golden_dir: Optional[str] = None) -> List[str]:
+    """Compare des sorties à leurs références.
+
+    Args:
+        frames (dict): Sorties par étape
+        golden (dict): Références par étape (voir `frame_summary`)
+        golden_dir (str, optional): Dossier des tables de référence en clair (première
+            ligne différente indiquée en cas d'écart)
+
+    Returns:
+        list[str]: Écarts constatés
+    """
+    differences = []
+    for stage, frame in frames.items():
+        expected = golden.get(stage)
+        if expected is None:
+            differences.append(f"{stage}: aucune référence enregistrée (--update)")
+            continue
+        actual = frame_summary(frame)
+        if actual == expected:
+            continue
+        if actual['columns'] != expected['columns']:
+            differences.append(f"{stage}: colonnes {actual['columns']} != {expected['columns']}")
+        elif actual['rows'] != expected['rows']:
+            differences.append(f"{stage}: {actual['rows']} lignes au lieu de {expected['rows']}")
+        else:
+            detail = ""
+            table_path = os.path.join(golden_dir, f"{stage}.csv") if golden_dir else None
+            if table_path and os.path.exists(table_path):
+                with open(table_path, 'r', encoding='utf-8', newline='') as f:
+                    expected_lines = f.read().split('\n')
+                for number, (line, reference) in enumerate(zip(frame_text(frame).split('\n'), expected_lines)):
+                    if line != reference:
+                        detail = f" (ligne {number} : {line!r} au lieu de {reference!r})"
+                        break
+            differences.append(f"{stage}: contenu différent de la référence{detail}")
+    return differences
+
+
+def check_budgets(measures: dict, budgets: dict) -> List[str]:
+    """Compare les mesures de chaque étape à leur budget.
+
+    Args:
+        measures (dict): Mesures par étape (StageMeasure)
+        budgets (dict): Mesures de référence par étape ('seconds', 'peak_bytes')
+
+    Returns:
+        list[str]: Dépassements constatés
+    """
+    exceeded = []
+    for stage, measure in measures.items():
+        budget = budgets.get(stage)
+        if budget is None:
+            exceeded.append(f"{stage}: aucun budget enregistré (--update)")
+            continue
+        max_seconds = max(budget['seconds'] * TIME_TOLERANCE, MIN_TIME_BUDGET)
+        max_bytes = budget['peak_bytes'] * MEMORY_TOLERANCE
+        if measure.seconds > max_seconds:
+            exceeded.append(f"{stage}: {measure.seconds:.3f} s pour un budget de {max_seconds:.3f} s "
+                            f"(référence {budget['seconds']:.3f} s)")
+        if measure.peak_bytes > max_bytes:
+            exceeded.append(f"{stage}: pic mémoire {measure.peak_bytes / 1024 ** 2:.1f} Mo pour un budget de "
+                            f"{max_bytes / 1024 ** 2:.1f} Mo")
+    return exceeded
+
+
+def save_golden(frames: dict, measures: dict, golden_dir: str = GOLDEN_DIR):
+    """Enregistre les références, les tables en clair et les budgets (écriture atomique)."""
+    os.makedirs(golden_dir, exist_ok=True)
+    for key in TABLE_KEYS:
+        table_path = os.path.join(golden_dir, f"{key}.csv")
+        with open(table_path + '.tmp', 'w', encoding='utf-8', newline='') as f:
+            f.write(frame_text(frames[key]))
+        os.replace(table_path + '.tmp', table_path)
+    golden = {
+        'seed': SEED,
+        'golden_size': {'rows': GOLDEN_ROWS, 'units': GOLDEN_UNITS},
+        'perf_size': {'rows': PERF_ROWS, 'units': PERF_UNITS},
+        'outputs': {stage: frame_summary(frame) for stage, frame in frames.items()},
+        'budgets': {stage: {'seconds': round(measure.seconds, 4), 'peak_bytes': int(measure.peak_bytes)}
+                    for stage, measure in measures.items()}
+    }
+    path = os.path.join(golden_dir, GOLDEN_FILE_NAME)
+    with open(path + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump(golden, f, ensure_ascii=False, indent=2)
+    os.replace(path + '.tmp', path)
+
+
+def main(argv=None):
+    """Point d'entrée en ligne de commande du banc de non-régression."""
+    parser = argparse.ArgumentParser(description="Banc de non-régression : sorties de référence et budgets")
+    parser.add_argument('--update', action='store_true',
+                        help="Enregistre les sorties de référence et les budgets mesurés sur cette machine")
+    parser.add_argument('--golden-dir', default=GOLDEN_DIR, help=f"Dossier des références (défaut: {GOLDEN_DIR})")
+    parser.add_argument('--backends', nargs='*', default=None,
+                        help="Moteurs comparés aux références (défaut: tous sauf pandas)")
+    parser.add_argument('--skip-perf', action='store_true', help="Contrôle des sorties uniquement")
+    args = parser.parse_args(argv)
+
+    golden_inputs = synthetic_inputs(GOLDEN_ROWS, GOLDEN_UNITS)
+    frames, _ = run_pipeline(golden_inputs)
+    measures = {}
+    if not args.skip_perf or args.update:
+        print(f"Mesures sur {PERF_ROWS} lignes et {PERF_UNITS} unités...")
+        _, measures = run_pipeline(synthetic_inputs(PERF_ROWS, PERF_UNITS), measure=True)
+        for stage, measure in measures.items():
+            print(f"  {stage}: {measure.seconds:.3f} s, pic mémoire {measure.peak_bytes / 1024 ** 2:.1f} Mo")
+
+    if args.update:
+        save_golden(frames, measures, args.golden_dir)
+        print(f"Références et budgets enregistrés dans {args.golden_dir}.")
+        return 0
+
+    path = os.path.join(args.golden_dir, GOLDEN_FILE_NAME)
+    if not os.path.exists(path):
+        print(f"Références introuvables ({path}) : lancer d'abord avec --update.")
+        return 1
+    with open(path, 'r', encoding='utf-8') as f:
+        golden = json.load(f)
+
+    problems = compare_to_golden(frames, golden['outputs'], args.golden_dir)
+    problems += check_backends(golden_inputs, golden['outputs'], args.backends)
+    problems += check_deduplication(golden_inputs)
+    if measures:
+        problems += check_budgets(measures, golden.get('budgets', {}))
+    if problems:
+        print("ÉCHEC du banc de non-régression :")
+        for problem in problems:
+            print(f"  - {problem}")
+        return 1
+    print("Sorties identiques aux références" + (", budgets respectés." if measures else "."))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import os
+import time
+import uuid
+import shutil
+import threading
+import multiprocessing
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Optional, List
+from core.arrow_results import write_result, read_result
+from utils.arrow_files import require_pyarrow, write_frame, read_frame
+from core.data_processor import DataProcessor
+from core.stats_history import default_stats_history
+from core.deduplication import FingerprintStore
+from utils.directory_manager import DirectoryManager
+from utils.result_cache import ResultCache
+
+INPUT_FILE_NAME = 'donnees.arrow'
+
+# Processeur du processus de travail (créé au premier traitement)
+_worker_processor = None
+# Annuaires partagés rattachés dans le processus de travail (fichier -> instantané)
+_attached_directories = {}
+MAX_ATTACHED_DIRECTORIES = 2
+
+
+def _attach_directory(shared_directory):
+    """Rattache l'annuaire partagé (projection en mémoire, une fois par version)."""
+    snapshot = _attached_directories.get(shared_directory.data_path)
+    if snapshot is None:
+        snapshot = shared_directory.attach()
+        _attached_directories[shared_directory.data_path] = snapshot
+        while len(_attached_directories) > MAX_ATTACHED_DIRECTORIES:
+            del _attached_directories[next(iter(_attached_directories))]
+    return snapshot
+
+
+def _process_in_worker(exchange_dir, job_dir, input_file, params, source_path, data_fingerprint, shared_directory):
+    """Traite un jeu de données dans le processus de travail.
+
+    Les données sont projetées en mémoire depuis le fichier d'échange et le résultat
+    y est écrit au format Arrow IPC : seule sa description transite par le canal du
+    pool de processus.
+
+    Returns:
+        dict: Description du résultat (voir `write_result`), ou {'error': message}
+    """
+    global _worker_processor
+    if _worker_processor is None:
+        # L'annuaire est transmis avec chaque traitement : pas de gestionnaire dans ce processus
+        _worker_processor = DataProcessor(None, result_cache=ResultCache(), stats_history=default_stats_history(),
+                                          fingerprint_store=FingerprintStore())
+    data = read_frame(os.path.join(exchange_dir, input_file))
+    stage_cache = {'data_fingerprint': data_fingerprint} if data_fingerprint else None
+    try:
+        result = _worker_processor.run(data, source_path=source_path, directory=_attach_directory(shared_directory),
+                                       stage_cache=stage_cache, **params)
+    except ValueError as e:
+        return {'error': str(e)}
+    started = time.perf_counter()
+    os.makedirs(job_dir, exist_ok=True)
+    entry = write_result(result, job_dir, 'resultat')
+    entry['timings']['transfer_write'] = time.perf_counter() - started
+    return entry
+
+
+class ProcessWorker:
+    """Exécution des traitements dans un processus séparé, sans copie du résultat.
+
+    L'interface reste réactive pendant le traitement. Les données importées et le
+    résultat sont échangés par des fichiers Arrow IPC projetés en mémoire (mmap) :
+    l'interface lit les données traitées et les statistiques directement dans les
+    pages du fichier écrit par le processus de travail, sans sérialisation pickle.
+    """
+
+    def __init__(self, directory_manager: DirectoryManager, exchange_dir: Optional[str] = None):
+        """Initialise l'exécution hors processus.
+
+        Args:
+            directory_manager (DirectoryManager): Gestionnaire d'annuaire de l'interface
+            exchange_dir (str, optional): Dossier des fichiers d'échange
+        """
+        require_pyarrow()
+        self.directory_manager = directory_manager
+        self.exchange_dir = exchange_dir or os.path.join('app', 'resources', 'exchange')
+        # Processus démarré à neuf (spawn) : pas de copie de l'état de l'interface Qt
+        self.executor = ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context('spawn'))
+        self._input = None # (données, nom du fichier d'échange)
+        self._current_job_dir = None
+        self._lock = threading.Lock()
+        os.makedirs(self.exchange_dir, exist_ok=True)
+
+    def _input_file(self, data):
+        """Écrit les données dans un fichier d'échange (une seule fois par jeu de données)."""
+        with self._lock:
+            if self._input is not None and self._input[0] is data:
+                return self._input[1]
+            file_name = f"{uuid.uuid4().hex[:12]}_{INPUT_FILE_NAME}"
+            write_frame(data, os.path.join(self.exchange_dir, file_name))
+            previous = self._input
+            self._input = (data, file_name)
+        if previous is not None:
+            self._remove(os.path.join(self.exchange_dir, previous[1]))
+        return file_name
+
+    def submit(self, data, directory_column: str, type_column: Optional[str] = None,
+               columns_to_delete: Optional[List[str]] = None, directory_date=None,
+               source_path: Optional[str] = None, data_fingerprint: Optional[str] = None,
+               dedup_columns: Optional[List[str]] = None) -> Future:
+        """Lance le traitement d'un jeu de données dans le processus de travail.
+
+        Args:
+            data (pandas.DataFrame): Les données à traiter
+            directory_column (str): Colonne clé des données
+            type_column (str, optional): Colonne du type de signalisation
+            columns_to_delete (list[str], optional): Colonnes à supprimer avant fusion
+            directory_date (str | datetime.date, optional): Date de l'annuaire à utiliser
+            source_path (str, optional): Fichier d'origine des données (empreinte du cache)
+            data_fingerprint (str, optional): Empreinte déjà connue des données
+            dedup_columns (list[str], optional): Colonnes du dédoublonnage (voir `DataProcessor.run`)
+
+        Returns:
+            concurrent.futures.Future: Résultat (`ProcessingResult`) projeté en mémoire ;
+                l'exception `ValueError` si le traitement échoue
+        """
+        params = {
+            'directory_column': directory_column,
+            'type_column': type_column,
+            'columns_to_delete': columns_to_delete,
+            'directory_date': directory_date,
+            'dedup_columns': dedup_columns
+        }
+        # Annuaire exporté une fois par version, projeté en mémoire par le processus de travail
+        shared_directory = self.directory_manager.export_shared(as_of=directory_date)
+        input_file = self._input_file(data)
+        job_dir = os.path.join(self.exchange_dir, uuid.uuid4().hex[:12])
+        started = time.perf_counter()
+        inner = self.executor.submit(_process_in_worker, self.exchange_dir, job_dir, input_file,
+                                     params, source_path, data_fingerprint, shared_directory)
+        outer = Future()
+
+        def _on_done(done):
+            try:
+                entry = done.result()
+                if 'error' in entry:
+                    raise ValueError(entry['error'])
+                result = read_result(entry, job_dir)
+                result.timings['worker_roundtrip'] = time.perf_counter() - started
+            except Exception as e:
+                self._remove(job_dir)
+                outer.set_exception(e)
+                return
+            self._release_previous(job_dir)
+            outer.set_result(result)
+
+        inner.add_done_callback(_on_done)
+        return outer
+
+    def _release_previous(self, job_dir):
+        """Retient le dossier du dernier résultat et supprime celui du résultat précédent."""
+        with self._lock:
+            previous, self._current_job_dir = self._current_job_dir, job_dir
+        if previous is not None:
+            self._remove(previous)
+
+    @staticmethod
+    def _remove(path):
+        """Supprime un fichier ou dossier d'échange (ignoré s'il est encore projeté en mémoire)."""
+        try:
+            if os.path.isdir(path):
+                shutil.rmtree(path)
+            else:
+                os.remove(path)
+        except OSError:
+            pass
+
+    def shutdown(self):
+        """Arrête le processus de travail et supprime les fichiers d'échange."""
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        shutil.rmtree(self.exchange_dir, ignore_errors=True)
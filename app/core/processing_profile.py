@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import os
+import json
+from typing import Optional, List
+
+
+class ProcessingProfile:
+    """Paramètres de traitement enregistrés (colonne clé, colonne type, colonnes à supprimer, dédoublonnage).
+
+    Un profil permet de rejouer sans interface le traitement configuré dans l'onglet
+    d'import (mode surveillance de dossier, service de traitement).
+    """
+
+    def __init__(self, directory_column: str, type_column: Optional[str] = None,
+                 columns_to_delete: Optional[List[str]] = None, backend: Optional[str] = None,
+                 directory_date: Optional[str] = None, dedup_columns: Optional[List[str]] = None,
+                 export_by_department: bool = False):
+        """Initialise le profil.
+
+        Args:
+            directory_column (str): Colonne contenant la clé de fusion avec l'annuaire
+            type_column (str, optional): Colonne contenant le type de signalisation
+            columns_to_delete (list[str], optional): Colonnes à supprimer avant fusion
+            backend (str, optional): Moteur d'exécution (voir `core.backends.AVAILABLE_BACKENDS`)
+            directory_date (str, optional): Date 'AAAA-MM-JJ' de l'annuaire à utiliser
+                (retraitement d'une période passée) ; par défaut, l'annuaire courant
+            dedup_columns (list[str], optional): Colonnes sur lesquelles les lignes en double
+                sont écartées avant fusion (liste vide : toutes les colonnes) ; par défaut,
+                pas de dédoublonnage
+            export_by_department (bool, optional): Exporter les données fusionnées en un
+                fichier par département (plus un manifeste) au lieu d'un fichier unique
+        """
+        if not directory_column:
+            raise ValueError("Le profil de traitement doit préciser la colonne clé.")
+        self.directory_column = directory_column
+        self.type_column = type_column
+        self.columns_to_delete = list(columns_to_delete or [])
+        self.backend = backend
+        self.directory_date = directory_date
+        self.dedup_columns = list(dedup_columns) if dedup_columns is not None else None
+        self.export_by_department = bool(export_by_department)
+
+    def to_dict(self) -> dict:
+        """Retourne le profil sous forme de dictionnaire sérialisable."""
+        return {
+            'directory_column': self.directory_column,
+            'type_column': self.type_column,
+            'columns_to_delete': self.columns_to_delete,
+            'backend': self.backend,
+            'directory_date': self.directory_date,
+            'dedup_columns': self.dedup_columns,
+            'export_by_department': self.export_by_department
+        }
+
+    @classmethod
+    def from_dict(cls, values: dict):
+        """Construit un profil à partir d'un dictionnaire (clés de `to_dict`)."""
+        return cls(
+            values.get('directory_column'),
+            type_column=values.get('type_column'),
+            columns_to_delete=values.get('columns_to_delete'),
+            backend=values.get('backend'),
+            directory_date=values.get('directory_date'),
+            dedup_columns=values.get('dedup_columns'),
+            export_by_department=values.get('export_by_department', False)
+        )
+
+    @classmethod
+    def load(cls, path: str):
+        """Charge un profil depuis un fichier JSON.
+
+        Args:
+            path (str): Chemin du fichier de profil
+
+        Returns:
+            ProcessingProfile: Le profil chargé
+        """
+        with open(path, 'r', encoding='utf-8') as f:
+            return cls.from_dict(json.load(f))
+
+    def save(self, path: str):
+        """Enregistre le profil dans un fichier JSON (écriture atomique).
+
+        Args:
+            path (str): Chemin du fichier de profil
+        """
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, path)
+
+    def apply(self, data_processor) -> bool:
+        """Lance le traitement des données chargées avec les paramètres du profil.
+
+        Args:
+            data_processor (DataProcessor): Processeur dont les données sont déjà chargées
+
+        Returns:
+            bool: True si le traitement a réussi
+        """
+        return data_processor.process_with_directory(
+            self.directory_column,
+            type_column=self.type_column,
+            columns_to_delete=self.columns_to_delete,
+            directory_date=self.directory_date,
+            dedup_columns=self.dedup_columns
+        )
+
+    def run(self, data_processor, data, source_path: Optional[str] = None,
+            directory=None, progress_callback=None, backend=None):
+        """Traite un jeu de données avec les paramètres du profil (sans état partagé).
+
+        Args:
+            data_processor (DataProcessor): Processeur (peut être partagé entre traitements)
+            data (pandas.DataFrame): Les données à traiter
+            source_path (str, optional): Chemin du fichier d'origine des données
+            directory (DirectorySnapshot, optional): Instantané de l'annuaire à utiliser
+                (par défaut, celui de la date du profil ou l'annuaire courant)
+            progress_callback (callable, optional): Suivi de l'avancement du traitement
+            backend (ProcessingBackend, optional): Moteur choisi pour ce traitement
+                (par défaut, celui du processeur)
+
+        Returns:
+            ProcessingResult: Le résultat du traitement
+        """
+        return data_processor.run(
+            data, self.directory_column,
+            type_column=self.type_column,
+            columns_to_delete=self.columns_to_delete,
+            source_path=source_path,
+            directory=directory,
+            directory_date=None if directory is not None else self.directory_date,
+            progress_callback=progress_callback,
+            dedup_columns=self.dedup_columns,
+            backend=backend
+        )
@@ -0,0 +1,438 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import os
+import io
+import json
+import time
+import uuid
+import socket
+import threading
+import pandas as pd
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from socketserver import ThreadingMixIn, UnixStreamServer
+from urllib.parse import urlparse, parse_qs
+from core.data_processor import DataProcessor
+from core.processing_profile import ProcessingProfile
+from core.stats_spec import StatsSpec
+from core.stats_history import default_stats_history
+from core.deduplication import FingerprintStore
+from core.join_diagnostics import JOIN_DIAGNOSTICS_KEY
+from core.backends import get_backend
+from utils.directory_manager import DirectoryManager, DirectorySnapshot
+from utils.result_cache import ResultCache
+from utils.file_handlers import import_data
+
+try:
+    import pyarrow as pa
+except ImportError:  # Dépendance optionnelle (réponses au format Arrow)
+    pa = None
+
+# États d'une tâche de traitement
+JOB_PENDING = 'en_attente'
+JOB_RUNNING = 'en_cours'
+JOB_DONE = 'termine'
+JOB_FAILED = 'erreur'
+# Nombre de tâches terminées conservées en mémoire
+DEFAULT_MAX_FINISHED_JOBS = 50
+
+
+def table_to_json(table):
+    """Convertit une table de statistiques en dictionnaire JSON (colonnes + lignes)."""
+    return json.loads(table.to_json(orient='split', index=False, force_ascii=False))
+
+
+def table_to_arrow(table):
+    """Sérialise une table de statistiques au format Arrow IPC (flux)."""
+    if pa is None:
+        raise ImportError("Le format Arrow nécessite pyarrow (pip install pyarrow).")
+    # Colonnes texte mixtes (ex: département) converties pour un schéma Arrow homogène
+    arrow_table = pa.Table.from_pandas(
+        table.apply(lambda col: col.astype(str).where(col.notna(), None) if col.dtype == object else col),
+        preserve_index=False
+    )
+    sink = io.BytesIO()
+    with pa.ipc.new_stream(sink, arrow_table.schema) as writer:
+        writer.write_table(arrow_table)
+    return sink.getvalue()
+
+
+class ProcessingJob:
+    """Tâche de traitement soumise au service (fichier + paramètres) et son avancement."""
+
+    def __init__(self, source_path, profile: ProcessingProfile):
+        self.job_id = uuid.uuid4().hex[:12]
+        self.source_path = source_path
+        self.profile = profile
+        self.status = JOB_PENDING
+        self.step = "En attente"
+        self.progress = 0.0
+        self.events = []
+        self.stats = None
+        self.step_timings = {}
+        self.combined_errors = []
+        self.rows = None
+        self.error = None
+        self.submitted_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self._condition = threading.Condition()
+
+    def report(self, step, progress):
+        """Enregistre une étape d'avancement et réveille les clients qui la suivent."""
+        with self._condition:
+            self.step = step
+            self.progress = progress
+            self.events.append({'step': step, 'progress': round(progress, 3),
+                                'elapsed': round(time.time() - self.submitted_at, 3)})
+            self._condition.notify_all()
+
+    def finish(self, status, error=None):
+        """Marque la tâche comme terminée (succès ou erreur)."""
+        with self._condition:
+            self.status = status
+            self.error = error
+            self.finished_at = time.time()
+            self._condition.notify_all()
+
+    def wait_events(self, start, timeout=30.0):
+        """Attend de nouveaux événements à partir de l'indice `start`.
+
+        Returns:
+            tuple: (nouveaux événements, True si la tâche est terminée)
+        """
+        with self._condition:
+            if len(self.events) <= start and self.finished_at is None:
+                self._condition.wait(timeout)
+            return self.events[start:], self.finished_at is not None
+
+    def summary(self) -> dict:
+        """Résumé sérialisable de la tâche."""
+        timings = {}
+        if self.started_at is not None:
+            timings['attente_s'] = round(self.started_at - self.submitted_at, 3)
+        if self.finished_at is not None and self.started_at is not None:
+            timings['traitement_s'] = round(self.finished_at - self.started_at, 3)
+        if self.step_timings:
+            timings['etapes_s'] = {step: round(duration, 3) for step, duration in self.step_timings.items()}
+        return {
+            'job_id': self.job_id,
+            'path': self.source_path,
+            'params': self.profile.to_dict(),
+            'status': self.status,
+            'step': self.step,
+            'progress': round(self.progress, 3),
+            'rows': self.rows,
+            'error': self.error,
+            'errors': self.combined_errors,
+            'timings': timings,
+            'tables': sorted(name for name, value in (self.stats or {}).items() if isinstance(value, pd.DataFrame)),
+            'diagnostics': (self.stats or {}).get(JOIN_DIAGNOSTICS_KEY)
+        }
+
+
+class ProcessingService:
+    """Service local de traitement gardant l'annuaire et son index de clés en mémoire.
+
+    Chaque tâche est exécutée dans un fil du pool par `DataProcessor.run`, sans état
+    partagé entre tâches : les processeurs (un par moteur), la spécification des
+    statistiques et le cache de résultats sont communs. Chaque tâche reçoit un
+    instantané de l'annuaire lors de sa soumission : après un rechargement, les
+    tâches en cours terminent avec l'ancien annuaire.
+    """
+
+    def __init__(self, directory_path=None, workers: int = 4,
+                 max_finished_jobs: int = DEFAULT_MAX_FINISHED_JOBS):
+        """Initialise le service.
+
+        Args:
+            directory_path (str, optional): Chemin du fichier annuaire
+            workers (int, optional): Nombre de tâches exécutées simultanément
+            max_finished_jobs (int, optional): Nombre de tâches terminées conservées
+        """
+        self.directory_path = directory_path
+        self.stats_spec = StatsSpec.load()
+        self.result_cache = ResultCache()
+        self.stats_history = default_stats_history()
+        self.fingerprint_store = FingerprintStore()
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='traitement')
+        self.workers = workers
+        self.max_finished_jobs = max_finished_jobs
+        self.jobs = OrderedDict()
+        self._processors = {}
+        self._lock = threading.Lock()
+        self.directory_manager = None
+        self.reload_directory()
+
+    def reload_directory(self) -> dict:
+        """Charge l'annuaire et précalcule sa version et son index de clés."""
+        started = time.time()
+        directory_manager = DirectoryManager(self.directory_path)
+        directory_manager.get_version()
+        directory_manager.get_key_index()
+        # Remplacement atomique de la référence : les tâches en cours gardent l'ancien annuaire
+        self.directory_manager = directory_manager
+        info = self.directory_info()
+        info['chargement_s'] = round(time.time() - started, 3)
+        print(f"Annuaire chargé en mémoire: {info['rows']} lignes (version {info['version'][:12]}).")
+        return info
+
+    def directory_info(self) -> dict:
+        """Informations sur l'annuaire en mémoire."""
+        directory = self.directory_manager.get_directory()
+        return {
+            'path': self.directory_manager.directory_path,
+            'rows': 0 if directory is None else len(directory),
+            'version': self.directory_manager.get_version(),
+            'unique_keys': self.directory_manager.get_key_index() is not None
+        }
+
+    def submit(self, params: dict) -> ProcessingJob:
+        """Soumet une tâche de traitement.
+
+        Args:
+            params (dict): 'path' et soit 'profile' (chemin d'un profil JSON), soit les
+                paramètres du profil ('directory_column', 'type_column', 'directory_date', ...)
+
+        Returns:
+            ProcessingJob: La tâche créée
+        """
+        source_path = params.get('path')
+        if not source_path or not os.path.isfile(source_path):
+            raise ValueError(f"Fichier introuvable: {source_path}")
+        if params.get('profile'):
+            profile = ProcessingProfile.load(params['profile'])
+        else:
+            profile = ProcessingProfile.from_dict(params)
+        job = ProcessingJob(source_path, profile)
+        with self._lock:
+            self.jobs[job.job_id] = job
+            self._forget_finished_jobs()
+        # Annuaire figé à la soumission (version datée si le profil le demande)
+        directory = self.directory_manager.snapshot(as_of=profile.directory_date)
+        self.executor.submit(self._run_job, job, directory)
+        return job
+
+    def get_job(self, job_id):
+        """Retourne une tâche par son identifiant (None si inconnue)."""
+        with self._lock:
+            return self.jobs.get(job_id)
+
+    def list_jobs(self) -> list:
+        """Résumé de toutes les tâches connues."""
+        with self._lock:
+            jobs = list(self.jobs.values())
+        return [job.summary() for job in jobs]
+
+    def _forget_finished_jobs(self):
+        """Oublie les tâches terminées les plus anciennes au-delà de la limite."""
+        finished = [job_id for job_id, job in self.jobs.items() if job.finished_at is not None]
+        for job_id in finished[:max(0, len(finished) - self.max_finished_jobs)]:
+            del self.jobs[job_id]
+
+    def _get_processor(self, backend_name):
+        """Retourne le processeur (partagé entre les tâches) du moteur demandé."""
+        with self._lock:
+            processor = self._processors.get(backend_name)
+            if processor is None:
+                backend = get_backend(backend_name) if backend_name else None
+                processor = DataProcessor(self.directory_manager, result_cache=self.result_cache,
+                                          backend=backend, stats_spec=self.stats_spec,
+                                          stats_history=self.stats_history,
+                                          fingerprint_store=self.fingerprint_store)
+                self._processors[backend_name] = processor
+            return processor
+
+    def _run_job(self, job: ProcessingJob, directory: DirectorySnapshot):
+        """Exécute une tâche (dans un fil du pool)."""
+        job.started_at = time.time()
+        job.status = JOB_RUNNING
+        try:
+            job.report("Import du fichier", 0.0)
+            data = import_data(job.source_path)
+            processor = self._get_processor(job.profile.backend)
+            result = job.profile.run(processor, data, source_path=job.source_path,
+                                     directory=directory, progress_callback=job.report)
+            # Seules les statistiques sont conservées : les données fusionnées sont libérées
+            job.stats = result.stats
+            job.step_timings = result.timings
+            job.rows = None if result.processed_data is None else len(result.processed_data)
+            _, job.combined_errors = processor.get_combined_stats(result.stats)
+            job.finish(JOB_DONE)
+        except Exception as e:
+            print(f"Erreur de la tâche {job.job_id}: {e}")
+            job.finish(JOB_FAILED, str(e))
+
+    def shutdown(self):
+        """Arrête le pool de tâches (les tâches en cours se terminent)."""
+        self.executor.shutdown(wait=True)
+
+
+class ProcessingRequestHandler(BaseHTTPRequestHandler):
+    """Point d'accès HTTP du service de traitement.
+
+    GET  /health                       état du service et de l'annuaire
+    GET  /jobs                         liste des tâches
+    POST /jobs                         soumission {"path", "profile" | "directory_column", ...}
+    GET  /jobs/<id>                    état, avancement et durées d'une tâche
+    GET  /jobs/<id>/events             avancement en continu (une ligne JSON par étape)
+    GET  /jobs/<id>/stats              tables de statistiques au format JSON
+    GET  /jobs/<id>/stats/<table>      une table (?format=json ou ?format=arrow)
+    POST /directory/reload             rechargement de l'annuaire
+    """
+
+    service = None # ProcessingService, défini par `create_server`
+    server_version = 'CSFGaspardService/1.0'
+
+    def address_string(self):
+        # Sur un socket Unix, l'adresse du client est une chaîne vide
+        return self.client_address[0] if isinstance(self.client_address, tuple) else 'unix'
+
+    def _send_json(self, payload, status=200):
+        body = json.dumps(payload, ensure_ascii=False, default=str).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_error_json(self, status, message):
+        self._send_json({'error': message}, status=status)
+
+    def _read_json(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        if not length:
+            return {}
+        return json.loads(self.rfile.read(length).decode('utf-8'))
+
+    def _job_or_404(self, job_id):
+        job = self.service.get_job(job_id)
+        if job is None:
+            self._send_error_json(404, f"Tâche inconnue: {job_id}")
+        return job
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        parts = [part for part in url.path.split('/') if part]
+        query = parse_qs(url.query)
+        try:
+            if parts == ['health']:
+                self._send_json({'status': 'ok', 'workers': self.service.workers,
+                                 'directory': self.service.directory_info()})
+            elif parts == ['jobs']:
+                self._send_json(self.service.list_jobs())
+            elif len(parts) >= 2 and parts[0] == 'jobs':
+                job = self._job_or_404(parts[1])
+                if job is None:
+                    return
+                if len(parts) == 2:
+                    self._send_json(job.summary())
+                elif parts[2:] == ['events']:
+                    self._stream_events(job)
+                elif parts[2] == 'stats':
+                    self._send_stats(job, parts[3] if len(parts) > 3 else None,
+                                     query.get('format', ['json'])[0])
+                else:
+                    self._send_error_json(404, f"Ressource inconnue: {url.path}")
+            else:
+                self._send_error_json(404, f"Ressource inconnue: {url.path}")
+        except Exception as e:
+            self._send_error_json(500, str(e))
+
+    def do_POST(self):
+        parts = [part for part in urlparse(self.path).path.split('/') if part]
+        try:
+            if parts == ['jobs']:
+                job = self.service.submit(self._read_json())
+                self._send_json(job.summary(), status=202)
+            elif parts == ['directory', 'reload']:
+                self._send_json(self.service.reload_directory())
+            else:
+                self._send_error_json(404, f"Ressource inconnue: {self.path}")
+        except (ValueError, KeyError, json.JSONDecodeError) as e:
+            self._send_error_json(400, str(e))
+        except Exception as e:
+            self._send_error_json(500, str(e))
+
+    def _stream_events(self, job):
+        """Envoie les étapes d'avancement au fil de l'eau jusqu'à la fin de la tâche."""
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/x-ndjson; charset=utf-8')
+        self.send_header('Cache-Control', 'no-cache')
+        self.end_headers()
+        position = 0
+        while True:
+            events, finished = job.wait_events(position)
+            for event in events:
+                self.wfile.write((json.dumps(event, ensure_ascii=False) + '\n').encode('utf-8'))
+            position += len(events)
+            self.wfile.flush()
+            if finished and not events:
+                summary = job.summary()
+                self.wfile.write((json.dumps({'status': summary['status'], 'error': summary['error'],
+                                              'timings': summary['timings']}, ensure_ascii=False) + '\n').encode('utf-8'))
+                break
+
+    def _send_stats(self, job, table_name, output_format):
+        """Envoie les tables de statistiques d'une tâche terminée."""
+        if job.status != JOB_DONE:
+            self._send_error_json(409, f"Tâche non terminée (état: {job.status}).")
+            return
+        tables = {name: value for name, value in job.stats.items() if isinstance(value, pd.DataFrame)}
+        if table_name is None:
+            payload = {name: table_to_json(table) for name, table in tables.items()}
+            payload['errors'] = job.combined_errors
+            self._send_json(payload)
+            return
+        if table_name not in tables:
+            self._send_error_json(404, f"Table inconnue: {table_name}")
+            return
+        if output_format == 'arrow':
+            body = table_to_arrow(tables[table_name])
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/vnd.apache.arrow.stream')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        else:
+            self._send_json(table_to_json(tables[table_name]))
+
+    def log_message(self, format, *args):
+        print(f"[service] {self.address_string()} {format % args}")
+
+
+class ThreadingUnixHTTPServer(ThreadingMixIn, UnixStreamServer):
+    """Serveur HTTP multi-fil sur socket Unix."""
+
+    daemon_threads = True
+
+    def server_bind(self):
+        if os.path.exists(self.server_address):
+            os.remove(self.server_address)
+        UnixStreamServer.server_bind(self)
+        self.server_name = 'localhost'
+        self.server_port = 0
+
+
+def create_server(service: ProcessingService, host='127.0.0.1', port=8765, socket_path=None):
+    """Crée le serveur HTTP (TCP local ou socket Unix) du service.
+
+    Args:
+        service (ProcessingService): Service de traitement
+        host (str, optional): Adresse d'écoute TCP
+        port (int, optional): Port d'écoute TCP
+        socket_path (str, optional): Chemin d'un socket Unix (prioritaire sur host/port)
+
+    Returns:
+        socketserver.BaseServer: Le serveur, à démarrer avec `serve_forever()`
+    """
+    handler = type('BoundProcessingRequestHandler', (ProcessingRequestHandler,), {'service': service})
+    if socket_path:
+        if not hasattr(socket, 'AF_UNIX'):
+            raise ValueError("Les sockets Unix ne sont pas disponibles sur ce système.")
+        return ThreadingUnixHTTPServer(socket_path, handler)
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
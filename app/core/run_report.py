@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import os
+import json
+import time
+import datetime
+import threading
+from typing import Optional, List
+from core.join_diagnostics import JOIN_DIAGNOSTICS_KEY, format_diagnostics
+from core.deduplication import DEDUPLICATION_KEY
+from core.execution_planner import MODE_CHUNKED, MIN_STREAMING_MEMORY
+from core.backends import get_backend
+from utils.file_handlers import import_data, export_data
+from utils.sharded_export import export_by_department
+
+# Suffixes des fichiers produits pour chaque extraction traitée
+PROCESSED_SUFFIX = '_STATS_GASPARD.csv'
+# Dossier de l'export par département (un fichier par département et un manifeste)
+DEPARTMENT_EXPORT_SUFFIX = '_departements'
+STATS_SUFFIX = '_statistiques.csv'
+REPORT_SUFFIX = '_rapport.json'
+
+
+class RunReport:
+    """Rapport d'exécution d'un traitement (paramètres, durées, diagnostics, fichiers produits)."""
+
+    def __init__(self, source_path: str, result=None, outputs: Optional[List[str]] = None,
+                 stats_errors: Optional[List[str]] = None, stats_spec=None, extra_timings=None, plan=None):
+        """Initialise le rapport.
+
+        Args:
+            source_path (str): Fichier traité
+            result (ProcessingResult, optional): Résultat du traitement
+            outputs (list[str], optional): Fichiers exportés
+            stats_errors (list[str], optional): Messages d'erreur des tables de statistiques
+            stats_spec (StatsSpec, optional): Spécification des tables (titres du rapport)
+            extra_timings (dict, optional): Durées d'étapes hors traitement (import, export)
+            plan (ExecutionPlan, optional): Mode d'exécution choisi par le planificateur
+        """
+        self.source_path = source_path
+        self.result = result
+        self.outputs = list(outputs or [])
+        self.stats_errors = list(stats_errors or [])
+        self.stats_spec = stats_spec
+        self.timings = dict(result.timings) if result is not None else {}
+        self.timings.update(extra_timings or {})
+        self.plan = plan
+        self.generated_at = datetime.datetime.now().isoformat(timespec='seconds')
+
+    @property
+    def diagnostics(self) -> dict:
+        """Diagnostics de jointure du traitement (dictionnaire vide si indisponibles)."""
+        if self.result is None:
+            return {}
+        return self.result.stats.get(JOIN_DIAGNOSTICS_KEY) or {}
+
+    def to_dict(self) -> dict:
+        """Retourne le rapport sous forme de dictionnaire sérialisable."""
+        result = self.result
+        return {
+            'source': self.source_path,
+            'generated_at': self.generated_at,
+            'params': dict(result.params) if result is not None else {},
+            'directory_version': result.directory_version if result is not None else None,
+            'from_cache': result.from_cache if result is not None else False,
+            'rows': None if result is None or result.processed_data is None else len(result.processed_data),
+            'timings': {step: round(duration, 3) for step, duration in self.timings.items()},
+            'diagnostics': self.diagnostics,
+            'deduplication': result.stats.get(DEDUPLICATION_KEY) if result is not None else None,
+            'execution_plan': self.plan.to_dict() if self.plan is not None else None,
+            'stats_errors': self.stats_errors,
+            'outputs': self.outputs
+        }
+
+    def format_text(self) -> str:
+        """Met en forme le rapport pour la console."""
+        values = self.to_dict()
+        lines = [f"Rapport de traitement: {self.source_path}"]
+        if values['directory_version']:
+            lines.append(f"Annuaire: version {values['directory_version'][:12]}"
+                         + (" (résultat du cache)" if values['from_cache'] else ""))
+        if values['rows'] is not None:
+            lines.append(f"Lignes traitées: {values['rows']}")
+        if self.plan is not None:
+            lines.append(self.plan.explain())
+        if values['timings']:
+            lines.append("Durées: " + ", ".join(f"{step} {duration:.3f} s" for step, duration in values['timings'].items()))
+        dedup = values['deduplication']
+        if dedup:
+            lines.append(f"Dédoublonnage: {dedup['rows_in']} lignes importées, {dedup['duplicate_rows']} doublons, "
+                         f"{dedup['previously_seen_rows']} déjà traitées, {dedup['rows_out']} conservées")
+        lines += format_diagnostics(self.diagnostics, self.stats_spec)
+        lines += [f"Attention: {message}" for message in self.stats_errors]
+        if self.outputs:
+            lines.append("Fichiers produits: " + ", ".join(self.outputs))
+        return "\n".join(lines)
+
+    def save(self, path: str):
+        """Enregistre le rapport au format JSON (écriture atomique).
+
+        Args:
+            path (str): Chemin du fichier de rapport
+        """
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, path)
+
+
+def process_extract(data_processor, profile, source_path: str, output_dir: str, planner=None) -> RunReport:
+    """Importe, traite et exporte une extraction, puis enregistre son rapport d'exécution.
+
+    Produit dans le dossier de sortie `<fichier>_STATS_GASPARD.csv` (données
+    fusionnées), `<fichier>_statistiques.csv` (tables combinées) et
+    `<fichier>_rapport.json` (rapport d'exécution). Si le profil le demande, les données
+    fusionnées sont exportées dans `<fichier>_departements/` (un fichier par département
+    et un manifeste) au lieu du fichier unique.
+
+    Si un planificateur est fourni et que le profil n'impose pas de moteur, le mode
+    d'exécution (en mémoire, partitionné ou lecture en flux par DuckDB) est choisi
+    selon la taille du fichier et le budget mémoire, et seules les colonnes conservées
+    sont importées. En lecture en flux, les données ne sont pas importées : DuckDB
+    écrit directement les données fusionnées dans le fichier d'export.
+
+    Args:
+        data_processor (DataProcessor): Processeur utilisé (non modifié)
+        profile (ProcessingProfile): Paramètres de traitement
+        source_path (str): Fichier à traiter
+        output_dir (str): Dossier des exports
+        planner (ExecutionPlanner, optional): Choix automatique du mode d'exécution
+
+    Returns:
+        RunReport: Le rapport d'exécution
+
+    Raises:
+        ValueError: Si le traitement ou un export échoue
+    """
+    stem = os.path.splitext(os.path.basename(source_path))[0]
+    processed_path = os.path.join(output_dir, stem + PROCESSED_SUFFIX)
+    plan = None
+    if planner is not None and not profile.backend:
+        directory_manager = data_processor.directory_manager
+        plan = planner.plan(
+            source_path, profile.directory_column, columns_to_delete=profile.columns_to_delete,
+            type_column=profile.type_column,
+            directory_data=directory_manager.get_directory() if directory_manager is not None else None,
+            dedup_columns=profile.dedup_columns, export_by_department=profile.export_by_department
+        )
+        print(plan.explain())
+
+    started = time.perf_counter()
+    backend = None
+    streamed_path = None
+    if plan is not None and plan.mode == MODE_CHUNKED:
+        # DuckDB lit le fichier et écrit les données fusionnées sans les charger en mémoire
+        os.makedirs(output_dir, exist_ok=True)
+        streamed_path = f"{processed_path}.{os.getpid()}-{threading.get_ident()}.tmp"
+        memory_limit = max(plan.memory_budget, MIN_STREAMING_MEMORY)
+        backend = get_backend(plan.backend, memory_limit=f"{memory_limit // 1024 ** 2}MB",
+                              output_path=streamed_path)
+        data = None
+    else:
+        if plan is not None and plan.backend is not None:
+            backend = get_backend(plan.backend, workers=plan.cores)
+        data = import_data(source_path, usecols=plan.columns if plan is not None else None)
+    import_duration = time.perf_counter() - started
+    try:
+        result = profile.run(data_processor, data, source_path=source_path, backend=backend)
+    except Exception:
+        if streamed_path is not None and os.path.exists(streamed_path):
+            os.remove(streamed_path)
+        raise
+
+    started = time.perf_counter()
+    outputs = []
+    if streamed_path is not None and os.path.exists(streamed_path):
+        if result.processed_data is None:
+            os.replace(streamed_path, processed_path)
+            outputs.append(processed_path)
+        else:
+            os.remove(streamed_path) # Résultat retrouvé dans le cache : exporté ci-dessous
+    if result.processed_data is not None and profile.export_by_department:
+        shard_dir = os.path.join(output_dir, stem + DEPARTMENT_EXPORT_SUFFIX)
+        try:
+            sharded = export_by_department(result.processed_data, shard_dir,
+                                           stem + os.path.splitext(PROCESSED_SUFFIX)[0])
+        except (ValueError, OSError) as e:
+            raise ValueError(f"Échec de l'export par département vers {shard_dir}: {e}")
+        # Le manifeste liste les fichiers par département
+        outputs.append(sharded.manifest_path)
+    elif result.processed_data is not None:
+        if not export_data(result.processed_data, processed_path, format_type='csv'):
+            raise ValueError(f"Échec de l'export vers {processed_path}")
+        outputs.append(processed_path)
+    combined_df, error_messages = data_processor.get_combined_stats(result.stats)
+    if not combined_df.empty:
+        stats_path = os.path.join(output_dir, stem + STATS_SUFFIX)
+        if not export_data(combined_df, stats_path, format_type='csv'):
+            raise ValueError(f"Échec de l'export vers {stats_path}")
+        outputs.append(stats_path)
+
+    report_path = os.path.join(output_dir, stem + REPORT_SUFFIX)
+    report = RunReport(source_path, result, outputs=outputs + [report_path], stats_errors=error_messages,
+                       stats_spec=data_processor.stats_planner.spec,
+                       extra_timings={'import': import_duration, 'export': time.perf_counter() - started},
+                       plan=plan)
+    report.save(report_path)
+    return report
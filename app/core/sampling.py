@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import numpy as np
+import pandas as pd
+from typing import Optional
+
+# Taille par défaut de l'échantillon d'aperçu
+DEFAULT_PREVIEW_ROWS = 50000
+# Nombre minimal de lignes tirées par strate (estimation de la variance)
+MIN_ROWS_PER_STRATUM = 2
+# Quantile de la loi normale pour un intervalle de confiance à 95 %
+Z_95 = 1.959964
+
+
+def uniform_sample(n_rows: int, sample_size: int, seed: Optional[int] = None):
+    """Tire un échantillon aléatoire simple de lignes, sans remise.
+
+    Args:
+        n_rows (int): Nombre de lignes des données
+        sample_size (int): Taille de l'échantillon
+        seed (int, optional): Graine du générateur (tirage reproductible)
+
+    Returns:
+        tuple: (positions triées des lignes tirées, poids de chaque ligne tirée)
+    """
+    sample_size = min(sample_size, n_rows)
+    positions = np.sort(np.random.default_rng(seed).choice(n_rows, size=sample_size, replace=False))
+    return positions, np.full(sample_size, n_rows / max(sample_size, 1))
+
+
+def stratified_sample(strata, sample_size: int, seed: Optional[int] = None):
+    """Tire un échantillon stratifié à allocation proportionnelle.
+
+    Chaque strate reçoit une part de l'échantillon proportionnelle à sa taille (au
+    moins `MIN_ROWS_PER_STRATUM` lignes) ; le poids d'une ligne tirée est l'inverse
+    de la fraction de sondage de sa strate.
+
+    Args:
+        strata (array-like): Strate de chaque ligne (les valeurs manquantes forment une strate)
+        sample_size (int): Taille visée de l'échantillon
+        seed (int, optional): Graine du générateur (tirage reproductible)
+
+    Returns:
+        tuple: (positions triées des lignes tirées, poids de chaque ligne tirée)
+    """
+    codes, _ = pd.factorize(pd.Series(strata), use_na_sentinel=False)
+    n_rows = len(codes)
+    stratum_sizes = np.bincount(codes)
+    allocation = np.round(sample_size * stratum_sizes / max(n_rows, 1)).astype(np.int64)
+    allocation = np.minimum(np.maximum(allocation, MIN_ROWS_PER_STRATUM), stratum_sizes)
+
+    # Ordre aléatoire à l'intérieur de chaque strate, puis les premières lignes de chacune
+    order = np.lexsort((np.random.default_rng(seed).random(n_rows), codes))
+    starts = np.concatenate([[0], np.cumsum(stratum_sizes)[:-1]])
+    offsets = np.arange(len(order)) - np.repeat(starts, stratum_sizes)
+    selected = order[offsets < np.repeat(allocation, stratum_sizes)]
+
+    positions = np.sort(selected)
+    stratum_of_row = codes[positions]
+    weights = stratum_sizes[stratum_of_row] / allocation[stratum_of_row]
+    return positions, weights.astype(float)
+
+
+def wilson_interval(proportion, sample_rows, z: float = Z_95):
+    """Intervalle de confiance de Wilson d'une proportion estimée sur un échantillon.
+
+    Args:
+        proportion (array-like): Proportions estimées (0 à 1)
+        sample_rows (array-like): Nombre de lignes observées pour chaque proportion
+        z (float, optional): Quantile de la loi normale (95 % par défaut)
+
+    Returns:
+        tuple: (bornes basses, bornes hautes), NaN si aucune ligne observée
+    """
+    p = np.asarray(proportion, dtype=float)
+    n = np.asarray(sample_rows, dtype=float)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        denominator = 1 + z ** 2 / n
+        center = (p + z ** 2 / (2 * n)) / denominator
+        half_width = z * np.sqrt(p * (1 - p) / n + z ** 2 / (4 * n ** 2)) / denominator
+    low = np.where(n > 0, np.clip(center - half_width, 0, 1), np.nan)
+    high = np.where(n > 0, np.clip(center + half_width, 0, 1), np.nan)
+    return low, high
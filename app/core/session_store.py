@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import os
+import json
+import uuid
+import datetime
+import threading
+from typing import Optional
+from core.arrow_results import write_result, read_result
+from utils.arrow_files import pa, ARROW_FILE_EXTENSION, write_frame, read_frame
+
+# Format de la session enregistrée (à incrémenter si son contenu change)
+SESSION_FORMAT = 2
+SESSION_MANIFEST_NAME = 'session.json'
+
+
+class SessionStore:
+    """Sauvegarde de la session de travail au format Arrow IPC.
+
+    Les données importées, les données traitées, les tables de statistiques et le
+    cube sont écrits dans des fichiers Arrow IPC (un par tableau), les paramètres,
+    la version de l'annuaire et les autres statistiques dans un manifeste JSON. Les
+    fichiers d'une sauvegarde portent un identifiant de génération et le manifeste
+    est remplacé en dernier : une sauvegarde interrompue laisse la précédente intacte.
+    À la restauration, les fichiers sont projetés en mémoire (mmap) sans analyse ni
+    recalcul.
+    """
+
+    def __init__(self, session_dir: Optional[str] = None):
+        """Initialise la sauvegarde de session.
+
+        Args:
+            session_dir (str, optional): Répertoire de la session
+        """
+        self.session_dir = session_dir or os.path.join('app', 'resources', 'session')
+        self._saved_state = None # (données, résultat) enregistrés ou restaurés en dernier
+
+    @staticmethod
+    def is_available() -> bool:
+        """Indique si pyarrow est installé (nécessaire à la sauvegarde de session)."""
+        return pa is not None
+
+    def _manifest_path(self):
+        return os.path.join(self.session_dir, SESSION_MANIFEST_NAME)
+
+    def save(self, data_processor) -> bool:
+        """Enregistre la session du processeur (données, résultat du dernier traitement).
+
+        Rien n'est réécrit si la session n'a pas changé depuis la dernière sauvegarde
+        ou restauration.
+
+        Args:
+            data_processor (DataProcessor): Processeur de l'interface
+
+        Returns:
+            bool: True si la session est enregistrée (ou inchangée), False sinon
+        """
+        if pa is None:
+            return False
+        data = data_processor.data
+        result = data_processor.last_result
+        if data is None:
+            self.clear()
+            return True
+        if self._saved_state is not None and self._saved_state[0] is data and self._saved_state[1] is result:
+            return True
+
+        generation = uuid.uuid4().hex[:12]
+        manifest = {
+            'format': SESSION_FORMAT,
+            'saved_at': datetime.datetime.now().isoformat(timespec='seconds'),
+            'generation': generation,
+            'source_path': data_processor.source_path,
+            'data_fingerprint': data_processor.data_fingerprint,
+            'files': {'data': f"{generation}_data{ARROW_FILE_EXTENSION}"},
+            'stats_spec': data_processor.stats_planner.spec.fingerprint,
+            'result': None
+        }
+        try:
+            os.makedirs(self.session_dir, exist_ok=True)
+            write_frame(data, os.path.join(self.session_dir, manifest['files']['data']))
+            if result is not None:
+                manifest['result'] = write_result(result, self.session_dir, generation)
+        except (pa.ArrowException, OSError) as e:
+            print(f"Erreur lors de l'enregistrement de la session: {e}")
+            self._remove_unreferenced(keep=self._read_manifest())
+            return False
+
+        tmp_path = f"{self._manifest_path()}.{os.getpid()}-{threading.get_ident()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self._manifest_path())
+        self._remove_unreferenced(keep=manifest)
+        self._saved_state = (data, result)
+        print(f"Session enregistrée dans {self.session_dir}.")
+        return True
+
+    def _read_manifest(self):
+        """Lit le manifeste de la session (None s'il n'existe pas ou est illisible)."""
+        try:
+            with open(self._manifest_path(), 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            return None
+        return manifest if manifest.get('format') == SESSION_FORMAT else None
+
+    def _remove_unreferenced(self, keep=None):
+        """Supprime les fichiers de données qui n'appartiennent pas à la session retenue."""
+        if not os.path.isdir(self.session_dir):
+            return
+        generation = keep['generation'] if keep else None
+        for name in os.listdir(self.session_dir):
+            if name.endswith(ARROW_FILE_EXTENSION) and not (generation and name.startswith(generation + '_')):
+                try:
+                    os.remove(os.path.join(self.session_dir, name))
+                except OSError:
+                    pass # Fichier encore projeté en mémoire (Windows) : supprimé à la prochaine sauvegarde
+
+    def restore(self, data_processor) -> bool:
+        """Restaure la dernière session enregistrée dans le processeur.
+
+        Les statistiques ne sont pas restaurées si la spécification des tables a
+        changé depuis la sauvegarde (seules les données importées le sont alors).
+
+        Args:
+            data_processor (DataProcessor): Processeur de l'interface
+
+        Returns:
+            bool: True si une session a été restaurée, False sinon
+        """
+        if pa is None:
+            return False
+        manifest = self._read_manifest()
+        if manifest is None:
+            return False
+        try:
+            data = read_frame(os.path.join(self.session_dir, manifest['files']['data']))
+            result = None
+            if manifest.get('result'):
+                if manifest['stats_spec'] == data_processor.stats_planner.spec.fingerprint:
+                    result = read_result(manifest['result'], self.session_dir)
+                else:
+                    print("La spécification des statistiques a changé : "
+                          "les statistiques de la session ne sont pas restaurées.")
+        except (pa.ArrowException, OSError, KeyError) as e:
+            print(f"Session précédente illisible, ignorée: {e}")
+            return False
+
+        data_processor.set_data(data, source_path=manifest.get('source_path'),
+                                data_fingerprint=manifest.get('data_fingerprint'))
+        if result is not None:
+            data_processor.set_result(result)
+            current_version = data_processor.directory_manager.get_version()
+            if result.directory_version and result.directory_version != current_version:
+                print("Attention: l'annuaire a changé depuis la sauvegarde de la session "
+                      "(les statistiques restaurées utilisent l'ancienne version).")
+        self._saved_state = (data_processor.data, data_processor.last_result)
+        print(f"Session du {manifest['saved_at']} restaurée ({len(data)} lignes).")
+        return True
+
+    def clear(self):
+        """Supprime la session enregistrée."""
+        try:
+            os.remove(self._manifest_path())
+        except OSError:
+            pass
+        self._remove_unreferenced()
+        self._saved_state = None
@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import pandas as pd
+from typing import Optional, List, Dict
+from core.backends.base import GROUPING_COLUMNS, IDPP_COLUMN
+
+# Dimension du cube contenant le type de signalisation (en majuscules)
+TYPE_DIMENSION = 'type_signalisation'
+# Mesures stockées dans le cube
+COUNT_MEASURE = 'nombre_signalisation'
+GASPARD_MEASURE = 'nombre_signalisation_gaspard'
+PERCENT_MEASURE = 'pourcentage_signalisation_gaspard'
+# Hiérarchie utilisée pour l'exploration descendante
+DRILL_HIERARCHY = list(GROUPING_COLUMNS)
+
+
+class StatsCube:
+    """Cube pré-agrégé des signalisations et signalisations GASPARD.
+
+    Le cube contient une ligne par combinaison observée des dimensions (département,
+    unité, matériel, terminal et type) avec les deux comptages. Toute découpe
+    (agrégation, filtre, exploration) est calculée à partir du cube, sans revenir aux
+    données traitées.
+    """
+
+    def __init__(self, cells: pd.DataFrame, dimensions: List[str]):
+        """Initialise le cube.
+
+        Args:
+            cells (pandas.DataFrame): Cellules du cube (dimensions + mesures)
+            dimensions (list[str]): Dimensions du cube
+        """
+        self.cells = cells
+        self.dimensions = dimensions
+
+    @classmethod
+    def build(cls, processed_data, type_column: Optional[str] = None):
+        """Construit le cube à partir des données traitées (un seul passage).
+
+        Args:
+            processed_data (pandas.DataFrame): Données fusionnées avec l'annuaire
+            type_column (str, optional): Colonne du type de signalisation
+
+        Returns:
+            StatsCube: Le cube, ou None si les colonnes nécessaires sont absentes
+        """
+        if processed_data is None or processed_data.empty:
+            return None
+        dimensions = [col for col in GROUPING_COLUMNS if col in processed_data.columns]
+        if not dimensions or IDPP_COLUMN not in processed_data.columns:
+            return None
+
+        idpp = processed_data[IDPP_COLUMN]
+        frame = pd.DataFrame({col: processed_data[col] for col in dimensions})
+        if type_column and type_column in processed_data.columns:
+            frame[TYPE_DIMENSION] = processed_data[type_column].astype(str).str.upper()
+            dimensions = dimensions + [TYPE_DIMENSION]
+        frame[GASPARD_MEASURE] = (idpp.notna() & (idpp.astype(str).str.strip() != '')).astype(int).to_numpy()
+
+        # Les valeurs manquantes sont conservées pour que les agrégations partielles restent exactes
+        cells = frame.groupby(dimensions, dropna=False).agg(
+            **{COUNT_MEASURE: (GASPARD_MEASURE, 'size'), GASPARD_MEASURE: (GASPARD_MEASURE, 'sum')}
+        ).reset_index()
+        return cls(cells, dimensions)
+
+    def values(self, dimension) -> list:
+        """Retourne les valeurs distinctes (non vides) d'une dimension, triées."""
+        if dimension not in self.dimensions:
+            return []
+        return sorted(self.cells[dimension].dropna().unique().tolist(), key=str)
+
+    def slice(self, filters: Dict[str, object]):
+        """Restreint le cube à certaines valeurs de dimensions.
+
+        Args:
+            filters (dict): Valeur (ou liste de valeurs) retenue par dimension
+
+        Returns:
+            StatsCube: Le sous-cube
+        """
+        mask = pd.Series(True, index=self.cells.index)
+        for dimension, value in (filters or {}).items():
+            if dimension not in self.dimensions:
+                raise ValueError(f"Dimension inconnue dans le cube: {dimension}")
+            accepted = value if isinstance(value, (list, tuple, set)) else [value]
+            mask &= self.cells[dimension].isin(accepted)
+        return StatsCube(self.cells[mask], self.dimensions)
+
+    def roll_up(self, dimensions: List[str]) -> pd.DataFrame:
+        """Agrège le cube sur un sous-ensemble de dimensions.
+
+        Les cellules dont une des dimensions demandées est vide sont ignorées, comme
+        dans les tables de statistiques.
+
+        Args:
+            dimensions (list[str]): Dimensions conservées
+
+        Returns:
+            pandas.DataFrame: Dimensions, comptages et pourcentage GASPARD
+        """
+        unknown = [dim for dim in dimensions if dim not in self.dimensions]
+        if unknown:
+            raise ValueError(f"Dimension(s) inconnue(s) dans le cube: {', '.join(unknown)}")
+        if dimensions:
+            result = self.cells.groupby(dimensions).agg(
+                **{COUNT_MEASURE: (COUNT_MEASURE, 'sum'), GASPARD_MEASURE: (GASPARD_MEASURE, 'sum')}
+            ).reset_index()
+        else:
+            result = pd.DataFrame({
+                COUNT_MEASURE: [int(self.cells[COUNT_MEASURE].sum())],
+                GASPARD_MEASURE: [int(self.cells[GASPARD_MEASURE].sum())]
+            })
+        result[PERCENT_MEASURE] = (
+            result[GASPARD_MEASURE] / result[COUNT_MEASURE] * 100
+        ).round(2).fillna(0)
+        return result
+
+    def query(self, dimensions: List[str], filters: Optional[Dict[str, object]] = None) -> pd.DataFrame:
+        """Découpe puis agrège le cube (filtre puis agrégation).
+
+        Args:
+            dimensions (list[str]): Dimensions conservées
+            filters (dict, optional): Valeurs retenues par dimension
+
+        Returns:
+            pandas.DataFrame: Le tableau croisé
+        """
+        cube = self.slice(filters) if filters else self
+        return cube.roll_up(dimensions)
+
+    def drill_down(self, dimensions: List[str], member: Dict[str, object]):
+        """Détaille un membre d'un niveau d'agrégation au niveau suivant de la hiérarchie.
+
+        Args:
+            dimensions (list[str]): Dimensions du niveau courant
+            member (dict): Valeurs du membre à détailler pour ces dimensions
+
+        Returns:
+            tuple: (dimensions du niveau inférieur, tableau détaillé) ; le tableau est
+                   inchangé si aucun niveau inférieur n'existe
+        """
+        next_dimensions = list(dimensions)
+        for dimension in DRILL_HIERARCHY:
+            if dimension not in next_dimensions and dimension in self.dimensions:
+                next_dimensions.append(dimension)
+                break
+        return next_dimensions, self.query(next_dimensions, member)
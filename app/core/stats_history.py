@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import os
+import datetime
+import threading
+import pandas as pd
+from typing import Optional, List, Dict
+from core.stats_cube import TYPE_DIMENSION, COUNT_MEASURE, GASPARD_MEASURE, PERCENT_MEASURE
+from core.backends.base import GROUPING_COLUMNS
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # Dépendance optionnelle (historique des statistiques)
+    pa = None
+    pq = None
+
+# Partition mensuelle (convention « colonne=valeur » lisible par les outils Parquet)
+MONTH_PARTITION_PREFIX = 'mois='
+HISTORY_FILE_NAME = 'cube.parquet'
+# Partition complémentaire d'un traitement dédoublonné (lignes nouvelles d'une source)
+SOURCE_FILE_PREFIX = 'source-'
+PARQUET_EXTENSION = '.parquet'
+MONTH_COLUMN = 'mois'
+# Dimensions et mesures conservées pour chaque mois
+HISTORY_DIMENSIONS = list(GROUPING_COLUMNS) + [TYPE_DIMENSION]
+HISTORY_MEASURES = [COUNT_MEASURE, GASPARD_MEASURE]
+
+
+def month_of(value=None) -> str:
+    """Retourne le mois 'AAAA-MM' d'une date ('AAAA-MM[-JJ]', date), par défaut le mois courant."""
+    if value is None:
+        return datetime.date.today().strftime('%Y-%m')
+    if isinstance(value, (datetime.date, datetime.datetime)):
+        return value.strftime('%Y-%m')
+    text = str(value)[:7]
+    try:
+        datetime.datetime.strptime(text, '%Y-%m')
+    except ValueError:
+        raise ValueError(f"Mois invalide: {value} (format attendu: AAAA-MM)")
+    return text
+
+
+def default_stats_history():
+    """Retourne l'historique par défaut, ou None si pyarrow n'est pas installé."""
+    if pq is None:
+        print("pyarrow n'est pas installé : l'historique des statistiques est désactivé.")
+        return None
+    return StatsHistory()
+
+
+def _as_text(values: pd.Series) -> pd.Series:
+    """Convertit une dimension en texte (les entiers stockés en flottants perdent leur '.0')."""
+    if pd.api.types.is_float_dtype(values):
+        present = values.dropna()
+        if (present == present.round()).all():
+            values = values.astype('Int64')
+    return values.astype('string')
+
+
+class StatsHistory:
+    """Historique mensuel des statistiques GASPARD au format Parquet.
+
+    Chaque traitement enregistre les cellules de son cube de statistiques (département,
+    unité, matériel, terminal, type et comptages) dans la partition de son mois
+    (`mois=AAAA-MM/cube.parquet`). Un retraitement du même mois remplace la partition.
+    Un traitement dédoublonné ne porte que sur les lignes nouvelles : son cube est
+    enregistré à côté (`mois=AAAA-MM/source-<empreinte>.parquet`) et additionné aux
+    autres fichiers du mois.
+    Les requêtes d'évolution ne lisent que les partitions de la période demandée et
+    les seules colonnes utiles.
+    """
+
+    def __init__(self, history_dir: Optional[str] = None):
+        """Initialise l'historique.
+
+        Args:
+            history_dir (str, optional): Répertoire de l'historique
+        """
+        self.history_dir = history_dir or os.path.join('app', 'resources', 'history')
+
+    @staticmethod
+    def is_available() -> bool:
+        """Indique si pyarrow est installé (nécessaire à l'historique)."""
+        return pq is not None
+
+    @staticmethod
+    def _require_pyarrow():
+        if pq is None:
+            raise ImportError("L'historique des statistiques nécessite pyarrow (pip install pyarrow).")
+
+    def _partition_dir(self, month):
+        return os.path.join(self.history_dir, MONTH_PARTITION_PREFIX + month)
+
+    def _partition_files(self, month) -> List[str]:
+        """Fichiers du mois : cube complet et cubes des traitements dédoublonnés."""
+        directory = self._partition_dir(month)
+        if not os.path.isdir(directory):
+            return []
+        return sorted(os.path.join(directory, name) for name in os.listdir(directory)
+                      if name == HISTORY_FILE_NAME or
+                      (name.startswith(SOURCE_FILE_PREFIX) and name.endswith(PARQUET_EXTENSION)))
+
+    def months(self) -> List[str]:
+        """Retourne les mois présents dans l'historique, du plus ancien au plus récent."""
+        if not os.path.isdir(self.history_dir):
+            return []
+        months = []
+        for name in os.listdir(self.history_dir):
+            if name.startswith(MONTH_PARTITION_PREFIX) and \
+               self._partition_files(name[len(MONTH_PARTITION_PREFIX):]):
+                months.append(name[len(MONTH_PARTITION_PREFIX):])
+        return sorted(months)
+
+    def record(self, cube, month=None, source: Optional[str] = None) -> Optional[str]:
+        """Enregistre les cellules d'un cube de statistiques pour un mois.
+
+        Sans source, le cube remplace toutes les données du mois. Avec une source
+        (traitement dédoublonné), il remplace seulement le cube de cette source et
+        s'ajoute aux autres fichiers du mois.
+
+        Args:
+            cube (StatsCube): Cube du traitement
+            month (str | datetime.date, optional): Mois des données (par défaut, le mois courant)
+            source (str, optional): Identifiant de la source des lignes nouvelles
+
+        Returns:
+            str: Chemin de la partition écrite, ou None si le cube est vide
+        """
+        self._require_pyarrow()
+        if cube is None or cube.cells.empty:
+            return None
+        month = month_of(month)
+        cells = cube.cells
+        frame = pd.DataFrame({
+            dim: _as_text(cells[dim]) if dim in cells.columns else pd.Series(pd.NA, index=cells.index, dtype='string')
+            for dim in HISTORY_DIMENSIONS
+        })
+        for measure in HISTORY_MEASURES:
+            frame[measure] = cells[measure].astype('int64')
+        schema = pa.schema([(dim, pa.string()) for dim in HISTORY_DIMENSIONS] +
+                           [(measure, pa.int64()) for measure in HISTORY_MEASURES])
+        table = pa.Table.from_pandas(frame, schema=schema, preserve_index=False)
+
+        file_name = f"{SOURCE_FILE_PREFIX}{source}{PARQUET_EXTENSION}" if source else HISTORY_FILE_NAME
+        path = os.path.join(self._partition_dir(month), file_name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Remplacement atomique du fichier
+        tmp_path = f"{path}.{os.getpid()}-{threading.get_ident()}.tmp"
+        pq.write_table(table, tmp_path, compression='zstd')
+        os.replace(tmp_path, path)
+        if not source:
+            # Le cube complet remplace aussi les cubes des traitements dédoublonnés du mois
+            for other in self._partition_files(month):
+                if other != path:
+                    os.remove(other)
+        print(f"Statistiques de {month} enregistrées dans l'historique ({len(frame)} cellules"
+              + (f", source {source})." if source else ")."))
+        return path
+
+    def trend(self, dimensions: Optional[List[str]] = None, filters: Optional[Dict[str, object]] = None,
+              start=None, end=None) -> pd.DataFrame:
+        """Évolution mensuelle des comptages et du pourcentage GASPARD.
+
+        Args:
+            dimensions (list[str], optional): Dimensions conservées (par défaut, aucune :
+                une ligne par mois)
+            filters (dict, optional): Dimension -> valeur ou liste de valeurs acceptées
+            start (str, optional): Premier mois 'AAAA-MM' inclus
+            end (str, optional): Dernier mois 'AAAA-MM' inclus
+
+        Returns:
+            pandas.DataFrame: Une ligne par mois et combinaison des dimensions, avec les
+                deux comptages et le pourcentage GASPARD
+        """
+        self._require_pyarrow()
+        dimensions = list(dimensions or [])
+        filters = dict(filters or {})
+        for dim in dimensions + list(filters):
+            if dim not in HISTORY_DIMENSIONS:
+                raise ValueError(f"Dimension inconnue de l'historique: {dim}")
+        start = month_of(start) if start else None
+        end = month_of(end) if end else None
+        months = [m for m in self.months() if (start is None or m >= start) and (end is None or m <= end)]
+
+        # Lecture des seules colonnes utiles de chaque partition retenue
+        columns = list(dict.fromkeys(dimensions + list(filters))) + HISTORY_MEASURES
+        arrow_filters = [(dim, 'in', [str(v) for v in (value if isinstance(value, (list, tuple, set)) else [value])])
+                         for dim, value in filters.items()]
+        frames = []
+        for month in months:
+            for path in self._partition_files(month):
+                table = pq.read_table(path, columns=columns, filters=arrow_filters or None)
+                frame = table.to_pandas()
+                frame.insert(0, MONTH_COLUMN, month)
+                frames.append(frame)
+        output_columns = [MONTH_COLUMN] + dimensions + HISTORY_MEASURES + [PERCENT_MEASURE]
+        if not frames:
+            return pd.DataFrame(columns=output_columns)
+
+        data = pd.concat(frames, ignore_index=True)
+        result = data.groupby([MONTH_COLUMN] + dimensions)[HISTORY_MEASURES].sum().reset_index()
+        result[PERCENT_MEASURE] = (
+            result[GASPARD_MEASURE] / result[COUNT_MEASURE].where(result[COUNT_MEASURE] != 0) * 100
+        ).round(2).fillna(0)
+        return result[output_columns]
+
+    def trend_table(self, dimension: str, measure: str = PERCENT_MEASURE,
+                    filters: Optional[Dict[str, object]] = None, start=None, end=None) -> pd.DataFrame:
+        """Évolution d'une mesure présentée avec une ligne par valeur et une colonne par mois.
+
+        Args:
+            dimension (str): Dimension en lignes (ex: 'departement')
+            measure (str, optional): Mesure affichée (par défaut, le pourcentage GASPARD)
+            filters (dict, optional): Filtres (voir `trend`)
+            start (str, optional): Premier mois inclus
+            end (str, optional): Dernier mois inclus
+
+        Returns:
+            pandas.DataFrame: Tableau croisé valeur x mois
+        """
+        trend = self.trend([dimension], filters=filters, start=start, end=end)
+        if trend.empty:
+            return pd.DataFrame(columns=[dimension])
+        table = trend.pivot(index=dimension, columns=MONTH_COLUMN, values=measure)
+        return table.reset_index().rename_axis(columns=None)
@@ -0,0 +1,343 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import os
+import json
+import hashlib
+import numpy as np
+import pandas as pd
+from typing import Optional, Dict, List
+
+# Spécification par défaut des tables de statistiques
+DEFAULT_SPEC_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                 'resources', 'stats_spec.json')
+# Référence à la colonne type choisie lors du traitement
+TYPE_COLUMN_PLACEHOLDER = '$type_column'
+# Libellés d'affichage par défaut des colonnes des tables de statistiques
+SUMMARY_COLUMN_LABELS = {
+    'departement': 'Département',
+    'abrege_unite': 'Libellé Unité',
+    'type_materiel': 'Matériel',
+    'code_unite_terminal_de_saisie': 'Terminal de saisie',
+    'nombre_signalisation': 'Nombre de signalisation',
+    'nombre_signalisation_gaspard': 'Nombre de signalisation GASPARD',
+    'pourcentage_signalisation_gaspard': 'Pourcentage signalisation GASPARD',
+    'lignes_echantillon': 'Lignes échantillon'
+}
+# Mesures additives supportées (elles peuvent être ré-agrégées sans repasser sur les données)
+MEASURE_TYPES = ('count', 'count_non_empty', 'sum')
+# Nombre de lignes réellement observées, ajouté aux agrégations pondérées (échantillon)
+SAMPLE_ROWS_COLUMN = 'lignes_echantillon'
+
+
+def filter_key(filter_spec, type_column=None):
+    """Retourne une représentation hashable d'un filtre de table.
+
+    Args:
+        filter_spec (dict): Filtre de la spécification ({"column", "equals", "ignore_case"}) ou None
+        type_column (str, optional): Colonne type substituée à '$type_column'
+
+    Returns:
+        tuple: (colonne, valeurs acceptées, insensible à la casse) ou None si pas de filtre
+    """
+    if not filter_spec:
+        return None
+    column = filter_spec['column']
+    if column == TYPE_COLUMN_PLACEHOLDER:
+        column = type_column
+    accepted = filter_spec['equals']
+    accepted = tuple(accepted) if isinstance(accepted, (list, tuple)) else (accepted,)
+    ignore_case = bool(filter_spec.get('ignore_case', False))
+    if ignore_case:
+        accepted = tuple(str(value).upper() for value in accepted)
+    return (column, accepted, ignore_case)
+
+
+class StatsSpec:
+    """Spécification déclarative des tables de statistiques.
+
+    Chaque table décrit un filtre, des dimensions, des agrégations de synthèse
+    (`rollups`), des formatages et un ordre de tri. Les mesures sont communes à toutes
+    les tables et doivent être additives.
+    """
+
+    def __init__(self, spec: dict):
+        """Initialise et valide la spécification.
+
+        Args:
+            spec (dict): Contenu de la spécification
+        """
+        self.measures = spec.get('measures', {})
+        self.derived_measures = spec.get('derived_measures', {})
+        self.labels = dict(SUMMARY_COLUMN_LABELS, **spec.get('labels', {}))
+        self.tables = spec.get('tables', [])
+        self.fingerprint = hashlib.sha256(
+            json.dumps(spec, sort_keys=True).encode('utf-8')
+        ).hexdigest()
+        self._validate()
+
+    @classmethod
+    def load(cls, path: Optional[str] = None):
+        """Charge une spécification depuis un fichier JSON.
+
+        Args:
+            path (str, optional): Chemin du fichier (par défaut `resources/stats_spec.json`)
+
+        Returns:
+            StatsSpec: La spécification chargée
+        """
+        path = path or DEFAULT_SPEC_PATH
+        with open(path, 'r', encoding='utf-8') as f:
+            return cls(json.load(f))
+
+    def _validate(self):
+        """Vérifie la cohérence de la spécification (lève ValueError sinon)."""
+        if not self.measures:
+            raise ValueError("La spécification des statistiques ne définit aucune mesure.")
+        for name, measure in self.measures.items():
+            if measure.get('type') not in MEASURE_TYPES:
+                raise ValueError(f"Type de mesure non supporté pour '{name}': {measure.get('type')}")
+            if measure['type'] != 'count' and not measure.get('column'):
+                raise ValueError(f"La mesure '{name}' doit préciser une colonne.")
+        for name, derived in self.derived_measures.items():
+            for ref in (derived.get('numerator'), derived.get('denominator')):
+                if ref not in self.measures:
+                    raise ValueError(f"Mesure dérivée '{name}': mesure inconnue '{ref}'.")
+        for table in self.tables:
+            if not table.get('name') or not table.get('dimensions'):
+                raise ValueError("Chaque table doit avoir un nom et au moins une dimension.")
+            for rollup in table.get('rollups', []):
+                unknown = [dim for dim in rollup.get('dimensions', []) if dim not in table['dimensions']]
+                if unknown:
+                    raise ValueError(f"Table '{table['name']}': dimension(s) de synthèse hors table: {', '.join(unknown)}")
+
+    def table_requests(self, table, type_column=None) -> list:
+        """Retourne les agrégations (filtre, dimensions) nécessaires à une table."""
+        key = filter_key(table.get('filter'), type_column)
+        requests = [(key, tuple(table['dimensions']))]
+        for rollup in table.get('rollups', []):
+            requests.append((key, tuple(rollup['dimensions'])))
+        return requests
+
+    def required_columns(self, table, type_column=None) -> List[str]:
+        """Colonnes des données traitées nécessaires à une table."""
+        columns = list(table['dimensions'])
+        columns += [m['column'] for m in self.measures.values() if m.get('column') and m['column'] not in columns]
+        key = filter_key(table.get('filter'), type_column)
+        if key is not None and key[0] not in columns:
+            columns.append(key[0])
+        return columns
+
+    def input_columns(self, type_column=None) -> set:
+        """Ensemble des colonnes lues par l'ensemble des tables."""
+        columns = set()
+        for table in self.tables:
+            columns.update(col for col in self.required_columns(table, type_column) if col)
+        return columns
+
+
+class StatsPlanner:
+    """Exécute toutes les tables d'une spécification à partir d'un passage partagé.
+
+    Les indicateurs de mesures et les filtres sont évalués une seule fois sur les
+    données. Pour chaque filtre, un seul groupby est calculé par chaîne de dimensions :
+    les agrégations dont les dimensions sont un préfixe d'une agrégation plus fine en
+    sont déduites par ré-agrégation, sans repasser sur les données.
+    """
+
+    def __init__(self, spec: StatsSpec):
+        """Initialise le planificateur.
+
+        Args:
+            spec (StatsSpec): Spécification des statistiques
+        """
+        self.spec = spec
+
+    def plan(self, requests) -> Dict[tuple, tuple]:
+        """Associe chaque agrégation demandée à l'agrégation de base dont elle est déduite.
+
+        Args:
+            requests (iterable): Agrégations (clé de filtre, dimensions)
+
+        Returns:
+            dict: Agrégation demandée -> agrégation de base calculée sur les données
+        """
+        plan = {}
+        bases = []
+        # Les plus fines d'abord : les autres peuvent alors être déduites de celles-ci
+        for request in sorted(set(requests), key=lambda r: -len(r[1])):
+            key, dims = request
+            base = next((b for b in bases if b[0] == key and b[1][:len(dims)] == dims), None)
+            if base is None:
+                bases.append(request)
+                base = request
+            plan[request] = base
+        return plan
+
+    def execute(self, data, type_column=None, requests=None, weights=None) -> Dict[tuple, pd.DataFrame]:
+        """Calcule les agrégations demandées sur les données traitées.
+
+        Args:
+            data (pandas.DataFrame): Données traitées
+            type_column (str, optional): Colonne type utilisée par les filtres
+            requests (iterable, optional): Agrégations à calculer (par défaut toutes celles
+                des tables dont les colonnes sont présentes)
+            weights (array-like, optional): Poids de chaque ligne (données échantillonnées) :
+                les mesures deviennent des estimations pondérées et la colonne
+                `SAMPLE_ROWS_COLUMN` indique le nombre de lignes observées
+
+        Returns:
+            dict: Agrégation (clé de filtre, dimensions) -> DataFrame des mesures
+        """
+        if requests is None:
+            requests = []
+            for table in self.spec.tables:
+                if all(col in data.columns for col in self.spec.required_columns(table, type_column)):
+                    requests += self.spec.table_requests(table, type_column)
+        plan = self.plan(requests)
+        if not plan:
+            return {}
+
+        # --- Passage partagé : indicateurs de mesures et masques de filtres ---
+        indicators = {}
+        for name, measure in self.spec.measures.items():
+            if measure['type'] == 'count':
+                continue
+            values = data[measure['column']]
+            if measure['type'] == 'count_non_empty':
+                indicators[name] = (values.notna() & (values.astype(str).str.strip() != '')).astype(int).to_numpy()
+            else:
+                indicators[name] = pd.to_numeric(values, errors='coerce').fillna(0).to_numpy()
+        if weights is not None:
+            weights = np.asarray(weights, dtype=float)
+            indicators = {name: values * weights for name, values in indicators.items()}
+            indicators['__weight'] = weights
+        masks = {}
+        for key in {base[0] for base in plan.values()}:
+            if key is None:
+                continue
+            column, accepted, ignore_case = key
+            values = data[column].astype(str)
+            if ignore_case:
+                values = values.str.upper()
+            masks[key] = values.isin(accepted).to_numpy()
+
+        # --- Agrégations de base (un groupby par chaîne de dimensions) ---
+        base_results = {}
+        for base in set(plan.values()):
+            key, dims = base
+            frame = pd.DataFrame({col: data[col] for col in dims})
+            for name, values in indicators.items():
+                frame[name] = values
+            if key is not None:
+                frame = frame[masks[key]]
+            # Les valeurs manquantes sont conservées pour que les ré-agrégations restent exactes
+            grouped = frame.groupby(list(dims), dropna=False)
+            aggregated = grouped.size().rename('__count').to_frame()
+            if indicators:
+                aggregated = aggregated.join(grouped[list(indicators)].sum())
+            base_results[base] = aggregated.reset_index()
+
+        # --- Déduction des agrégations demandées ---
+        results = {}
+        for request, base in plan.items():
+            dims = list(request[1])
+            source = base_results[base].dropna(subset=dims)
+            value_columns = ['__count'] + list(indicators)
+            aggregated = source.groupby(dims)[value_columns].sum().reset_index()
+            count_column = '__count' if weights is None else '__weight'
+            for name, measure in self.spec.measures.items():
+                aggregated[name] = aggregated[count_column if measure['type'] == 'count' else name]
+            output = dims + list(self.spec.measures)
+            if weights is not None:
+                aggregated[SAMPLE_ROWS_COLUMN] = aggregated['__count']
+                output.append(SAMPLE_ROWS_COLUMN)
+            results[request] = aggregated[output]
+        return results
+
+    def table_error(self, table, columns, type_column=None) -> Optional[str]:
+        """Retourne le message d'erreur d'une table si elle ne peut pas être calculée."""
+        key = filter_key(table.get('filter'), type_column)
+        if key is not None and not key[0]:
+            return "Colonne 'type' non spécifiée pour le traitement."
+        missing_cols = [col for col in self.spec.required_columns(table, type_column) if col not in columns]
+        if missing_cols:
+            return f"Colonnes manquantes pour stats {table.get('label', table['name'])}: {', '.join(missing_cols)}"
+        return None
+
+    def build_tables(self, columns, aggregates, type_column=None) -> dict:
+        """Met en forme les tables de la spécification à partir des agrégations.
+
+        Args:
+            columns (list[str]): Colonnes des données traitées
+            aggregates (dict): Agrégations (clé de filtre, dimensions) -> DataFrame
+            type_column (str, optional): Colonne type utilisée par les filtres
+
+        Returns:
+            dict: Tables (et erreurs éventuelles) indexées par nom
+        """
+        stats = {}
+        for table in self.spec.tables:
+            stats[table['name']] = pd.DataFrame()
+            error = self.table_error(table, columns, type_column)
+            if error:
+                stats[table.get('error_key', table['name'] + '_error')] = error
+                print(f"Attention: {error}")
+                continue
+            requests = self.spec.table_requests(table, type_column)
+            parts = [aggregates.get(request) for request in requests]
+            if any(part is None for part in parts) or all(part.empty for part in parts):
+                print(f"Aucune donnée pour les statistiques {table.get('label', table['name'])}.")
+                continue
+            stats[table['name']] = self._format_table(table, parts[0], parts[1:])
+            print(f"Statistiques {table.get('label', table['name'])} générées avec {len(stats[table['name']])} lignes.")
+        return stats
+
+    def compute(self, data, type_column=None) -> dict:
+        """Calcule toutes les tables de la spécification sur les données traitées.
+
+        Args:
+            data (pandas.DataFrame): Données traitées
+            type_column (str, optional): Colonne type utilisée par les filtres
+
+        Returns:
+            dict: Tables (et erreurs éventuelles) indexées par nom
+        """
+        if data is None or data.empty:
+            print("Aucune donnée traitée disponible pour générer les statistiques.")
+            return {table['name']: pd.DataFrame() for table in self.spec.tables}
+        return self.build_tables(list(data.columns), self.execute(data, type_column), type_column)
+
+    def _format_table(self, table, detail, rollups):
+        """Assemble le détail et les lignes de synthèse, calcule les mesures dérivées et trie."""
+        frames = [detail]
+        for rollup_spec, rollup in zip(table.get('rollups', []), rollups):
+            rollup = rollup.copy()
+            for column, template in rollup_spec.get('values', {}).items():
+                if template is None:
+                    rollup[column] = pd.NA
+                else:
+                    rollup[column] = [template.format(**row) for row in rollup[rollup_spec['dimensions']].to_dict('records')]
+            frames.append(rollup[list(detail.columns)])
+        result = pd.concat(frames, ignore_index=True) if len(frames) > 1 else detail.copy()
+
+        for name, derived in self.spec.derived_measures.items():
+            ratio = result[derived['numerator']] / result[derived['denominator']] * derived.get('scale', 1)
+            result[name] = ratio.round(derived.get('decimals', 2)).fillna(0)
+        for column, width in table.get('zfill', {}).items():
+            result[column] = result[column].astype(str).str.zfill(width)
+
+        # --- Tri ---
+        sort_columns, temporary = [], []
+        for entry in table.get('order_by', []):
+            if isinstance(entry, dict) and entry.get('prefix_first'):
+                temp = f"__first_{len(temporary)}"
+                result[temp] = (~result[entry['column']].astype(str).str.startswith(entry['prefix_first'], na=False)).astype(int)
+                temporary.append(temp)
+                sort_columns.append(temp)
+            else:
+                sort_columns.append(entry['column'] if isinstance(entry, dict) else entry)
+        if sort_columns:
+            result.sort_values(by=sort_columns, inplace=True)
+        result.drop(columns=temporary, inplace=True)
+        return result.rename(columns=self.spec.labels)
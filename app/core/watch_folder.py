@@ -0,0 +1,292 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import os
+import json
+import time
+import queue
+import datetime
+from typing import Optional
+from core.data_processor import DataProcessor
+from core.processing_profile import ProcessingProfile
+from core.run_report import process_extract
+from core.stats_history import default_stats_history
+from core.deduplication import FingerprintStore
+from core.backends import get_backend
+from core.execution_planner import ExecutionPlanner
+from utils.directory_manager import DirectoryManager
+from utils.result_cache import ResultCache
+
+try:
+    from watchdog.observers import Observer  # Notifications inotify sous Linux
+except ImportError:  # Dépendance optionnelle : repli sur la scrutation périodique
+    Observer = None
+
+# Extensions des extractions traitées automatiquement
+WATCHED_EXTENSIONS = ('.csv', '.xlsx', '.xls')
+# Nom du registre des fichiers déjà traités (dans le dossier de sortie)
+LEDGER_FILE_NAME = 'fichiers_traites.json'
+
+
+class ProcessedLedger:
+    """Registre persistant des extractions déjà traitées.
+
+    Chaque entrée est indexée par une clé combinant l'empreinte du contenu du fichier,
+    le profil de traitement et la version de l'annuaire : un fichier renommé ou
+    redéposé avec le même contenu n'est pas retraité, y compris après un redémarrage
+    du démon, mais il l'est si le profil ou l'annuaire change. Les fichiers en erreur
+    sont retentés.
+    """
+
+    def __init__(self, path: str):
+        """Initialise le registre.
+
+        Args:
+            path (str): Chemin du fichier JSON du registre
+        """
+        self.path = path
+        self.entries = {}
+        if os.path.exists(path):
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    self.entries = json.load(f)
+            except Exception as e:
+                print(f"Registre des fichiers traités illisible ({path}), il sera recréé: {e}")
+
+    def contains(self, key: str) -> bool:
+        """Indique si un contenu a déjà été traité avec succès (les erreurs sont retentées)."""
+        return self.entries.get(key, {}).get('status') == 'ok'
+
+    def record(self, key: str, source_path: str, status: str, outputs=None, error=None, content=None):
+        """Enregistre le résultat du traitement d'un fichier puis sauvegarde le registre.
+
+        Args:
+            key (str): Clé du traitement (contenu, profil et version de l'annuaire)
+            source_path (str): Chemin du fichier traité
+            status (str): 'ok' ou 'erreur'
+            outputs (list[str], optional): Fichiers exportés
+            error (str, optional): Message d'erreur
+            content (str, optional): Empreinte du contenu du fichier
+        """
+        self.entries[key] = {
+            'source': source_path,
+            'content': content,
+            'status': status,
+            'outputs': outputs or [],
+            'error': error,
+            'processed_at': datetime.datetime.now().isoformat(timespec='seconds')
+        }
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.entries, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.path)
+
+
+class _InboxEventHandler:
+    """Transmet les créations et déplacements de fichiers du dossier surveillé à une file."""
+
+    def __init__(self, events: queue.Queue):
+        self.events = events
+
+    def dispatch(self, event):
+        if event.is_directory or event.event_type not in ('created', 'moved', 'closed'):
+            return
+        path = getattr(event, 'dest_path', None) or event.src_path
+        self.events.put(os.fsdecode(path))
+
+
+class WatchFolderDaemon:
+    """Traite automatiquement chaque nouvelle extraction déposée dans un dossier.
+
+    Le dossier est surveillé par notifications du système (inotify via watchdog) ou,
+    à défaut, par scrutation périodique. Chaque fichier stable est importé, traité avec
+    le profil enregistré, puis les données fusionnées, les statistiques et le rapport
+    d'exécution sont exportés de manière atomique dans le dossier de sortie.
+    """
+
+    def __init__(self, inbox_dir: str, output_dir: str, profile: ProcessingProfile,
+                 directory_manager: Optional[DirectoryManager] = None,
+                 poll_interval: float = 2.0, settle_time: float = 1.0,
+                 planner: Optional[ExecutionPlanner] = None):
+        """Initialise le démon.
+
+        Args:
+            inbox_dir (str): Dossier surveillé
+            output_dir (str): Dossier des exports et du registre des fichiers traités
+            profile (ProcessingProfile): Paramètres de traitement
+            directory_manager (DirectoryManager, optional): Gestionnaire d'annuaire
+            poll_interval (float, optional): Intervalle de scrutation en secondes
+            settle_time (float, optional): Durée sans modification avant de considérer
+                qu'un fichier est entièrement déposé
+            planner (ExecutionPlanner, optional): Choix automatique du mode d'exécution
+                de chaque fichier (si le profil n'impose pas de moteur)
+        """
+        self.inbox_dir = inbox_dir
+        self.output_dir = output_dir
+        self.profile = profile
+        self.poll_interval = poll_interval
+        self.settle_time = settle_time
+        self.planner = planner
+        self.directory_manager = directory_manager or DirectoryManager()
+        self._directory_signature = self._directory_file_signature()
+        backend = get_backend(profile.backend) if profile.backend else None
+        self.data_processor = DataProcessor(self.directory_manager, result_cache=ResultCache(), backend=backend,
+                                            stats_history=default_stats_history(),
+                                            fingerprint_store=FingerprintStore())
+        self.ledger = ProcessedLedger(os.path.join(output_dir, LEDGER_FILE_NAME))
+        self.events = queue.Queue()
+        self._pending = {} # chemin -> (taille, date de modification) lors du dernier contrôle
+        self._seen = {} # chemin -> (taille, date de modification) déjà traités pendant cette session
+        self._running = False
+
+    @staticmethod
+    def is_candidate(path: str) -> bool:
+        """Indique si un fichier doit être traité (extension suivie, fichier non temporaire)."""
+        name = os.path.basename(path)
+        return (not name.startswith('.') and not name.startswith('~$')
+                and name.lower().endswith(WATCHED_EXTENSIONS))
+
+    def scan(self):
+        """Ajoute les fichiers présents dans le dossier surveillé à la liste d'attente."""
+        for name in sorted(os.listdir(self.inbox_dir)):
+            path = os.path.join(self.inbox_dir, name)
+            if os.path.isfile(path) and self.is_candidate(path):
+                self._pending.setdefault(path, None)
+
+    def _ready_files(self):
+        """Retourne les fichiers en attente (chemin, signature) dont la taille et la date ne changent plus."""
+        ready = []
+        now = time.time()
+        for path, previous in list(self._pending.items()):
+            try:
+                stat = os.stat(path)
+            except OSError:
+                del self._pending[path] # Fichier supprimé ou déplacé entre-temps
+                continue
+            signature = (stat.st_size, stat.st_mtime)
+            if self._seen.get(path) == signature:
+                del self._pending[path] # Inchangé depuis son traitement
+                continue
+            if previous == signature and now - stat.st_mtime >= self.settle_time:
+                del self._pending[path]
+                ready.append((path, signature))
+            else:
+                self._pending[path] = signature
+        return ready
+
+    def _directory_file_signature(self):
+        """Date de modification et taille du fichier annuaire (None s'il n'existe pas)."""
+        try:
+            stat = os.stat(self.directory_manager.directory_path)
+        except OSError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def refresh_directory(self) -> bool:
+        """Recharge l'annuaire si son fichier a changé depuis le dernier chargement.
+
+        Le démon tourne longtemps : une fusion faite depuis l'interface doit être prise
+        en compte (et changer la clé du registre) sans redémarrage.
+
+        Returns:
+            bool: True si l'annuaire a été rechargé
+        """
+        signature = self._directory_file_signature()
+        if signature == self._directory_signature:
+            return False
+        # Signature relevée avant la lecture : une modification pendant le rechargement
+        # sera vue au contrôle suivant
+        self.directory_manager.reload()
+        self._directory_signature = signature
+        print(f"Annuaire modifié, rechargé (version {self.directory_manager.get_version()[:12]}).")
+        return True
+
+    def process_file(self, path: str) -> bool:
+        """Traite une extraction et exporte ses résultats.
+
+        Args:
+            path (str): Chemin du fichier à traiter
+
+        Returns:
+            bool: True si le fichier a été traité, False s'il a été ignoré ou en erreur
+        """
+        self.refresh_directory()
+        fingerprint = ResultCache.hash_file(path)
+        # Un changement de profil ou d'annuaire entraîne le retraitement du même contenu
+        key = ResultCache.make_key(fingerprint, self.directory_manager.get_version(), self.profile.to_dict())
+        if self.ledger.contains(key):
+            print(f"Fichier déjà traité (même contenu, profil et annuaire), ignoré: {path}")
+            return False
+
+        started = time.time()
+        print(f"Nouvelle extraction détectée: {path}")
+        try:
+            report = process_extract(self.data_processor, self.profile, path, self.output_dir,
+                                     planner=self.planner)
+        except Exception as e:
+            print(f"Erreur lors du traitement de {path}: {e}")
+            # Erreur conservée dans le registre ; le fichier sera retenté au prochain dépôt
+            # ou redémarrage (pas de nouvelle tentative en boucle pendant la session)
+            self.ledger.record(key, path, 'erreur', error=str(e), content=fingerprint)
+            return False
+
+        self.ledger.record(key, path, 'ok', outputs=report.outputs, content=fingerprint)
+        print(report.format_text())
+        print(f"Extraction traitée en {time.time() - started:.1f} s.")
+        return True
+
+    def run_once(self):
+        """Traite les fichiers en attente devenus stables (une itération de la boucle)."""
+        while True:
+            try:
+                path = self.events.get_nowait()
+            except queue.Empty:
+                break
+            if self.is_candidate(path):
+                self._pending.setdefault(path, None)
+        for path, signature in self._ready_files():
+            self.process_file(path)
+            self._seen[path] = signature
+
+    def run(self):
+        """Surveille le dossier jusqu'à interruption (Ctrl+C ou `stop`)."""
+        os.makedirs(self.output_dir, exist_ok=True)
+        observer = None
+        if Observer is not None:
+            observer = Observer()
+            observer.schedule(_InboxEventHandler(self.events), self.inbox_dir, recursive=False)
+            observer.start()
+            print(f"Surveillance de {self.inbox_dir} (notifications du système).")
+        else:
+            print(f"Surveillance de {self.inbox_dir} par scrutation toutes les {self.poll_interval} s "
+                  "(installer watchdog pour les notifications inotify).")
+
+        self._running = True
+        # Fichiers déposés pendant l'arrêt du démon
+        self.scan()
+        try:
+            while self._running:
+                if observer is None:
+                    self.scan()
+                self.run_once()
+                # Attente courte tant que des fichiers sont en cours de dépôt
+                wait = min(self.poll_interval, self.settle_time / 2) if self._pending else self.poll_interval
+                try:
+                    path = self.events.get(timeout=wait)
+                    self.events.put(path)
+                except queue.Empty:
+                    pass
+        except KeyboardInterrupt:
+            print("Arrêt de la surveillance demandé.")
+        finally:
+            self._running = False
+            if observer is not None:
+                observer.stop()
+                observer.join()
+
+    def stop(self):
+        """Demande l'arrêt de la boucle de surveillance."""
+        self._running = False
@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+from PyQt5.QtCore import Qt, QAbstractTableModel, QModelIndex
+import pandas as pd
+
+
+class DataFrameTableModel(QAbstractTableModel):
+    """Modèle de tableau en lecture seule adossé directement à un DataFrame.
+
+    Aucune cellule n'est copiée dans le modèle : seules les cellules visibles sont
+    lues dans le DataFrame, l'affichage est donc immédiat quel que soit le nombre
+    de lignes.
+    """
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._frame = pd.DataFrame()
+
+    def set_frame(self, frame):
+        """Remplace le DataFrame affiché.
+
+        Args:
+            frame (pandas.DataFrame): Données à afficher (None pour vider le tableau)
+        """
+        self.beginResetModel()
+        self._frame = frame if frame is not None else pd.DataFrame()
+        self.endResetModel()
+
+    def clear(self):
+        """Vide le tableau."""
+        self.set_frame(None)
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._frame)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._frame.columns)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or role != Qt.DisplayRole:
+            return None
+        value = self._frame.iat[index.row(), index.column()]
+        return "" if pd.isna(value) else str(value)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role != Qt.DisplayRole:
+            return None
+        if orientation == Qt.Horizontal:
+            return str(self._frame.columns[section])
+        return str(section + 1)
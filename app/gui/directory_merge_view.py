@@ -4,12 +4,14 @@
 from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel, QPushButton, 
                             QFileDialog, QComboBox, QGroupBox, QGridLayout, QMessageBox,
                             QTableView, QLineEdit, QCheckBox,
-                            QListWidget, QListWidgetItem, QSizePolicy)
-from PyQt5.QtCore import Qt
+                            QListWidget, QListWidgetItem, QSizePolicy, QDateEdit)
+from PyQt5.QtCore import Qt, QDate
 from PyQt5.QtGui import QStandardItemModel, QStandardItem
 import pandas as pd
 import os
+import time
 from utils.file_handlers import import_csv
+from gui.dataframe_model import DataFrameTableModel
 
 class DirectoryMergeView(QWidget):
     """Vue de fusion de fichiers CSV pour créer un annuaire."""
@@ -117,10 +119,17 @@ class DirectoryMergeView(QWidget):
         self.output_file_edit = QLineEdit("directory.csv")
         merge_config_layout.addWidget(self.output_file_edit, 1, 1)
         
+        # Date d'entrée en vigueur de la nouvelle version de l'annuaire
+        merge_config_layout.addWidget(QLabel("En vigueur à partir du:"), 2, 0)
+        self.effective_date_edit = QDateEdit(QDate.currentDate())
+        self.effective_date_edit.setCalendarPopup(True)
+        self.effective_date_edit.setDisplayFormat("dd/MM/yyyy")
+        merge_config_layout.addWidget(self.effective_date_edit, 2, 1)
+        
         # Info sur le formatage/combinaison automatique
         info_label = QLabel("Note: Les clés (Code Unité) seront formatées (GN+8 chiffres) et les doublons combinés automatiquement.")
         info_label.setStyleSheet("font-style: italic; color: grey;")
-        merge_config_layout.addWidget(info_label, 2, 0, 1, 2)
+        merge_config_layout.addWidget(info_label, 3, 0, 1, 2)
 
         merge_config_group.setLayout(merge_config_layout)
         main_layout.addWidget(merge_config_group)
@@ -133,7 +142,48 @@ class DirectoryMergeView(QWidget):
         self.merge_button.setEnabled(False)
         button_layout.addWidget(self.merge_button)
         main_layout.addLayout(button_layout)
+
+        # Section de recherche dans l'annuaire courant
+        search_group = QGroupBox("Rechercher dans l'annuaire")
+        search_layout = QVBoxLayout()
+        search_layout.setContentsMargins(10, 15, 10, 15)
+        self.search_edit = QLineEdit()
+        self.search_edit.setPlaceholderText("Code unité (GN00012345), début d'abrégé ou de nom, ou mots (ex: brigade evry)")
+        self.search_edit.setClearButtonEnabled(True)
+        # Index construit une fois par version de l'annuaire : recherche à chaque frappe
+        self.search_edit.textChanged.connect(self._search_directory)
+        search_layout.addWidget(self.search_edit)
+        self.search_status_label = QLabel("")
+        self.search_status_label.setStyleSheet("font-style: italic; color: grey;")
+        search_layout.addWidget(self.search_status_label)
+        self.search_model = DataFrameTableModel() # Cellules lues à l'affichage, sans copie
+        self.search_table = QTableView()
+        self.search_table.setModel(self.search_model)
+        self.search_table.setMinimumHeight(150)
+        search_layout.addWidget(self.search_table)
+        search_group.setLayout(search_layout)
+        main_layout.addWidget(search_group)
+        
+    def _search_directory(self, text=None):
+        """Affiche les unités de l'annuaire correspondant à la saisie."""
+        query = self.search_edit.text().strip()
+        if not query:
+            self.search_model.clear()
+            self.search_status_label.setText("")
+            return
+        started = time.perf_counter()
+        try:
+            result = self.directory_manager.search(query)
+        except Exception as e:
+            self.search_model.clear()
+            self.search_status_label.setText(f"Erreur lors de la recherche: {str(e)}")
+            return
+        elapsed = (time.perf_counter() - started) * 1000
+        self.search_model.set_frame(result.data)
+        shown = f" ({len(result.data)} affichées)" if len(result.data) < result.total else ""
+        self.search_status_label.setText(f"{result.total} unité(s) trouvée(s){shown} en {elapsed:.0f} ms.")
         
+
     def _import_file1(self):
         """Importe le premier fichier CSV."""
         file_path, _ = QFileDialog.getOpenFileName(
@@ -249,12 +299,24 @@ class DirectoryMergeView(QWidget):
                 key_column2=key2,
                 how=how,
                 columns_to_delete1=cols_to_delete1, # Passer la liste
-                columns_to_delete2=cols_to_delete2  # Passer la liste
+                columns_to_delete2=cols_to_delete2, # Passer la liste
+                data1=self.file1_data, # Données déjà importées : pas de seconde lecture
+                data2=self.file2_data,
+                effective_date=self.effective_date_edit.date().toString("yyyy-MM-dd")
             )
             
             if success:
+                cardinality = self.directory_manager.last_merge_cardinality or {}
+                details = ""
+                if cardinality:
+                    details = (f"\n\nClés uniques : {cardinality['unique_keys1']} (fichier 1), "
+                               f"{cardinality['unique_keys2']} (fichier 2)."
+                               f"\nLignes après fusion par clé : {cardinality['expected_rows']} "
+                               f"(jointure brute : {cardinality['raw_join_rows']}).")
                 QMessageBox.information(self, "Fusion réussie", 
-                                        f"L'annuaire a été créé/mis à jour avec succès dans {output_path}")
+                                        f"L'annuaire a été créé/mis à jour avec succès dans {output_path}{details}")
+                # Résultats de la recherche en cours sur le nouvel annuaire
+                self._search_directory()
             else:
                 QMessageBox.critical(self, "Erreur de fusion", 
                                      "La fusion a échoué. Vérifiez la console pour plus de détails.")
@@ -1,20 +1,28 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
-from PyQt5.QtWidgets import QWidget, QVBoxLayout, QHBoxLayout, QLabel, QPushButton, QTableView, QComboBox, QSizePolicy, QSpacerItem, QFileDialog, QMessageBox, QListWidget, QListWidgetItem, QGroupBox, QAbstractItemView
-from PyQt5.QtCore import Qt
-from PyQt5.QtGui import QStandardItemModel, QStandardItem
+from PyQt5.QtWidgets import QWidget, QVBoxLayout, QHBoxLayout, QLabel, QPushButton, QTableView, QComboBox, QSizePolicy, QSpacerItem, QFileDialog, QMessageBox, QListWidget, QListWidgetItem, QGroupBox, QAbstractItemView, QCheckBox
+from PyQt5.QtCore import Qt, pyqtSignal
 from utils.file_handlers import import_data, export_data
+from utils.sharded_export import export_by_department
+from utils.arrow_files import pa
+from core.processing_profile import ProcessingProfile
+from gui.dataframe_model import DataFrameTableModel
 import os
 import datetime
 
 class ImportView(QWidget):
     """Vue d'importation et de visualisation des données."""
+
+    # Fin d'un traitement exécuté hors processus (future, données traitées)
+    processing_finished = pyqtSignal(object, object)
     
-    def __init__(self, data_processor, stats_view):
+    def __init__(self, data_processor, stats_view, process_worker=None):
         super().__init__()
         self.data_processor = data_processor
         self.stats_view = stats_view
+        self.process_worker = process_worker # Exécution hors processus (optionnelle)
+        self.processing_finished.connect(self._on_worker_finished)
         self._setup_ui()
         
     def _setup_ui(self):
@@ -44,7 +52,7 @@ class ImportView(QWidget):
         
         # Table de visualisation des données
         self.data_table = QTableView()
-        self.data_model = QStandardItemModel()
+        self.data_model = DataFrameTableModel() # Cellules lues à l'affichage, sans copie
         self.data_table.setModel(self.data_model)
         self.data_table.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Expanding)
         main_layout.addWidget(self.data_table, stretch=3)
@@ -67,15 +75,40 @@ class ImportView(QWidget):
         self.type_column = QComboBox()
         self.type_column.setMinimumWidth(150)
         selector_layout.addWidget(self.type_column)
+        selector_layout.addSpacing(15)
+        # Version de l'annuaire (retraitement d'une période passée)
+        selector_layout.addWidget(QLabel("Annuaire:"))
+        self.directory_version_combo = QComboBox()
+        self.directory_version_combo.setMinimumWidth(180)
+        selector_layout.addWidget(self.directory_version_combo)
         selector_layout.addStretch()
         left_options_layout.addLayout(selector_layout)
         
+        # Dédoublonnage des lignes importées (extractions qui se recouvrent)
+        self.dedup_checkbox = QCheckBox("Écarter les doublons (lignes identiques, y compris celles déjà traitées)")
+        left_options_layout.addWidget(self.dedup_checkbox)
+        # Export des données fusionnées en un fichier par département
+        self.shard_export_checkbox = QCheckBox("Exporter un fichier par département (avec manifeste)")
+        left_options_layout.addWidget(self.shard_export_checkbox)
+        
         # Bouton Traiter
         self.process_button = QPushButton("Traiter et Exporter")
         self.process_button.clicked.connect(self._process_data)
         self.process_button.setEnabled(False)
+        # Bouton d'aperçu : statistiques estimées sur un échantillon, sans export
+        self.preview_button = QPushButton("Aperçu rapide")
+        self.preview_button.setToolTip("Statistiques estimées sur un échantillon des données "
+                                       "(avec intervalle de confiance), sans export")
+        self.preview_button.clicked.connect(self._preview_data)
+        self.preview_button.setEnabled(False)
+        # Bouton d'enregistrement du profil (réutilisé par le mode surveillance de dossier)
+        self.save_profile_button = QPushButton("Enregistrer le profil...")
+        self.save_profile_button.clicked.connect(self._save_profile)
+        self.save_profile_button.setEnabled(False)
         button_hbox = QHBoxLayout()
         button_hbox.addStretch()
+        button_hbox.addWidget(self.save_profile_button)
+        button_hbox.addWidget(self.preview_button)
         button_hbox.addWidget(self.process_button)
         left_options_layout.addStretch()
         left_options_layout.addLayout(button_hbox)
@@ -100,6 +133,8 @@ class ImportView(QWidget):
         self.type_column.clear()
         self.columns_to_delete_list.clear()
         self.process_button.setEnabled(False)
+        self.preview_button.setEnabled(False)
+        self.save_profile_button.setEnabled(False)
         
         if self.data_processor.has_data():
             data = self.data_processor.get_data()
@@ -112,32 +147,31 @@ class ImportView(QWidget):
             
             # Mise à jour du combobox des colonnes
             self._update_columns_combo(data)
+            # Reprendre les colonnes du dernier traitement (ex: session restaurée)
+            params = self.data_processor.processing_params
+            if params.get('directory_column') in data.columns:
+                self.directory_column.setCurrentText(params['directory_column'])
+            if params.get('type_column') in data.columns:
+                self.type_column.setCurrentText(params['type_column'])
+            self.dedup_checkbox.setChecked(params.get('dedup_columns') is not None)
             
             # Mettre à jour la liste de suppression
             self._update_delete_list(data)
             
+            # Versions de l'annuaire disponibles
+            self._update_directory_versions()
+            
             # Activation du bouton de traitement
             self.process_button.setEnabled(True)
+            self.preview_button.setEnabled(True)
+            self.save_profile_button.setEnabled(True)
         else:
             # Réinitialisation si pas de données
             self.status_label.setText("Aucune donnée importée")
     
     def _populate_table(self, data):
-        """Remplit le tableau avec les données."""
-        self.data_model.clear()
-        
-        # Configuration des en-têtes
-        if not data.empty:
-            headers = list(data.columns)
-            self.data_model.setHorizontalHeaderLabels(headers)
-            
-            # Remplissage des données
-            for row in range(len(data)):
-                items = []
-                for col in range(len(headers)):
-                    item = QStandardItem(str(data.iloc[row, col]))
-                    items.append(item)
-                self.data_model.appendRow(items)
+        """Affiche les données dans le tableau (seules les cellules visibles sont lues)."""
+        self.data_model.set_frame(data)
     
     def _update_columns_combo(self, data):
         """Met à jour les combo boxes des colonnes disponibles."""
@@ -148,6 +182,21 @@ class ImportView(QWidget):
             self.directory_column.addItems(column_names)
             self.type_column.addItems(column_names)
     
+    def _update_directory_versions(self):
+        """Met à jour la liste des versions publiées de l'annuaire."""
+        self.directory_version_combo.clear()
+        self.directory_version_combo.addItem("Annuaire actuel", None)
+        try:
+            versions = self.data_processor.directory_manager.list_versions()
+        except Exception as e:
+            print(f"Historique de l'annuaire illisible: {e}")
+            versions = []
+        # Les plus récentes en premier
+        for entry in reversed(versions):
+            self.directory_version_combo.addItem(
+                f"En vigueur au {entry['effective_date']} ({entry['rows']} lignes)", entry['effective_date']
+            )
+    
     def _import_anfsi_data(self):
         """Ouvre une boîte de dialogue pour importer une extraction ANFSI (CSV)."""
         file_path, _ = QFileDialog.getOpenFileName(
@@ -158,7 +207,7 @@ class ImportView(QWidget):
         if file_path:
             try:
                 data = import_data(file_path)
-                self.data_processor.set_data(data)
+                self.data_processor.set_data(data, source_path=file_path)
                 self.update_view()
 
                 # --- Suggestion : Pré-sélection de la colonne clé si connue ---
@@ -204,52 +253,187 @@ class ImportView(QWidget):
                                                 f"La colonne '{col_text}' ne peut pas être supprimée car elle est utilisée comme Clé ou Type.")
             # ------------------------------------------
 
+            directory_date = self.directory_version_combo.currentData()
+            print(f"Traitement lancé avec Clé='{directory_col}', Type='{type_col}', Supprimer={columns_to_delete}")
+            if self.process_worker is not None:
+                # --- 1. Traitement dans un processus séparé : l'interface reste réactive ---
+                data = self.data_processor.data
+                try:
+                    future = self.process_worker.submit(
+                        data, directory_col, type_column=type_col, columns_to_delete=columns_to_delete,
+                        directory_date=directory_date, source_path=self.data_processor.source_path,
+                        data_fingerprint=self.data_processor.data_fingerprint,
+                        dedup_columns=self._dedup_columns()
+                    )
+                except Exception as e:
+                    if pa is None or not isinstance(e, pa.ArrowException):
+                        QMessageBox.critical(self, "Erreur Critique", f"Impossible de lancer le traitement : {str(e)}")
+                        return
+                    # Données non transférables au format Arrow : traitement dans le processus courant
+                    print(f"Transfert Arrow impossible ({e}), traitement dans le processus courant.")
+                    future = None
+                if future is not None:
+                    self.process_button.setEnabled(False)
+                    self.status_label.setText("Traitement en cours...")
+                    # Le signal ramène la fin du traitement dans le fil de l'interface
+                    future.add_done_callback(lambda done: self.processing_finished.emit(done, data))
+                    return
+
             try:
                 # --- 1. Traitement/Fusion avec l'annuaire (passant clé, type et colonnes à supprimer) ---
-                print(f"Traitement lancé avec Clé='{directory_col}', Type='{type_col}', Supprimer={columns_to_delete}")
                 success = self.data_processor.process_with_directory(
                     directory_col,
                     type_column=type_col,
-                    columns_to_delete=columns_to_delete # Passer la liste
+                    columns_to_delete=columns_to_delete, # Passer la liste
+                    directory_date=directory_date,
+                    dedup_columns=self._dedup_columns()
                 )
+            except Exception as e:
+                QMessageBox.critical(self, "Erreur Critique", f"Une erreur est survenue lors du traitement : {str(e)}")
+                self.status_label.setText("Erreur lors du traitement.")
+                return
+            self._finish_processing(success, directory_col, type_col)
+
+    def _on_worker_finished(self, future, data):
+        """Reçoit le résultat du processus de travail (projeté en mémoire, sans copie)."""
+        self.process_button.setEnabled(self.data_processor.has_data())
+        if data is not self.data_processor.data:
+            return # Données remplacées pendant le traitement : résultat périmé
+        try:
+            result = future.result()
+        except ValueError as e:
+            print(f"Erreur: {e}")
+            self.data_processor.set_error(str(e))
+            success = False
+        except Exception as e:
+            QMessageBox.critical(self, "Erreur Critique", f"Une erreur est survenue lors du traitement : {str(e)}")
+            self.status_label.setText("Erreur lors du traitement.")
+            return
+        else:
+            self.data_processor.set_result(result)
+            success = True
+        params = self.data_processor.processing_params
+        self._finish_processing(success, params.get('directory_column'), params.get('type_column'))
+
+    def _preview_data(self):
+        """Affiche des statistiques estimées sur un échantillon des données (sans export)."""
+        directory_col = self.directory_column.currentText()
+        type_col = self.type_column.currentText()
+        if not self.data_processor.has_data() or not directory_col or not type_col:
+            return
+        if directory_col == type_col:
+            QMessageBox.warning(self, "Sélection Invalide",
+                                "La colonne clé et la colonne type ne peuvent pas être identiques.")
+            return
+        try:
+            result = self.data_processor.preview(
+                self.data_processor.data, directory_col, type_column=type_col,
+                columns_to_delete=self._selected_columns_to_delete(directory_col, type_col),
+                directory_date=self.directory_version_combo.currentData(),
+                dedup_columns=self._dedup_columns()
+            )
+        except ValueError as e:
+            QMessageBox.warning(self, "Aperçu Échoué", str(e))
+            return
+        except Exception as e:
+            QMessageBox.critical(self, "Erreur Critique", f"Une erreur est survenue lors de l'aperçu : {str(e)}")
+            return
+        self.data_processor.set_result(result)
+        preview = result.stats['preview']
+        self.status_label.setText(f"Aperçu estimé sur {preview['sample_rows']} lignes sur "
+                                  f"{preview['total_rows']} (résultats provisoires, non exportés).")
+        if self.stats_view:
+            self.stats_view.update_view()
+
+    def _finish_processing(self, success, directory_col, type_col):
+        """Met à jour les vues et exporte les données fusionnées après un traitement."""
+        try:
+            if success and self.data_processor.processed_data is not None:
+                self.status_label.setText(f"Données traitées (Clé='{directory_col}', Type='{type_col}').")
 
-                if success and self.data_processor.processed_data is not None:
-                    self.status_label.setText(f"Données traitées (Clé='{directory_col}', Type='{type_col}').")
-                    
-                    # --- Mettre à jour les vues des statistiques MAINTENANT ---
-                    if self.stats_view:
-                        self.stats_view.update_view()
-                    # -----------------------------------------------------
+                # --- Mettre à jour les vues des statistiques MAINTENANT ---
+                if self.stats_view:
+                    self.stats_view.update_view()
+                # -----------------------------------------------------
 
-                    # --- 2. Récupération des données fusionnées ---
-                    processed_df = self.data_processor.processed_data
+                # --- 2. Récupération des données fusionnées ---
+                processed_df = self.data_processor.processed_data
 
-                    # --- 3. Génération du nom de fichier d'export ---
-                    now = datetime.datetime.now()
-                    month_year = now.strftime("%m-%Y") # Format MM-YYYY
-                    # Assurer que le répertoire exports existe
-                    export_dir = "exports"
-                    os.makedirs(export_dir, exist_ok=True)
-                    export_filename = os.path.join(export_dir, f"STATS_GASPARD_{month_year}.csv")
+                # --- 3. Génération du nom de fichier d'export ---
+                now = datetime.datetime.now()
+                month_year = now.strftime("%m-%Y") # Format MM-YYYY
+                # Assurer que le répertoire exports existe
+                export_dir = "exports"
+                os.makedirs(export_dir, exist_ok=True)
+                export_filename = os.path.join(export_dir, f"STATS_GASPARD_{month_year}.csv")
 
-                    # --- 4. Exportation des données fusionnées ---
-                    if export_data(processed_df, export_filename, format_type='csv'):
-                        QMessageBox.information(self, 
-                                                "Exportation Réussie", 
-                                                f"Les données fusionnées ont été exportées avec succès vers :\n{export_filename}")
-                        # Optionnel : Mettre à jour le statut label
-                        # self.status_label.setText(f"Données traitées et exportées vers {export_filename}")
+                # --- 4. Exportation des données fusionnées ---
+                if self.shard_export_checkbox.isChecked():
+                    # Un fichier par département, écrits en parallèle, et un manifeste
+                    shard_dir = os.path.join(export_dir, f"STATS_GASPARD_{month_year}_departements")
+                    try:
+                        sharded = export_by_department(processed_df, shard_dir, f"STATS_GASPARD_{month_year}")
+                    except (ValueError, OSError) as e:
+                        QMessageBox.warning(self, "Erreur d'exportation",
+                                            f"La fusion a réussi mais l'export par département a échoué :\n{e}")
                     else:
-                         QMessageBox.warning(self, 
-                                             "Erreur d'exportation", 
-                                             f"La fusion a réussi mais l'exportation vers \n{export_filename}\na échoué.")
+                        QMessageBox.information(self, "Exportation Réussie",
+                                                f"{len(sharded.shards)} fichiers par département exportés vers :\n{shard_dir}")
+                elif export_data(processed_df, export_filename, format_type='csv'):
+                    QMessageBox.information(self, 
+                                            "Exportation Réussie", 
+                                            f"Les données fusionnées ont été exportées avec succès vers :\n{export_filename}")
+                    # Optionnel : Mettre à jour le statut label
+                    # self.status_label.setText(f"Données traitées et exportées vers {export_filename}")
                 else:
-                    QMessageBox.warning(self, "Traitement Échoué", "Le traitement des données avec l'annuaire a échoué.")
-                    self.status_label.setText("Échec du traitement des données.")
+                     QMessageBox.warning(self, 
+                                         "Erreur d'exportation", 
+                                         f"La fusion a réussi mais l'exportation vers \n{export_filename}\na échoué.")
+            else:
+                QMessageBox.warning(self, "Traitement Échoué", "Le traitement des données avec l'annuaire a échoué.")
+                self.status_label.setText("Échec du traitement des données.")
 
-            except Exception as e:
-                QMessageBox.critical(self, "Erreur Critique", f"Une erreur est survenue lors du traitement ou de l'exportation : {str(e)}")
-                self.status_label.setText("Erreur lors du traitement.") 
+        except Exception as e:
+            QMessageBox.critical(self, "Erreur Critique", f"Une erreur est survenue lors du traitement ou de l'exportation : {str(e)}")
+            self.status_label.setText("Erreur lors du traitement.") 
+
+    def _selected_columns_to_delete(self, directory_col, type_col):
+        """Retourne les colonnes cochées pour suppression (hors clé et type)."""
+        columns_to_delete = []
+        for i in range(self.columns_to_delete_list.count()):
+            item = self.columns_to_delete_list.item(i)
+            if item.checkState() == Qt.Checked and item.text() not in (directory_col, type_col):
+                columns_to_delete.append(item.text())
+        return columns_to_delete
+
+    def _dedup_columns(self):
+        """Colonnes du dédoublonnage : toutes les colonnes si la case est cochée, sinon aucun."""
+        return [] if self.dedup_checkbox.isChecked() else None
+
+    def _save_profile(self):
+        """Enregistre les options de traitement courantes dans un profil JSON."""
+        directory_col = self.directory_column.currentText()
+        type_col = self.type_column.currentText()
+        if not directory_col:
+            return
+        file_path, _ = QFileDialog.getSaveFileName(
+            self, "Enregistrer le profil de traitement", "profil_traitement.json",
+            "Profils de traitement (*.json)"
+        )
+        if not file_path:
+            return
+        if not file_path.lower().endswith('.json'):
+            file_path += '.json'
+        try:
+            profile = ProcessingProfile(directory_col, type_column=type_col or None,
+                                        columns_to_delete=self._selected_columns_to_delete(directory_col, type_col),
+                                        directory_date=self.directory_version_combo.currentData(),
+                                        dedup_columns=self._dedup_columns(),
+                                        export_by_department=self.shard_export_checkbox.isChecked())
+            profile.save(file_path)
+            self.status_label.setText(f"Profil de traitement enregistré dans {file_path}")
+        except Exception as e:
+            QMessageBox.critical(self, "Erreur", f"Impossible d'enregistrer le profil: {str(e)}")
 
     def _update_delete_list(self, data):
         """Remplit la liste des colonnes à supprimer."""
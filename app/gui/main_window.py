@@ -9,8 +9,14 @@ from gui.import_view import ImportView
 from gui.stats_view import StatsView
 from gui.directory_merge_view import DirectoryMergeView
 from core.data_processor import DataProcessor
+from core.stats_history import default_stats_history
+from core.deduplication import FingerprintStore
+from core.session_store import SessionStore
+from core.process_worker import ProcessWorker
+from utils.arrow_files import pa
 from utils.file_handlers import import_data
 from utils.directory_manager import DirectoryManager
+from utils.result_cache import ResultCache
 
 class MainWindow(QMainWindow):
     """Fenêtre principale de l'application."""
@@ -24,11 +30,33 @@ class MainWindow(QMainWindow):
         
         # Initialisation des composants principaux
         self.directory_manager = DirectoryManager()
-        self.data_processor = DataProcessor(self.directory_manager)
+        self.data_processor = DataProcessor(self.directory_manager, result_cache=ResultCache(),
+                                            stats_history=default_stats_history(),
+                                            fingerprint_store=FingerprintStore())
+        # Traitements hors processus (résultat transmis par fichier Arrow projeté en mémoire)
+        self.process_worker = ProcessWorker(self.directory_manager) if pa is not None else None
         
         # Configuration de l'interface
         self._setup_ui()
         self._setup_menu()
+
+        # Reprise de la session précédente (données, traitement et statistiques)
+        self.session_store = SessionStore()
+        if self.session_store.restore(self.data_processor):
+            self.import_view.update_view()
+            self.stats_view.update_view()
+            if self.data_processor.has_stats():
+                self.tabs.setCurrentWidget(self.stats_view)
+
+    def closeEvent(self, event):
+        """Enregistre la session de travail avant la fermeture."""
+        try:
+            self.session_store.save(self.data_processor)
+        except Exception as e:
+            print(f"Erreur lors de l'enregistrement de la session: {e}")
+        if self.process_worker is not None:
+            self.process_worker.shutdown()
+        super().closeEvent(event)
         
     def _setup_ui(self):
         """Configure les éléments d'interface principaux."""
@@ -37,7 +65,7 @@ class MainWindow(QMainWindow):
         
         # Création des vues
         self.stats_view = StatsView(self.data_processor)
-        self.import_view = ImportView(self.data_processor, self.stats_view)
+        self.import_view = ImportView(self.data_processor, self.stats_view, process_worker=self.process_worker)
         self.directory_merge_view = DirectoryMergeView(self.directory_manager)
         
         # Ajout des onglets avec icônes
@@ -96,7 +124,7 @@ class MainWindow(QMainWindow):
         if file_path:
             try:
                 data = import_data(file_path)
-                self.data_processor.set_data(data)
+                self.data_processor.set_data(data, source_path=file_path)
                 self.import_view.update_view()
                 self.stats_view.update_view()
                 self.tabs.setCurrentIndex(0)  # Affiche l'onglet d'import
@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+from PyQt5.QtCore import Qt, QAbstractItemModel, QModelIndex
+from PyQt5.QtWidgets import QStyledItemDelegate, QStyleOptionProgressBar, QApplication, QStyle
+import pandas as pd
+from core.stats_cube import COUNT_MEASURE, GASPARD_MEASURE, PERCENT_MEASURE
+from core.backends.base import DEPT_COLUMN, UNIT_COLUMN, MATERIAL_COLUMN, TERMINAL_COLUMN
+
+# Niveaux de l'arborescence des statistiques
+TREE_HIERARCHY = [DEPT_COLUMN, UNIT_COLUMN, MATERIAL_COLUMN, TERMINAL_COLUMN]
+# Colonnes affichées (libellé, mesure du cube ; None pour le libellé du nœud)
+TREE_COLUMNS = [
+    ("Département / Unité / Matériel / Terminal", None),
+    ("Nombre de signalisation", COUNT_MEASURE),
+    ("Nombre de signalisation GASPARD", GASPARD_MEASURE),
+    ("Pourcentage signalisation GASPARD", PERCENT_MEASURE),
+]
+PERCENT_COLUMN_INDEX = 3
+
+
+class _StatsNode:
+    """Nœud de l'arborescence : un membre d'un niveau de la hiérarchie et ses mesures."""
+
+    def __init__(self, parent, level, value=None, measures=None, position=0):
+        self.parent = parent
+        self.position = position # Rang parmi les enfants du parent
+        self.level = level # -1 pour la racine
+        self.value = value
+        self.measures = measures or {}
+        self.cube = None # Sous-cube du nœud, calculé au premier dépliage
+        self.children = None # None tant que les enfants ne sont pas chargés
+
+
+class StatsTreeModel(QAbstractItemModel):
+    """Modèle paresseux des statistiques (département → unité → matériel → terminal).
+
+    Seul le niveau département est calculé au chargement ; les enfants d'un nœud sont
+    agrégés depuis le cube de statistiques lorsque le nœud est déplié, à partir du
+    sous-cube de son parent.
+    """
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.root = _StatsNode(None, -1)
+        self.root.children = []
+
+    def set_cube(self, cube, filters=None):
+        """Recharge le niveau supérieur à partir d'un cube de statistiques.
+
+        Args:
+            cube (StatsCube): Cube des statistiques (None pour vider la vue)
+            filters (dict, optional): Filtres appliqués à tout l'arbre (ex: type 'SM')
+        """
+        self.beginResetModel()
+        self.root = _StatsNode(None, -1)
+        self.root.children = []
+        if cube is not None:
+            self.root.cube = cube.slice(filters) if filters else cube
+            self.root.children = self._load_children(self.root)
+        self.endResetModel()
+
+    def _load_children(self, node):
+        """Agrège les enfants d'un nœud à partir du sous-cube de son parent."""
+        if node.cube is None:
+            node.cube = node.parent.cube.slice({TREE_HIERARCHY[node.level]: node.value})
+        level = node.level + 1
+        dimension = TREE_HIERARCHY[level]
+        if dimension not in node.cube.dimensions:
+            return []
+        rolled = node.cube.roll_up([dimension])
+        measures = [measure for _, measure in TREE_COLUMNS if measure]
+        return [
+            _StatsNode(node, level, row[dimension], {m: row[m] for m in measures}, position)
+            for position, row in enumerate(rolled.to_dict('records'))
+        ]
+
+    # --- Chargement paresseux ---
+    def hasChildren(self, parent=QModelIndex()):
+        node = self._node(parent)
+        if node.children is not None:
+            return bool(node.children)
+        return node.level + 1 < len(TREE_HIERARCHY)
+
+    def canFetchMore(self, parent):
+        return self._node(parent).children is None
+
+    def fetchMore(self, parent):
+        node = self._node(parent)
+        if node.children is not None:
+            return
+        children = self._load_children(node)
+        if children:
+            self.beginInsertRows(parent, 0, len(children) - 1)
+            node.children = children
+            self.endInsertRows()
+        else:
+            node.children = []
+
+    # --- Structure ---
+    def _node(self, index):
+        return index.internalPointer() if index.isValid() else self.root
+
+    def index(self, row, column, parent=QModelIndex()):
+        node = self._node(parent)
+        if node.children is None or not (0 <= row < len(node.children)):
+            return QModelIndex()
+        return self.createIndex(row, column, node.children[row])
+
+    def parent(self, index):
+        if not index.isValid():
+            return QModelIndex()
+        parent = index.internalPointer().parent
+        if parent is None or parent is self.root:
+            return QModelIndex()
+        return self.createIndex(parent.position, 0, parent)
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.column() > 0:
+            return 0
+        children = self._node(parent).children
+        return len(children) if children is not None else 0
+
+    def columnCount(self, parent=QModelIndex()):
+        return len(TREE_COLUMNS)
+
+    # --- Données ---
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        node = index.internalPointer()
+        measure = TREE_COLUMNS[index.column()][1]
+        if role == Qt.DisplayRole:
+            if measure is None:
+                return str(node.value).zfill(2) if node.level == 0 else str(node.value)
+            value = node.measures.get(measure)
+            return f"{value:.2f} %" if measure == PERCENT_MEASURE else str(int(value))
+        if role == Qt.UserRole and measure is not None:
+            return float(node.measures.get(measure, 0))
+        if role == Qt.TextAlignmentRole and measure is not None:
+            return int(Qt.AlignRight | Qt.AlignVCenter)
+        return None
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if orientation == Qt.Horizontal and role == Qt.DisplayRole:
+            return TREE_COLUMNS[section][0]
+        return None
+
+
+class PercentBarDelegate(QStyledItemDelegate):
+    """Affiche le pourcentage GASPARD sous forme de barre de progression dans la cellule."""
+
+    def paint(self, painter, option, index):
+        value = index.data(Qt.UserRole)
+        if value is None or pd.isna(value):
+            super().paint(painter, option, index)
+            return
+        bar = QStyleOptionProgressBar()
+        bar.rect = option.rect.adjusted(2, 2, -2, -2)
+        bar.minimum = 0
+        bar.maximum = 100
+        bar.progress = int(round(value))
+        bar.text = index.data(Qt.DisplayRole)
+        bar.textVisible = True
+        QApplication.style().drawControl(QStyle.CE_ProgressBar, bar, painter)
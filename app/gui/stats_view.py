@@ -1,16 +1,40 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
-from PyQt5.QtWidgets import QWidget, QVBoxLayout, QHBoxLayout, QLabel, QPushButton, QTableWidget, QTableWidgetItem, QHeaderView, QFileDialog, QMessageBox
+from PyQt5.QtWidgets import QWidget, QVBoxLayout, QHBoxLayout, QLabel, QPushButton, QTableWidget, QTableWidgetItem, QHeaderView, QFileDialog, QMessageBox, QGroupBox, QComboBox, QTabWidget, QTreeView
 from PyQt5.QtCore import Qt
 from PyQt5.QtWidgets import QSizePolicy
 # import matplotlib.pyplot as plt # Plus nécessaire pour l'affichage principal
 # from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas # Plus nécessaire
 # from matplotlib.backends.backend_qt5agg import NavigationToolbar2QT as NavigationToolbar # Plus nécessaire
 import pandas as pd
+from core.data_processor import SUMMARY_COLUMN_LABELS
+from core.stats_cube import TYPE_DIMENSION, COUNT_MEASURE, GASPARD_MEASURE, PERCENT_MEASURE
+from core.join_diagnostics import JOIN_DIAGNOSTICS_KEY, format_diagnostics
+from core.backends.base import DEPT_COLUMN, UNIT_COLUMN, MATERIAL_COLUMN, TERMINAL_COLUMN
+from gui.stats_tree_model import StatsTreeModel, PercentBarDelegate, PERCENT_COLUMN_INDEX
+
+# Découpes proposées dans l'analyse croisée (libellé, dimensions)
+CUBE_PIVOTS = [
+    ("Département", [DEPT_COLUMN]),
+    ("Département / Unité", [DEPT_COLUMN, UNIT_COLUMN]),
+    ("Département / Unité / Matériel", [DEPT_COLUMN, UNIT_COLUMN, MATERIAL_COLUMN]),
+    ("Détail complet", [DEPT_COLUMN, UNIT_COLUMN, MATERIAL_COLUMN, TERMINAL_COLUMN]),
+    ("Matériel", [MATERIAL_COLUMN]),
+    ("Matériel / Terminal", [MATERIAL_COLUMN, TERMINAL_COLUMN]),
+    ("Type", [TYPE_DIMENSION]),
+    ("Département / Type", [DEPT_COLUMN, TYPE_DIMENSION]),
+]
+CUBE_COLUMN_LABELS = dict(SUMMARY_COLUMN_LABELS, **{TYPE_DIMENSION: 'Type'})
+ALL_TYPES_LABEL = "Tous les types"
+ALL_DEPTS_LABEL = "Tous les départements"
+# Niveaux et mesures proposés dans l'évolution mensuelle (libellé, colonne)
+TREND_LEVELS = [("Ensemble", None), ("Département", DEPT_COLUMN), ("Unité", UNIT_COLUMN), ("Matériel", MATERIAL_COLUMN)]
+TREND_MEASURES = [("% GASPARD", PERCENT_MEASURE), ("Nombre de signalisations", COUNT_MEASURE),
+                  ("Signalisations GASPARD", GASPARD_MEASURE)]
 
 class StatsView(QWidget):
-    """Vue d'affichage des statistiques combinées (globales et SM) sous forme de tableau."""
+    """Vue d'affichage des statistiques : arborescence paresseuse, tableau combiné et analyse croisée."""
 
     def __init__(self, data_processor):
         super().__init__()
@@ -39,17 +63,120 @@ class StatsView(QWidget):
 
         main_layout.addLayout(header_layout)
 
-        # Création du tableau
+        # Diagnostics de la correspondance avec l'annuaire (détail en info-bulle)
+        self.diagnostics_label = QLabel("")
+        self.diagnostics_label.setStyleSheet("color: grey;")
+        main_layout.addWidget(self.diagnostics_label)
+
+        self.stats_tabs = QTabWidget()
+
+        # --- Arborescence paresseuse (département → unité → matériel → terminal) ---
+        tree_tab = QWidget()
+        tree_layout = QVBoxLayout(tree_tab)
+        tree_controls = QHBoxLayout()
+        tree_controls.addWidget(QLabel("Type :"))
+        self.tree_type_filter = QComboBox()
+        self.tree_type_filter.currentIndexChanged.connect(self._update_tree)
+        tree_controls.addWidget(self.tree_type_filter)
+        tree_controls.addStretch()
+        tree_layout.addLayout(tree_controls)
+
+        self.stats_tree_model = StatsTreeModel(self)
+        self.stats_tree = QTreeView()
+        self.stats_tree.setModel(self.stats_tree_model)
+        self.stats_tree.setAlternatingRowColors(True)
+        self.stats_tree.setUniformRowHeights(True) # Défilement rapide sur de grands volumes
+        self.stats_tree.setItemDelegateForColumn(PERCENT_COLUMN_INDEX, PercentBarDelegate(self.stats_tree))
+        self.stats_tree.header().setSectionResizeMode(QHeaderView.ResizeToContents)
+        self.stats_tree.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Expanding)
+        tree_layout.addWidget(self.stats_tree)
+        self.stats_tabs.addTab(tree_tab, "Arborescence")
+
+        # Création du tableau (rempli uniquement à l'ouverture de son onglet)
         self.stats_table = QTableWidget()
         self.stats_table.setEditTriggers(QTableWidget.NoEditTriggers) # Lecture seule
         self.stats_table.setAlternatingRowColors(True)
         self.stats_table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch) # Étirer les colonnes
         self.stats_table.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Expanding)
-        
-        main_layout.addWidget(self.stats_table, 1)
+        self.stats_tabs.addTab(self.stats_table, "Tableau détaillé")
+
+        # --- Évolution mensuelle à partir de l'historique des statistiques ---
+        trend_tab = QWidget()
+        trend_layout = QVBoxLayout(trend_tab)
+        trend_controls = QHBoxLayout()
+        trend_controls.addWidget(QLabel("Niveau :"))
+        self.trend_level_combo = QComboBox()
+        self.trend_level_combo.addItems([label for label, _ in TREND_LEVELS])
+        self.trend_level_combo.currentIndexChanged.connect(self._update_trend_table)
+        trend_controls.addWidget(self.trend_level_combo)
+        trend_controls.addWidget(QLabel("Type :"))
+        self.trend_type_filter = QComboBox()
+        self.trend_type_filter.currentIndexChanged.connect(self._update_trend_table)
+        trend_controls.addWidget(self.trend_type_filter)
+        trend_controls.addWidget(QLabel("Mesure :"))
+        self.trend_measure_combo = QComboBox()
+        self.trend_measure_combo.addItems([label for label, _ in TREND_MEASURES])
+        self.trend_measure_combo.currentIndexChanged.connect(self._update_trend_table)
+        trend_controls.addWidget(self.trend_measure_combo)
+        self.trend_refresh_button = QPushButton("Actualiser")
+        self.trend_refresh_button.clicked.connect(self._update_trend_table)
+        trend_controls.addWidget(self.trend_refresh_button)
+        trend_controls.addStretch()
+        trend_layout.addLayout(trend_controls)
+        self.trend_status_label = QLabel("")
+        trend_layout.addWidget(self.trend_status_label)
+        self.trend_table = QTableWidget()
+        self.trend_table.setEditTriggers(QTableWidget.NoEditTriggers) # Lecture seule
+        self.trend_table.setAlternatingRowColors(True)
+        trend_layout.addWidget(self.trend_table)
+        self.stats_tabs.addTab(trend_tab, "Évolution mensuelle")
+        self.trend_tab = trend_tab
+
+        self.stats_tabs.currentChanged.connect(self._on_stats_tab_changed)
+        self.stats_table_stale = False
+        self.trend_stale = True
+
+        main_layout.addWidget(self.stats_tabs, 1)
+
+        # --- Analyse croisée à partir du cube pré-agrégé ---
+        cube_group = QGroupBox("Analyse croisée (double-clic sur une ligne pour détailler)")
+        cube_layout = QVBoxLayout(cube_group)
+        cube_controls = QHBoxLayout()
+        cube_controls.addWidget(QLabel("Découpe :"))
+        self.cube_pivot_combo = QComboBox()
+        self.cube_pivot_combo.addItems([label for label, _ in CUBE_PIVOTS])
+        self.cube_pivot_combo.currentIndexChanged.connect(self._on_cube_pivot_changed)
+        cube_controls.addWidget(self.cube_pivot_combo)
+        cube_controls.addWidget(QLabel("Type :"))
+        self.cube_type_filter = QComboBox()
+        self.cube_type_filter.currentIndexChanged.connect(self._update_cube_table)
+        cube_controls.addWidget(self.cube_type_filter)
+        cube_controls.addWidget(QLabel("Département :"))
+        self.cube_dept_filter = QComboBox()
+        self.cube_dept_filter.currentIndexChanged.connect(self._update_cube_table)
+        cube_controls.addWidget(self.cube_dept_filter)
+        self.cube_reset_button = QPushButton("Réinitialiser")
+        self.cube_reset_button.clicked.connect(self._reset_cube)
+        cube_controls.addWidget(self.cube_reset_button)
+        cube_controls.addStretch()
+        cube_layout.addLayout(cube_controls)
+
+        self.cube_table = QTableWidget()
+        self.cube_table.setEditTriggers(QTableWidget.NoEditTriggers) # Lecture seule
+        self.cube_table.setAlternatingRowColors(True)
+        self.cube_table.cellDoubleClicked.connect(self._drill_down_cube)
+        cube_layout.addWidget(self.cube_table)
+        main_layout.addWidget(cube_group, 1)
+
+        # État de l'exploration du cube
+        self.cube = None
+        self.cube_dimensions = list(CUBE_PIVOTS[0][1])
+        self.cube_filters = {}
+        self.cube_result = pd.DataFrame()
 
     def update_view(self):
         """Met à jour la vue avec les données actuelles."""
+        self.stats_table_stale = False
         self.stats_table.setRowCount(0) # Vider le tableau
         self.stats_table.setColumnCount(0)
         
@@ -58,56 +185,25 @@ class StatsView(QWidget):
 
         # Vérifier si des données statistiques existent
         if stats_data:
-            global_df = stats_data.get('global_summary_table')
-            sm_df = stats_data.get('sm_summary_table')
-            global_error = stats_data.get('global_error')
-            sm_error = stats_data.get('sm_error')
-            
-            error_messages = []
-            if global_error: error_messages.append(f"Erreur Globale: {global_error}")
-            if sm_error: error_messages.append(f"Erreur SM: {sm_error}")
-
-            valid_dfs = []
-            if isinstance(global_df, pd.DataFrame) and not global_df.empty:
-                global_df_copy = global_df.copy()
-                global_df_copy['Type Statistique'] = 'Globale'
-                valid_dfs.append(global_df_copy)
-            
-            if isinstance(sm_df, pd.DataFrame) and not sm_df.empty:
-                sm_df_copy = sm_df.copy()
-                sm_df_copy['Type Statistique'] = 'SM'
-                valid_dfs.append(sm_df_copy)
-
-            if valid_dfs:
-                # Concaténer les dataframes valides
-                self.combined_df = pd.concat(valid_dfs, ignore_index=True)
-                
-                # S'assurer que la colonne 'Type Statistique' est la première
-                cols = ['Type Statistique'] + [col for col in self.combined_df.columns if col != 'Type Statistique']
-                self.combined_df = self.combined_df[cols]
-
-                self.status_label.setText(f"Statistiques agrégées ({len(self.combined_df)} lignes). " + " ".join(error_messages))
-                self.export_button.setEnabled(True)
-                
-                # Configurer le tableau
-                self.stats_table.setRowCount(len(self.combined_df))
-                self.stats_table.setColumnCount(len(self.combined_df.columns))
-                self.stats_table.setHorizontalHeaderLabels(self.combined_df.columns)
-                
-                # Remplir le tableau
-                for i, row in self.combined_df.iterrows():
-                    for j, value in enumerate(row):
-                        item_value = str(value) if not pd.isna(value) else ""
-                        item = QTableWidgetItem(item_value)
-                        self.stats_table.setItem(i, j, item)
-                
-                self.stats_table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeToContents)
-                # Redimensionner la colonne 'Type Statistique' en dernier si besoin
-                try:
-                    type_col_index = self.combined_df.columns.get_loc('Type Statistique')
-                    self.stats_table.horizontalHeader().setSectionResizeMode(type_col_index, QHeaderView.ResizeToContents)
-                except KeyError:
-                    pass # Au cas où la colonne ne serait pas là
+            self.combined_df, error_messages = self.data_processor.get_combined_stats()
+
+            if not self.combined_df.empty:
+                preview = stats_data.get('preview')
+                if preview:
+                    # Aperçu sur échantillon : estimations provisoires, non exportables
+                    self.status_label.setText(
+                        f"Aperçu provisoire estimé sur {preview['sample_rows']} lignes sur {preview['total_rows']} "
+                        f"(intervalles de confiance à 95 %). Lancer le traitement complet pour les valeurs définitives. "
+                        + " ".join(error_messages))
+                    self.export_button.setEnabled(False)
+                else:
+                    self.status_label.setText(f"Statistiques agrégées ({len(self.combined_df)} lignes). " + " ".join(error_messages))
+                    self.export_button.setEnabled(True)
+
+                # Le tableau détaillé n'est rempli qu'à l'ouverture de son onglet
+                self.stats_table_stale = True
+                if self.stats_tabs.currentWidget() is self.stats_table:
+                    self._fill_stats_table()
             
             elif error_messages: # S'il n'y a que des erreurs
                  self.status_label.setText(" ".join(error_messages))
@@ -124,6 +220,178 @@ class StatsView(QWidget):
         else:
             self.status_label.setText("Aucune statistique disponible")
             self.export_button.setEnabled(False)
+
+        self._update_diagnostics(stats_data.get(JOIN_DIAGNOSTICS_KEY) if stats_data else None)
+
+        # Mise à jour de l'analyse croisée
+        self.cube = stats_data.get('cube') if stats_data else None
+        self._populate_cube_filters()
+        self._reset_cube()
+        self._update_tree()
+
+        # L'évolution mensuelle n'est relue qu'à l'ouverture de son onglet
+        self.trend_stale = True
+        if self.stats_tabs.currentWidget() is self.trend_tab:
+            self._update_trend_table()
+
+    def _update_diagnostics(self, diagnostics):
+        """Affiche le résumé des diagnostics de jointure du dernier traitement."""
+        if not diagnostics:
+            self.diagnostics_label.setText("")
+            self.diagnostics_label.setToolTip("")
+            return
+        lines = format_diagnostics(diagnostics, self.data_processor.stats_planner.spec)
+        self.diagnostics_label.setText(lines[0].strip())
+        self.diagnostics_label.setToolTip("\n".join(line.strip() for line in lines))
+
+    def _fill_stats_table(self):
+        """Remplit le tableau détaillé à partir du tableau combiné."""
+        self.stats_table_stale = False
+        self.stats_table.setRowCount(len(self.combined_df))
+        self.stats_table.setColumnCount(len(self.combined_df.columns))
+        self.stats_table.setHorizontalHeaderLabels(self.combined_df.columns)
+
+        # Remplir le tableau
+        for i, row in enumerate(self.combined_df.itertuples(index=False)):
+            for j, value in enumerate(row):
+                item_value = str(value) if not pd.isna(value) else ""
+                self.stats_table.setItem(i, j, QTableWidgetItem(item_value))
+
+        self.stats_table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeToContents)
+
+    def _on_stats_tab_changed(self, index):
+        """Remplit le tableau détaillé lors de sa première ouverture."""
+        if self.stats_tabs.widget(index) is self.stats_table and self.stats_table_stale:
+            self._fill_stats_table()
+        elif self.stats_tabs.widget(index) is self.trend_tab and self.trend_stale:
+            self._update_trend_table()
+
+    def _update_trend_table(self):
+        """Affiche l'évolution mensuelle de la mesure choisie (une colonne par mois)."""
+        self.trend_stale = False
+        self.trend_table.setRowCount(0)
+        self.trend_table.setColumnCount(0)
+        history = self.data_processor.stats_history
+        if history is None:
+            self.trend_status_label.setText("Historique des statistiques indisponible (pyarrow requis).")
+            return
+        months = history.months()
+        if not months:
+            self.trend_status_label.setText("Aucun mois enregistré dans l'historique.")
+            return
+
+        level = TREND_LEVELS[self.trend_level_combo.currentIndex()][1]
+        measure = TREND_MEASURES[self.trend_measure_combo.currentIndex()][1]
+        filters = {}
+        if self.trend_type_filter.currentIndex() > 0:
+            filters[TYPE_DIMENSION] = self.trend_type_filter.currentText()
+        try:
+            if level is None:
+                trend = history.trend(filters=filters)
+                table = trend.set_index('mois')[[measure]].T.reset_index(drop=True).rename_axis(columns=None)
+                table.insert(0, 'Ensemble', CUBE_COLUMN_LABELS.get(measure, measure))
+            else:
+                table = history.trend_table(level, measure, filters=filters)
+        except (ValueError, OSError) as e:
+            self.trend_status_label.setText(f"Erreur de lecture de l'historique: {e}")
+            return
+
+        self.trend_status_label.setText(f"{len(months)} mois dans l'historique ({months[0]} à {months[-1]}).")
+        display_df = table.rename(columns=CUBE_COLUMN_LABELS)
+        self.trend_table.setRowCount(len(display_df))
+        self.trend_table.setColumnCount(len(display_df.columns))
+        self.trend_table.setHorizontalHeaderLabels([str(col) for col in display_df.columns])
+        for i, row in enumerate(display_df.itertuples(index=False)):
+            for j, value in enumerate(row):
+                self.trend_table.setItem(i, j, QTableWidgetItem(str(value) if not pd.isna(value) else ""))
+        self.trend_table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeToContents)
+
+    def _update_tree(self):
+        """Recharge le niveau département de l'arborescence (filtré par type)."""
+        filters = None
+        if self.cube is not None and self.tree_type_filter.currentIndex() > 0:
+            filters = {TYPE_DIMENSION: self.tree_type_filter.currentText()}
+        self.stats_tree_model.set_cube(self.cube, filters)
+
+    def _populate_cube_filters(self):
+        """Remplit les filtres de type et de département à partir du cube."""
+        for combo, all_label, dimension in ((self.tree_type_filter, ALL_TYPES_LABEL, TYPE_DIMENSION),
+                                            (self.trend_type_filter, ALL_TYPES_LABEL, TYPE_DIMENSION),
+                                            (self.cube_type_filter, ALL_TYPES_LABEL, TYPE_DIMENSION),
+                                            (self.cube_dept_filter, ALL_DEPTS_LABEL, DEPT_COLUMN)):
+            combo.blockSignals(True)
+            combo.clear()
+            combo.addItem(all_label)
+            if self.cube is not None:
+                combo.addItems([str(value) for value in self.cube.values(dimension)])
+            combo.setEnabled(self.cube is not None and combo.count() > 1)
+            combo.blockSignals(False)
+
+    def _reset_cube(self):
+        """Revient à la découpe sélectionnée, sans exploration ni filtre de détail."""
+        self.cube_filters = {}
+        self.cube_dimensions = list(CUBE_PIVOTS[self.cube_pivot_combo.currentIndex()][1])
+        self._update_cube_table()
+
+    def _on_cube_pivot_changed(self, index):
+        """Change la découpe de l'analyse croisée."""
+        self._reset_cube()
+
+    def _current_cube_filters(self):
+        """Combine les filtres sélectionnés et ceux issus de l'exploration."""
+        filters = dict(self.cube_filters)
+        if self.cube_type_filter.currentIndex() > 0:
+            filters[TYPE_DIMENSION] = self.cube_type_filter.currentText()
+        if self.cube_dept_filter.currentIndex() > 0:
+            selected = self.cube_dept_filter.currentText()
+            # Retrouver la valeur d'origine (le département peut être numérique)
+            filters[DEPT_COLUMN] = [value for value in self.cube.values(DEPT_COLUMN) if str(value) == selected]
+        return filters
+
+    def _update_cube_table(self):
+        """Calcule et affiche le tableau croisé courant à partir du cube."""
+        self.cube_table.setRowCount(0)
+        self.cube_table.setColumnCount(0)
+        self.cube_result = pd.DataFrame()
+        if self.cube is None:
+            return
+        dimensions = [dim for dim in self.cube_dimensions if dim in self.cube.dimensions]
+        try:
+            result = self.cube.query(dimensions, self._current_cube_filters())
+        except ValueError as e:
+            self.status_label.setText(str(e))
+            return
+        self._show_cube_result(result)
+
+    def _show_cube_result(self, result):
+        """Affiche un tableau croisé calculé à partir du cube."""
+        self.cube_result = result
+        display_df = self.cube_result.rename(columns=CUBE_COLUMN_LABELS)
+        self.cube_table.setRowCount(len(display_df))
+        self.cube_table.setColumnCount(len(display_df.columns))
+        self.cube_table.setHorizontalHeaderLabels(list(display_df.columns))
+        for i, row in enumerate(display_df.itertuples(index=False)):
+            for j, value in enumerate(row):
+                self.cube_table.setItem(i, j, QTableWidgetItem(str(value) if not pd.isna(value) else ""))
+        self.cube_table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeToContents)
+
+    def _drill_down_cube(self, row, column):
+        """Détaille la ligne double-cliquée au niveau suivant de la hiérarchie."""
+        if self.cube is None or self.cube_result.empty or row >= len(self.cube_result):
+            return
+        dimensions = [dim for dim in self.cube_dimensions if dim in self.cube.dimensions]
+        member = {dim: self.cube_result.iloc[row][dim] for dim in dimensions if dim in self.cube_result.columns}
+        try:
+            # Filtres sélectionnés conservés, restreints au membre double-cliqué
+            next_dimensions, detail = self.cube.drill_down(dimensions, {**self._current_cube_filters(), **member})
+        except ValueError as e:
+            self.status_label.setText(str(e))
+            return
+        if next_dimensions == dimensions:
+            return # Niveau le plus fin déjà atteint
+        self.cube_filters.update(member)
+        self.cube_dimensions = next_dimensions
+        self._show_cube_result(detail)
     
     # Suppression de _update_chart car les graphiques ne sont plus l'affichage principal
     # def _update_chart(self):
@@ -3,11 +3,116 @@
 
 import sys
 import os
-from PyQt5.QtWidgets import QApplication
-from gui.main_window import MainWindow
+import argparse
+
+def parse_arguments(argv=None):
+    """Analyse les options de la ligne de commande.
+
+    Sans option, l'interface graphique est lancée.
+    """
+    parser = argparse.ArgumentParser(description="Traitement des extractions ANFSI et statistiques GASPARD.")
+    parser.add_argument('--watch', metavar='DOSSIER',
+                        help="Mode sans interface : traite automatiquement chaque extraction déposée dans ce dossier")
+    parser.add_argument('--process', metavar='FICHIER',
+                        help="Mode sans interface : traite une extraction, l'exporte et affiche le rapport d'exécution")
+    parser.add_argument('--profile', metavar='FICHIER',
+                        help="Profil de traitement JSON (colonne clé, colonne type, colonnes à supprimer)")
+    parser.add_argument('--output', metavar='DOSSIER', default='exports',
+                        help="Dossier des exports des modes sans interface (défaut: exports)")
+    parser.add_argument('--poll-interval', type=float, default=2.0,
+                        help="Intervalle de scrutation en secondes sans notifications du système (défaut: 2)")
+    parser.add_argument('--memory-budget', metavar='TAILLE',
+                        help="Budget mémoire d'un traitement des modes sans interface, ex: 4GB ou 512MB "
+                             "(défaut: 70 %% de la mémoire disponible)")
+    parser.add_argument('--serve', nargs='?', type=int, const=8765, metavar='PORT',
+                        help="Mode service : serveur HTTP local de traitement (port par défaut: 8765)")
+    parser.add_argument('--host', default='127.0.0.1',
+                        help="Adresse d'écoute du service (défaut: 127.0.0.1)")
+    parser.add_argument('--socket', metavar='CHEMIN',
+                        help="Mode service sur un socket Unix plutôt qu'un port TCP")
+    parser.add_argument('--workers', type=int, default=4,
+                        help="Nombre de traitements simultanés du service (défaut: 4)")
+    # Les options inconnues sont laissées à Qt (ex: -style)
+    args, _ = parser.parse_known_args(argv)
+    if args.watch and not args.profile:
+        parser.error("--watch nécessite --profile")
+    if args.process and not args.profile:
+        parser.error("--process nécessite --profile")
+    return args
+
+def run_watch_folder(args):
+    """Lance le démon de surveillance du dossier de dépôt (sans interface graphique)."""
+    from core.processing_profile import ProcessingProfile
+    from core.watch_folder import WatchFolderDaemon
+    from core.execution_planner import ExecutionPlanner
+
+    if not os.path.isdir(args.watch):
+        print(f"Erreur: le dossier surveillé {args.watch} n'existe pas.", file=sys.stderr)
+        return 1
+    profile = ProcessingProfile.load(args.profile)
+    daemon = WatchFolderDaemon(args.watch, args.output, profile, poll_interval=args.poll_interval,
+                               planner=ExecutionPlanner(memory_budget=args.memory_budget))
+    daemon.run()
+    return 0
+
+def run_process(args):
+    """Traite une extraction et affiche son rapport d'exécution (sans interface graphique)."""
+    from core.processing_profile import ProcessingProfile
+    from core.data_processor import DataProcessor
+    from core.run_report import process_extract
+    from core.stats_history import default_stats_history
+    from core.deduplication import FingerprintStore
+    from core.backends import get_backend
+    from core.execution_planner import ExecutionPlanner
+    from utils.directory_manager import DirectoryManager
+    from utils.result_cache import ResultCache
+
+    if not os.path.isfile(args.process):
+        print(f"Erreur: le fichier {args.process} n'existe pas.", file=sys.stderr)
+        return 1
+    profile = ProcessingProfile.load(args.profile)
+    backend = get_backend(profile.backend) if profile.backend else None
+    data_processor = DataProcessor(DirectoryManager(), result_cache=ResultCache(), backend=backend,
+                                   stats_history=default_stats_history(), fingerprint_store=FingerprintStore())
+    try:
+        report = process_extract(data_processor, profile, args.process, args.output,
+                                 planner=ExecutionPlanner(memory_budget=args.memory_budget))
+    except Exception as e:
+        print(f"Erreur lors du traitement de {args.process}: {e}", file=sys.stderr)
+        return 1
+    print(report.format_text())
+    return 0
+
+def run_service(args):
+    """Lance le service local de traitement (sans interface graphique)."""
+    from core.processing_service import ProcessingService, create_server
+
+    service = ProcessingService(workers=args.workers)
+    server = create_server(service, host=args.host, port=args.serve or 8765, socket_path=args.socket)
+    where = args.socket or f"http://{args.host}:{server.server_port}"
+    print(f"Service de traitement à l'écoute sur {where} ({args.workers} traitements simultanés).")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("Arrêt du service demandé.")
+    finally:
+        server.server_close()
+        service.shutdown()
+    return 0
 
 def main():
     """Point d'entrée principal de l'application."""
+    args = parse_arguments()
+    if args.watch:
+        sys.exit(run_watch_folder(args))
+    if args.process:
+        sys.exit(run_process(args))
+    if args.serve is not None or args.socket:
+        sys.exit(run_service(args))
+
+    from PyQt5.QtWidgets import QApplication
+    from gui.main_window import MainWindow
+
     app = QApplication(sys.argv)
     app.setDesktopFileName('csf_gaspard.desktop')
     # Charger la feuille de style
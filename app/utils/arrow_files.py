@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import pandas as pd
+
+try:
+    import pyarrow as pa
+except ImportError:  # Dépendance optionnelle (fichiers Arrow IPC)
+    pa = None
+
+ARROW_FILE_EXTENSION = '.arrow'
+
+
+def require_pyarrow():
+    """Vérifie que pyarrow est installé."""
+    if pa is None:
+        raise ImportError("Les fichiers Arrow nécessitent pyarrow (pip install pyarrow).")
+
+
+def _stringify_mixed_columns(df: pd.DataFrame) -> pd.DataFrame:
+    """Convertit en texte les colonnes object de types mélangés (ex: département 75 et '2A').
+
+    Les valeurs manquantes sont conservées ; les autres colonnes ne sont pas copiées.
+    """
+    mixed = [col for col in df.columns if df[col].dtype == object
+             and pd.api.types.infer_dtype(df[col], skipna=True) in ('mixed', 'mixed-integer')]
+    if not mixed:
+        return df
+    df = df.copy(deep=False)
+    for col in mixed:
+        df[col] = df[col].astype(str).where(df[col].notna(), None)
+    return df
+
+
+def write_frame(df: pd.DataFrame, path: str):
+    """Écrit un DataFrame dans un fichier Arrow IPC (non compressé, projetable en mémoire).
+
+    Les colonnes texte mixtes, qu'Arrow ne sait pas typer, sont écrites en texte
+    (comme `processing_service.table_to_arrow`).
+
+    Args:
+        df (pandas.DataFrame): Données à écrire
+        path (str): Chemin du fichier
+    """
+    require_pyarrow()
+    try:
+        table = pa.Table.from_pandas(df)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        table = pa.Table.from_pandas(_stringify_mixed_columns(df))
+    with pa.OSFile(path, 'wb') as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+
+
+def read_frame(path: str) -> pd.DataFrame:
+    """Relit un fichier Arrow IPC par projection en mémoire (mmap, lecture seule).
+
+    Les colonnes numériques sans valeur manquante et les colonnes texte restent
+    adossées aux pages du fichier : aucune copie n'est faite à la lecture.
+
+    Args:
+        path (str): Chemin du fichier
+
+    Returns:
+        pandas.DataFrame: Les données
+    """
+    require_pyarrow()
+    table = pa.ipc.open_file(pa.memory_map(path, 'r')).read_all()
+    df = table.to_pandas(integer_object_nulls=True, split_blocks=True)
+    # Les colonnes object sans valeur (type Arrow null) reviennent en float : rétablir leur type
+    for column in (table.schema.pandas_metadata or {}).get('columns', []):
+        name = column.get('field_name')
+        if column.get('numpy_type') == 'object' and name in df.columns and df[name].dtype != object:
+            df[name] = df[name].astype(object)
+    return df
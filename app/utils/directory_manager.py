@@ -5,10 +5,121 @@ import os
 import pandas as pd
 import json
 import re
+import hashlib
+import threading
+from collections import OrderedDict
 from utils.file_handlers import import_csv
+from utils.directory_versions import DirectoryVersionStore, VERSIONS_DIR_NAME
+from utils.shared_directory import SharedDirectory, export_shared_directory, SHARED_DIR_NAME
 # from core.data_model import DirectoryEntry # Suppression de l'import
 from typing import Optional, List
 
+# Nombre de versions passées de l'annuaire gardées en mémoire (instantanés datés)
+MAX_CACHED_SNAPSHOTS = 4
+
+def format_gn_value(value):
+    """Formate une valeur au format GN + 8 chiffres.
+    
+    Args:
+        value: La valeur à formater
+        
+    Returns:
+        str: La valeur formatée (GN + 8 chiffres)
+    """
+    # Gérer les None ou valeurs vides
+    if value is None or str(value).strip() == "":
+        return "GN00000000" # Retourner une valeur par défaut ou selon besoin
+        
+    str_value = str(value)
+    
+    # Si déjà au bon format, retourner directement
+    if re.match(r'^GN\d{8}$', str_value):
+        return str_value
+
+    # Tentative de nettoyage pour les cas comme "123.0"
+    cleaned_value = str_value
+    try:
+        # Si c'est un nombre avec potentiellement .0
+        if '.' in cleaned_value:
+            num_float = float(cleaned_value)
+            # Si c'est effectivement un entier (ex: 123.0)
+            if num_float == int(num_float):
+                cleaned_value = str(int(num_float))
+    except (ValueError, TypeError):
+        # Ignorer les erreurs de conversion, on utilisera re.sub sur la valeur originale
+        pass 
+        
+    # Extraire uniquement les chiffres de la valeur (potentiellement nettoyée)
+    digits = re.sub(r'\D', '', cleaned_value) # Utiliser cleaned_value
+    
+    # Si aucun chiffre n'est trouvé après nettoyage
+    if not digits:
+        return "GN00000000"
+        
+    # Si la valeur commence par "GN", s'assurer qu'on a les chiffres
+    # (Redondant avec le re.sub mais ne coûte rien)
+    # if str_value.startswith('GN'):
+    #     digits = re.sub(r'\D', '', str_value)
+    
+    # Limiter aux 8 derniers chiffres si plus long
+    if len(digits) > 8:
+        digits = digits[-8:]
+        
+    # Compléter avec des zéros devant pour faire 8 chiffres
+    digits = digits.zfill(8)
+        
+    # Retourner la valeur formatée
+    return f"GN{digits}"
+
+def _build_key_index(data):
+    """Construit l'index des clés d'un annuaire (None si des clés sont en double)."""
+    key_index = pd.Index(data['key'] if 'key' in data.columns else [])
+    # Construction anticipée de la table de hachage
+    return key_index if key_index.is_unique else None
+
+class DirectorySnapshot:
+    """Vue en lecture seule de l'annuaire à un instant donné.
+
+    L'instantané fige les données, la version et l'index des clés de l'annuaire :
+    un traitement en cours n'est pas affecté par un rechargement ou une fusion
+    ultérieure. Il expose les mêmes méthodes de lecture que `DirectoryManager` et
+    peut être transmis à un autre processus (sérialisable).
+    """
+
+    def __init__(self, directory_path, data, version, key_index):
+        """Initialise l'instantané (voir `DirectoryManager.snapshot`).
+
+        Args:
+            directory_path (str): Chemin du fichier annuaire
+            data (pandas.DataFrame): Données de l'annuaire
+            version (str): Version de l'annuaire
+            key_index (pandas.Index): Index des clés, ou None si des clés sont en double
+        """
+        self.directory_path = directory_path
+        # Copie superficielle : les colonnes ne sont pas dupliquées, mais une
+        # modification de l'instantané ne peut pas atteindre l'annuaire partagé
+        self._data = data.copy(deep=False)
+        self._version = version
+        self._key_index = key_index
+
+    def get_directory(self):
+        """Retourne les données de l'annuaire (à ne pas modifier)."""
+        return self._data
+
+    def get_version(self):
+        """Retourne la version de l'annuaire figée dans l'instantané."""
+        return self._version
+
+    def get_key_index(self):
+        """Retourne l'index des clés de l'annuaire, ou None si des clés sont en double."""
+        return self._key_index
+
+    def snapshot(self, as_of=None):
+        """Retourne l'instantané lui-même (il est déjà en lecture seule)."""
+        if as_of is not None:
+            raise ValueError("Un instantané de l'annuaire ne peut pas être consulté à une autre date.")
+        return self
+
 class DirectoryManager:
     """Gestionnaire de l'annuaire de l'application."""
     
@@ -20,18 +131,36 @@ class DirectoryManager:
         """
         self.directory_path = directory_path or os.path.join('app', 'resources', 'directory', 'directory.csv')
         self.directory_data = None
+        self._version = None
+        self._key_index = None
+        self._search_index = None # (version, DirectorySearchIndex)
+        self.last_merge_cardinality = None
+        self._lock = threading.RLock()
+        self._dated_snapshots = OrderedDict() # version -> DirectorySnapshot
         self._load_directory()
     
     def _load_directory(self):
-        """Charge l'annuaire depuis le fichier."""
-        # Vider les données existantes au début
-        self.directory_data = None 
+        """Charge l'annuaire depuis le fichier.
         
+        Les données, la version et l'index des clés sont remplacés ensemble à la fin du
+        chargement : un traitement concurrent ne voit jamais un annuaire partiel.
+        """
+        data = self._read_directory_file()
+        with self._lock:
+            self.directory_data = data
+            self._version = None
+            self._key_index = None
+    
+    def _read_directory_file(self):
+        """Lit le fichier annuaire.
+        
+        Returns:
+            pandas.DataFrame: Données de l'annuaire (structure minimale si illisible)
+        """
         if not os.path.exists(self.directory_path):
             print(f"Fichier annuaire non trouvé: {self.directory_path}. L'annuaire sera vide jusqu'à la fusion.")
             # Initialiser avec une structure minimale (juste la clé)
-            self.directory_data = pd.DataFrame(columns=['key'])
-            return # Pas besoin d'essayer de lire ou créer un fichier défaut ici
+            return pd.DataFrame(columns=['key'])
         
         try:
             # Déterminer le format du fichier
@@ -39,21 +168,22 @@ class DirectoryManager:
             ext = ext.lower()
             
             if ext == '.csv':
-                self.directory_data = pd.read_csv(self.directory_path)
+                return pd.read_csv(self.directory_path)
             elif ext == '.json':
                 with open(self.directory_path, 'r', encoding='utf-8') as f:
                     data = json.load(f)
                     # Conversion en DataFrame
                     if isinstance(data, list):
-                        self.directory_data = pd.DataFrame(data)
+                        return pd.DataFrame(data)
+                return None
             else:
                 print(f"Format d'annuaire non supporté: {ext}. L'annuaire sera considéré comme vide.")
-                self.directory_data = pd.DataFrame(columns=['key']) # Structure minimale
+                return pd.DataFrame(columns=['key']) # Structure minimale
                 
         except Exception as e:
             print(f"Erreur lors du chargement de l'annuaire: {str(e)}. L'annuaire sera considéré comme vide.")
             # En cas d'erreur, initialiser avec une structure minimale
-            self.directory_data = pd.DataFrame(columns=['key'])
+            return pd.DataFrame(columns=['key'])
     
     def _create_default_directory(self):
         """Crée un annuaire par défaut."""
@@ -63,12 +193,19 @@ class DirectoryManager:
             'value': [],
             'category': []
         })
+        self._version = None
+        self._key_index = None
         
         # Sauvegarder l'annuaire par défaut
         self._save_directory()
     
-    def _save_directory(self):
-        """Sauvegarde l'annuaire dans le fichier."""
+    def _save_directory(self, effective_date=None):
+        """Sauvegarde l'annuaire dans le fichier et publie sa version.
+        
+        Args:
+            effective_date (str | datetime.date, optional): Date d'entrée en vigueur de
+                la version (par défaut, aujourd'hui)
+        """
         try:
             # Créer le répertoire parent si nécessaire
             os.makedirs(os.path.dirname(self.directory_path), exist_ok=True)
@@ -77,16 +214,23 @@ class DirectoryManager:
             _, ext = os.path.splitext(self.directory_path)
             ext = ext.lower()
             
+            if ext not in ('.csv', '.json'):
+                # Par défaut, sauvegarder en CSV
+                self.directory_path = os.path.splitext(self.directory_path)[0] + '.csv'
+                ext = '.csv'
+            # Écriture dans un fichier temporaire puis renommage : un lecteur ne voit
+            # jamais un annuaire à moitié écrit
+            directory, name = os.path.split(self.directory_path)
+            tmp_path = os.path.join(directory, f".{name}.{os.getpid()}.tmp")
             if ext == '.csv':
-                self.directory_data.to_csv(self.directory_path, index=False)
-            elif ext == '.json':
-                with open(self.directory_path, 'w', encoding='utf-8') as f:
-                    json.dump(self.directory_data.to_dict(orient='records'), f, indent=4)
+                self.directory_data.to_csv(tmp_path, index=False)
             else:
-                # Par défaut, sauvegarder en CSV
-                csv_path = os.path.splitext(self.directory_path)[0] + '.csv'
-                self.directory_data.to_csv(csv_path, index=False)
-                self.directory_path = csv_path
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    json.dump(self.directory_data.to_dict(orient='records'), f, indent=4)
+            os.replace(tmp_path, self.directory_path)
+            
+            # Historique des versions (consultation par date)
+            self.version_store.publish(self.directory_data, self.get_version(), effective_date=effective_date)
                 
         except Exception as e:
             print(f"Erreur lors de la sauvegarde de l'annuaire: {str(e)}")
@@ -99,63 +243,156 @@ class DirectoryManager:
         """
         return self.directory_data
     
-    def _format_gn_value(self, value):
-        """Formate une valeur au format GN + 8 chiffres.
+    def get_version(self):
+        """Retourne la version de l'annuaire courant (empreinte de son contenu).
+        
+        La version est calculée une seule fois puis conservée jusqu'au prochain
+        chargement ou à la prochaine fusion de l'annuaire.
         
-        Args:
-            value: La valeur à formater
-            
         Returns:
-            str: La valeur formatée (GN + 8 chiffres)
+            str: Empreinte hexadécimale du contenu de l'annuaire
         """
-        # Gérer les None ou valeurs vides
-        if value is None or str(value).strip() == "":
-            return "GN00000000" # Retourner une valeur par défaut ou selon besoin
-            
-        str_value = str(value)
-        
-        # Si déjà au bon format, retourner directement
-        if re.match(r'^GN\d{8}$', str_value):
-            return str_value
-
-        # Tentative de nettoyage pour les cas comme "123.0"
-        cleaned_value = str_value
-        try:
-            # Si c'est un nombre avec potentiellement .0
-            if '.' in cleaned_value:
-                num_float = float(cleaned_value)
-                # Si c'est effectivement un entier (ex: 123.0)
-                if num_float == int(num_float):
-                    cleaned_value = str(int(num_float))
-        except (ValueError, TypeError):
-            # Ignorer les erreurs de conversion, on utilisera re.sub sur la valeur originale
-            pass 
-            
-        # Extraire uniquement les chiffres de la valeur (potentiellement nettoyée)
-        digits = re.sub(r'\D', '', cleaned_value) # Utiliser cleaned_value
+        with self._lock:
+            if self._version is None:
+                digest = hashlib.sha256()
+                data = self.directory_data if self.directory_data is not None else pd.DataFrame()
+                digest.update(json.dumps([str(col) for col in data.columns]).encode('utf-8'))
+                if not data.empty:
+                    digest.update(pd.util.hash_pandas_object(data, index=False).values.tobytes())
+                self._version = digest.hexdigest()
+            return self._version
+    
+    def get_key_index(self):
+        """Retourne l'index des clés de l'annuaire (position de chaque clé).
         
-        # Si aucun chiffre n'est trouvé après nettoyage
-        if not digits:
-            return "GN00000000"
-            
-        # Si la valeur commence par "GN", s'assurer qu'on a les chiffres
-        # (Redondant avec le re.sub mais ne coûte rien)
-        # if str_value.startswith('GN'):
-        #     digits = re.sub(r'\D', '', str_value)
+        L'index (et sa table de hachage) est construit une seule fois par version de
+        l'annuaire, puis réutilisé par chaque traitement.
         
-        # Limiter aux 8 derniers chiffres si plus long
-        if len(digits) > 8:
-            digits = digits[-8:]
-            
-        # Compléter avec des zéros devant pour faire 8 chiffres
-        digits = digits.zfill(8)
-            
-        # Retourner la valeur formatée
-        return f"GN{digits}"
+        Returns:
+            pandas.Index: Index des clés, ou None si l'annuaire contient des clés en double
+        """
+        with self._lock:
+            if self._key_index is None:
+                data = self.directory_data if self.directory_data is not None else pd.DataFrame(columns=['key'])
+                self._key_index = (_build_key_index(data),)
+            return self._key_index[0]
+    
+    def get_search_index(self):
+        """Retourne l'index de recherche de l'annuaire (voir `DirectorySearchIndex`).
+
+        L'index est construit une seule fois par version de l'annuaire : après un
+        rechargement ou une fusion, il est reconstruit à la première recherche.
+
+        Returns:
+            DirectorySearchIndex: Index de recherche de l'annuaire courant
+        """
+        from utils.directory_search import DirectorySearchIndex
+        with self._lock:
+            version = self.get_version()
+            if self._search_index is None or self._search_index[0] != version:
+                data = self.directory_data if self.directory_data is not None else pd.DataFrame(columns=['key'])
+                self._search_index = (version, DirectorySearchIndex(data))
+            return self._search_index[1]
+
+    def search(self, query, limit=200):
+        """Recherche une unité dans l'annuaire (code GN, début de nom ou d'abrégé, mots).
+
+        Args:
+            query (str): Texte saisi
+            limit (int, optional): Nombre maximal de lignes retournées
+
+        Returns:
+            DirectorySearchResult: Lignes trouvées et nombre total de correspondances
+        """
+        return self.get_search_index().search(query, limit=limit)
+
+    @property
+    def version_store(self):
+        """Historique des versions de l'annuaire (dossier 'versions' à côté du fichier)."""
+        root = os.path.join(os.path.dirname(self.directory_path), VERSIONS_DIR_NAME)
+        store = getattr(self, '_version_store', None)
+        if store is None or store.root != root:
+            store = self._version_store = DirectoryVersionStore(root)
+        return store
+    
+    def list_versions(self):
+        """Retourne les versions publiées de l'annuaire (voir `DirectoryVersionStore.list_versions`)."""
+        return self.version_store.list_versions()
+    
+    def snapshot(self, as_of=None):
+        """Retourne un instantané en lecture seule de l'annuaire.
+
+        La version et l'index des clés sont calculés une fois (puis mémorisés) avant
+        d'être figés dans l'instantané. L'annuaire n'étant jamais modifié sur place
+        (chargement et fusion remplacent les données), l'instantané reste cohérent
+        pendant toute la durée d'un traitement.
+
+        Args:
+            as_of (str | datetime.date, optional): Date de référence : l'instantané est
+                celui de la version en vigueur à cette date. Par défaut, l'annuaire courant.
+
+        Returns:
+            DirectorySnapshot: L'instantané de l'annuaire
+
+        Raises:
+            ValueError: Si aucune version de l'annuaire n'était en vigueur à cette date
+        """
+        with self._lock:
+            current_version = self.get_version()
+            if as_of is None:
+                data = self.directory_data if self.directory_data is not None else pd.DataFrame(columns=['key'])
+                return DirectorySnapshot(self.directory_path, data, current_version, self.get_key_index())
+
+        entry = self.version_store.find(as_of)
+        if entry is None:
+            raise ValueError(f"Aucune version de l'annuaire en vigueur le {as_of}.")
+        if entry['version'] == current_version:
+            return self.snapshot()
+        with self._lock:
+            snapshot = self._dated_snapshots.get(entry['version'])
+            if snapshot is None:
+                # Reconstruite une fois, puis réutilisée avec son index de clés
+                data = self.version_store.load(entry['version'])
+                snapshot = DirectorySnapshot(self.directory_path, data, entry['version'],
+                                             _build_key_index(data))
+                self._dated_snapshots[entry['version']] = snapshot
+                while len(self._dated_snapshots) > MAX_CACHED_SNAPSHOTS:
+                    self._dated_snapshots.popitem(last=False)
+            self._dated_snapshots.move_to_end(entry['version'])
+            print(f"Annuaire en vigueur le {entry['effective_date']} utilisé (version {entry['version'][:12]}).")
+            return snapshot
+
+    def export_shared(self, as_of=None) -> SharedDirectory:
+        """Exporte l'annuaire formaté et indexé pour les processus de travail.
+
+        L'annuaire est écrit une fois par version (Arrow IPC et clés triées, dans le
+        dossier 'partage' à côté du fichier annuaire). Chaque processus s'y rattache
+        par projection en mémoire (`SharedDirectory.attach`) : ni relecture du CSV,
+        ni copie sérialisée, ni reconstruction de l'index des clés.
+
+        Args:
+            as_of (str | datetime.date, optional): Exporter la version en vigueur à cette date
+
+        Returns:
+            SharedDirectory: Référence (sérialisable) à l'annuaire exporté
+        """
+        shared_dir = os.path.join(os.path.dirname(self.directory_path), SHARED_DIR_NAME)
+        return export_shared_directory(self.snapshot(as_of=as_of), shared_dir)
+
+    def reload(self):
+        """Recharge l'annuaire depuis son fichier (après une modification externe)."""
+        self._load_directory()
+    
+    def _format_gn_value(self, value):
+        """Formate une valeur au format GN + 8 chiffres (voir `format_gn_value`)."""
+        return format_gn_value(value)
     
     def _combine_duplicate_rows(self, df, key_column='key'):
         """Combine les lignes qui ont la même valeur de clé en une seule ligne.
         
+        Pour chaque clé, chaque colonne reçoit la première valeur non vide rencontrée.
+        Les lignes sans clé sont regroupées en une unique ligne vide.
+        
         Args:
             df (pandas.DataFrame): DataFrame à traiter
             key_column (str): Nom de la colonne clé
@@ -170,40 +407,70 @@ class DirectoryManager:
         if not df.duplicated(subset=[key_column], keep=False).any():
             return df
             
-        # Créer un DataFrame pour stocker les résultats
-        result_df = pd.DataFrame(columns=df.columns)
+        # Agrégation vectorisée : première valeur non vide par colonne, clés dans l'ordre d'apparition
+        result_df = df.groupby(key_column, sort=False).first().reset_index()[list(df.columns)]
         
-        # Parcourir les valeurs uniques de la clé
-        for key_value in df[key_column].unique():
-            # Obtenir toutes les lignes pour cette clé
-            rows = df[df[key_column] == key_value]
-            
-            if len(rows) == 1:
-                # Si une seule ligne, l'ajouter directement
-                result_df = pd.concat([result_df, rows])
-            else:
-                # Fusionner les lignes
-                combined_row = {}
-                combined_row[key_column] = key_value
-                
-                # Pour chaque colonne (sauf la clé)
-                for col in df.columns:
-                    if col != key_column:
-                        # Prendre la première valeur non NaN
-                        non_nan_values = rows[col].dropna()
-                        if len(non_nan_values) > 0:
-                            combined_row[col] = non_nan_values.iloc[0]
-                        else:
-                            combined_row[col] = None
-                
-                # Ajouter la ligne combinée au résultat
-                result_df = pd.concat([result_df, pd.DataFrame([combined_row])], ignore_index=True)
+        # Les lignes sans clé ne peuvent être associées : une seule ligne vide les remplace,
+        # insérée à la position de la première ligne sans clé
+        missing_key = df[key_column].isna().to_numpy()
+        if missing_key.any():
+            first_missing = int(missing_key.argmax())
+            keys_before = df[key_column].iloc[:first_missing].nunique()
+            empty_row = pd.DataFrame([{col: None for col in df.columns}])
+            result_df = pd.concat(
+                [result_df.iloc[:keys_before], empty_row, result_df.iloc[keys_before:]],
+                ignore_index=True
+            )
         
         return result_df
     
+    def estimate_merge_cardinality(self, keys1, keys2, how='outer'):
+        """Analyse la multiplicité des clés des deux sources avant leur fusion.
+        
+        Args:
+            keys1 (pandas.Series): Clés formatées du premier fichier
+            keys2 (pandas.Series): Clés formatées du deuxième fichier
+            how (str, optional): Type de fusion ('inner', 'outer', 'left', 'right')
+            
+        Returns:
+            dict: Nombre de lignes et de clés uniques de chaque source, nombre de lignes
+                  d'une jointure brute (produit cartésien des clés répétées) et nombre de
+                  lignes attendues après agrégation à une ligne par clé.
+        """
+        counts1 = keys1.value_counts()
+        counts2 = keys2.value_counts()
+        common = counts1.index.intersection(counts2.index)
+        only1 = int(counts1.drop(common).sum())
+        only2 = int(counts2.drop(common).sum())
+        common_rows = int((counts1[common] * counts2[common]).sum())
+        
+        raw_rows = {
+            'inner': common_rows,
+            'left': common_rows + only1,
+            'right': common_rows + only2,
+            'outer': common_rows + only1 + only2
+        }
+        expected_rows = {
+            'inner': len(common),
+            'left': len(counts1),
+            'right': len(counts2),
+            'outer': len(counts1.index.union(counts2.index))
+        }
+        return {
+            'rows1': int(counts1.sum()),
+            'unique_keys1': len(counts1),
+            'rows2': int(counts2.sum()),
+            'unique_keys2': len(counts2),
+            'raw_join_rows': raw_rows.get(how, raw_rows['outer']),
+            'expected_rows': expected_rows.get(how, expected_rows['outer'])
+        }
+    
     def merge_directories(self, file_path1, file_path2, key_column1=None, key_column2=None, how='outer', 
                           columns_to_delete1: Optional[List[str]] = None,
-                          columns_to_delete2: Optional[List[str]] = None):
+                          columns_to_delete2: Optional[List[str]] = None,
+                          data1: Optional[pd.DataFrame] = None,
+                          data2: Optional[pd.DataFrame] = None,
+                          effective_date=None):
         """Fusionne deux fichiers CSV pour créer un annuaire.
         
         Args:
@@ -214,14 +481,19 @@ class DirectoryManager:
             how (str, optional): Type de fusion ('inner', 'outer', 'left', 'right')
             columns_to_delete1 (list[str], optional): Liste des colonnes à supprimer du premier fichier avant fusion.
             columns_to_delete2 (list[str], optional): Liste des colonnes à supprimer du deuxième fichier avant fusion.
+            data1 (pandas.DataFrame, optional): Contenu déjà importé du premier fichier (évite une seconde lecture)
+            data2 (pandas.DataFrame, optional): Contenu déjà importé du deuxième fichier (évite une seconde lecture)
+            effective_date (str | datetime.date, optional): Date d'entrée en vigueur du nouvel
+                annuaire (par défaut, aujourd'hui)
             
         Returns:
             bool: True si la fusion a réussi, False sinon
         """
         try:
-            # Importer les deux fichiers CSV
-            df1 = import_csv(file_path1)
-            df2 = import_csv(file_path2)
+            # Réutiliser les données déjà importées, sinon lire les fichiers CSV
+            # (copie pour ne pas modifier les données de l'appelant)
+            df1 = data1.copy() if data1 is not None else import_csv(file_path1)
+            df2 = data2.copy() if data2 is not None else import_csv(file_path2)
             
             # Si les colonnes clés ne sont pas spécifiées, utiliser la première colonne
             if key_column1 is None and len(df1.columns) > 0:
@@ -255,6 +527,19 @@ class DirectoryManager:
             df1[key_column1] = df1[key_column1].apply(self._format_gn_value)
             df2[key_column2] = df2[key_column2].apply(self._format_gn_value)
             
+            # --- Contrôle de la cardinalité des clés AVANT fusion ---
+            # Une clé répétée des deux côtés produirait un produit cartésien :
+            # chaque source est d'abord ramenée à une ligne par clé (même règle que
+            # la combinaison finale), ce qui rend la jointure un-à-un.
+            cardinality = self.estimate_merge_cardinality(df1[key_column1], df2[key_column2], how)
+            self.last_merge_cardinality = cardinality
+            print(f"Fichier 1 : {cardinality['rows1']} lignes, {cardinality['unique_keys1']} clés uniques. "
+                  f"Fichier 2 : {cardinality['rows2']} lignes, {cardinality['unique_keys2']} clés uniques.")
+            print(f"Jointure brute : {cardinality['raw_join_rows']} lignes. "
+                  f"Jointure après agrégation par clé : {cardinality['expected_rows']} lignes attendues.")
+            df1 = self._combine_duplicate_rows(df1, key_column1)
+            df2 = self._combine_duplicate_rows(df2, key_column2)
+            
             # --- Fusionner les deux DataFrames ---
             # Utilisation de 'outer' pour conserver toutes les lignes
             # Les clés formatées sont utilisées pour la jointure
@@ -281,9 +566,13 @@ class DirectoryManager:
             # Gère les cas où une clé existait dans les deux fichiers ou était dupliquée
             merged_df = self._combine_duplicate_rows(merged_df, 'key')
             
-            # Mettre à jour l'annuaire de l'application
-            self.directory_data = merged_df
-            self._save_directory()
+            # Mettre à jour l'annuaire de l'application : les données, la version et
+            # l'index sont remplacés ensemble (les instantanés en cours restent valides)
+            with self._lock:
+                self.directory_data = merged_df
+                self._version = None
+                self._key_index = None
+            self._save_directory(effective_date=effective_date)
             
             return True
         except Exception as e:
@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import re
+import unicodedata
+import numpy as np
+import pandas as pd
+from typing import NamedTuple, Optional
+from utils.directory_manager import format_gn_value
+
+# Colonnes recherchées par préfixe (libellé de la correspondance, dans l'ordre de classement)
+PREFIX_SEARCH_COLUMNS = [('key', "clé"), ('abrege_unite', "abrégé"), ('nom_unite', "nom")]
+# Colonnes découpées en mots pour la recherche par mots
+TOKEN_SEARCH_COLUMNS = ['nom_unite', 'abrege_unite', 'libelle_unite', 'adresse_geographique_unite']
+# Libellé des correspondances
+EXACT_KEY_MATCH = "clé exacte"
+TOKEN_MATCH = "mots"
+# Colonne ajoutée aux résultats
+MATCH_COLUMN = 'correspondance'
+DEFAULT_SEARCH_LIMIT = 200
+# Saisie reconnue comme un code unité (GN + chiffres, ou chiffres seuls)
+GN_QUERY_PATTERN = re.compile(r'^(GN)?\s*\d+$', re.IGNORECASE)
+# Ligatures non décomposées par la normalisation Unicode
+_LIGATURES = str.maketrans({'œ': 'oe', 'Œ': 'OE', 'æ': 'ae', 'Æ': 'AE', 'ß': 'ss'})
+# Borne supérieure des chaînes commençant par un préfixe (texte normalisé en ASCII)
+_PREFIX_END = '\x7f'
+
+
+def normalize_text(value) -> str:
+    """Normalise un texte pour la recherche : minuscules, sans accents ni ponctuation.
+
+    Exemple : « Brigade Territoriale d'Évry » -> « brigade territoriale d evry ».
+    """
+    if value is None or (not isinstance(value, str) and pd.isna(value)):
+        return ""
+    text = unicodedata.normalize('NFKD', str(value).translate(_LIGATURES))
+    text = text.encode('ascii', 'ignore').decode('ascii').lower()
+    return re.sub(r'[^0-9a-z]+', ' ', text).strip()
+
+
+def _normalize_series(values: pd.Series) -> pd.Series:
+    """Version vectorisée de `normalize_text` (résultat identique, valeur par valeur)."""
+    text = values.astype(object).where(values.notna(), "").astype(str).str.translate(_LIGATURES)
+    text = text.str.normalize('NFKD').str.encode('ascii', 'ignore').str.decode('ascii').str.lower()
+    return text.str.replace(r'[^0-9a-z]+', ' ', regex=True).str.strip()
+
+
+class DirectorySearchResult(NamedTuple):
+    """Résultat d'une recherche dans l'annuaire."""
+    data: pd.DataFrame # Lignes trouvées (colonne 'correspondance' en tête), dans l'ordre de classement
+    total: int # Nombre de lignes correspondantes (avant limitation)
+
+
+class DirectorySearchIndex:
+    """Index de recherche de l'annuaire, construit une fois par version.
+
+    Trois recherches sont combinées, les résultats étant classés dans cet ordre :
+
+    - clé exacte : une saisie de la forme « GN… » ou numérique est formatée comme les
+      clés de l'annuaire puis recherchée dans la table de hachage des clés ;
+    - préfixe sur la clé, l'abrégé puis le nom de l'unité : valeurs normalisées
+      triées, recherche par dichotomie ;
+    - mots (sans accents ni casse) : index inversé trié des mots des colonnes
+      descriptives ; chaque mot saisi est un préfixe de mot et tous doivent être présents.
+
+    L'index ne dépend que des données de l'annuaire : il est en lecture seule et peut
+    être partagé entre fils.
+    """
+
+    def __init__(self, data: pd.DataFrame):
+        """Construit l'index.
+
+        Args:
+            data (pandas.DataFrame): Données de l'annuaire (colonne 'key' formatée)
+        """
+        self.data = data.reset_index(drop=True)
+        self.size = len(self.data)
+        keys = self.data['key'].astype(str) if 'key' in self.data.columns else pd.Series([], dtype=str)
+        self._key_index = pd.Index(keys)
+
+        # --- Préfixes : valeurs normalisées triées et positions correspondantes ---
+        self._prefix_fields = []
+        for column, label in PREFIX_SEARCH_COLUMNS:
+            if column not in self.data.columns:
+                continue
+            normalized = _normalize_series(self.data[column]).to_numpy(dtype=str)
+            order = np.argsort(normalized, kind='stable')
+            self._prefix_fields.append((label, normalized[order], order))
+
+        # --- Mots : vocabulaire trié et listes de lignes (format compressé) ---
+        columns = [col for col in TOKEN_SEARCH_COLUMNS if col in self.data.columns]
+        if columns and self.size:
+            tokens = pd.concat([_normalize_series(self.data[col]).str.split() for col in columns])
+            pairs = tokens.explode().dropna()
+            pairs = pd.DataFrame({'token': pairs.to_numpy(dtype=str), 'row': pairs.index.to_numpy(dtype=np.int64)})
+            pairs = pairs.drop_duplicates().sort_values(['token', 'row'], kind='stable')
+            all_tokens = pairs['token'].to_numpy(dtype=str)
+            self._vocabulary, starts = np.unique(all_tokens, return_index=True)
+            self._offsets = np.append(starts, len(all_tokens))
+            self._postings = pairs['row'].to_numpy(dtype=np.int64)
+        else:
+            self._vocabulary = np.array([], dtype=str)
+            self._offsets = np.zeros(1, dtype=np.int64)
+            self._postings = np.array([], dtype=np.int64)
+
+    def lookup_key(self, key) -> np.ndarray:
+        """Positions des lignes dont la clé correspond exactement (après formatage GN)."""
+        formatted = format_gn_value(str(key).strip().upper())
+        if not self._key_index.is_unique:
+            return np.flatnonzero(self._key_index == formatted)
+        position = self._key_index.get_indexer([formatted])[0]
+        return np.array([position] if position >= 0 else [], dtype=np.int64)
+
+    @staticmethod
+    def _prefix_range(sorted_values, prefix):
+        """Bornes des valeurs triées commençant par le préfixe."""
+        start = np.searchsorted(sorted_values, prefix, side='left')
+        end = np.searchsorted(sorted_values, prefix + _PREFIX_END, side='left')
+        return start, end
+
+    def prefix_search(self, prefix: str) -> list:
+        """Positions des lignes dont la clé, l'abrégé ou le nom commence par le préfixe.
+
+        Returns:
+            list: Couples (libellé du champ, positions triées)
+        """
+        prefix = normalize_text(prefix)
+        if not prefix:
+            return []
+        matches = []
+        for label, sorted_values, order in self._prefix_fields:
+            start, end = self._prefix_range(sorted_values, prefix)
+            matches.append((label, np.sort(order[start:end])))
+        return matches
+
+    def token_search(self, query: str) -> np.ndarray:
+        """Positions des lignes contenant un mot commençant par chacun des mots saisis."""
+        rows = None
+        for token in normalize_text(query).split():
+            start, end = self._prefix_range(self._vocabulary, token)
+            matched = np.unique(self._postings[self._offsets[start]:self._offsets[end]])
+            rows = matched if rows is None else np.intersect1d(rows, matched, assume_unique=True)
+            if len(rows) == 0:
+                break
+        return rows if rows is not None else np.array([], dtype=np.int64)
+
+    def search(self, query: str, limit: Optional[int] = DEFAULT_SEARCH_LIMIT) -> DirectorySearchResult:
+        """Recherche une saisie dans l'annuaire.
+
+        Args:
+            query (str): Code unité, début de nom ou d'abrégé, ou mots
+            limit (int, optional): Nombre maximal de lignes retournées (None : toutes)
+
+        Returns:
+            DirectorySearchResult: Lignes trouvées, classées (clé exacte, préfixes, mots)
+        """
+        query = (query or "").strip()
+        groups = []
+        if query and GN_QUERY_PATTERN.match(query):
+            groups.append((EXACT_KEY_MATCH, self.lookup_key(query)))
+        if query:
+            groups += self.prefix_search(query)
+            groups.append((TOKEN_MATCH, self.token_search(query)))
+
+        # Chaque ligne est classée selon sa première correspondance
+        seen = np.zeros(self.size, dtype=bool)
+        positions, labels = [], []
+        for label, rows in groups:
+            rows = rows[~seen[rows]]
+            seen[rows] = True
+            positions.append(rows)
+            labels.append(np.full(len(rows), label, dtype=object))
+        positions = np.concatenate(positions) if positions else np.array([], dtype=np.int64)
+        labels = np.concatenate(labels) if labels else np.array([], dtype=object)
+        total = len(positions)
+        if limit is not None:
+            positions, labels = positions[:limit], labels[:limit]
+        data = self.data.iloc[positions].reset_index(drop=True)
+        data.insert(0, MATCH_COLUMN, labels)
+        return DirectorySearchResult(data, total)
@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import os
+import json
+import pickle
+import datetime
+import threading
+import pandas as pd
+from collections import OrderedDict
+from typing import Optional
+
+# Dossier des versions de l'annuaire (à côté du fichier annuaire)
+VERSIONS_DIR_NAME = 'versions'
+MANIFEST_FILE_NAME = 'versions.json'
+VERSION_FILE_EXTENSION = '.pkl'
+# Au-delà de cette proportion de lignes modifiées, une nouvelle base complète est enregistrée
+DEFAULT_REBASE_RATIO = 0.3
+# Nombre de bases gardées en mémoire pour reconstruire les versions
+DEFAULT_CACHED_BASES = 2
+
+
+def parse_date(value) -> datetime.date:
+    """Convertit une date ('AAAA-MM-JJ', date ou datetime) en `datetime.date`."""
+    if isinstance(value, datetime.datetime):
+        return value.date()
+    if isinstance(value, datetime.date):
+        return value
+    try:
+        return datetime.date.fromisoformat(str(value)[:10])
+    except ValueError:
+        raise ValueError(f"Date invalide: {value} (format attendu: AAAA-MM-JJ)")
+
+
+class DirectoryVersionStore:
+    """Historique immuable des versions de l'annuaire.
+
+    Chaque version publiée est soit une base complète, soit un delta par rapport à
+    la dernière base (lignes ajoutées ou modifiées et ordre des clés) : une version
+    ne coûte que ses changements. Les fichiers de version et le manifeste sont
+    écrits dans un fichier temporaire puis renommés, un lecteur ne voit donc
+    jamais de version partielle. Chaque version porte une date d'entrée en vigueur
+    permettant de retraiter une période passée avec l'annuaire de l'époque.
+    """
+
+    def __init__(self, root: str, rebase_ratio: float = DEFAULT_REBASE_RATIO,
+                 cached_bases: int = DEFAULT_CACHED_BASES):
+        """Initialise l'historique.
+
+        Args:
+            root (str): Dossier des versions
+            rebase_ratio (float, optional): Proportion de lignes modifiées au-delà de
+                laquelle une nouvelle base complète est enregistrée
+            cached_bases (int, optional): Nombre de bases gardées en mémoire
+        """
+        self.root = root
+        self.rebase_ratio = rebase_ratio
+        self.cached_bases = cached_bases
+        self._bases = OrderedDict() # version de base -> DataFrame
+        self._lock = threading.Lock()
+
+    def _manifest_path(self):
+        return os.path.join(self.root, MANIFEST_FILE_NAME)
+
+    def _read_manifest(self):
+        """Lit le manifeste des versions (liste vide s'il n'existe pas)."""
+        path = self._manifest_path()
+        if not os.path.exists(path):
+            return []
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def _write_atomic(self, path, write):
+        """Écrit un fichier via un fichier temporaire renommé (remplacement atomique)."""
+        tmp_path = f"{path}.{os.getpid()}-{threading.get_ident()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            write(f)
+        os.replace(tmp_path, path)
+
+    def list_versions(self) -> list:
+        """Retourne les versions publiées, de la plus ancienne à la plus récente en vigueur.
+
+        Returns:
+            list[dict]: Entrées du manifeste ('version', 'effective_date', 'published_at',
+                'kind', 'base', 'file', 'rows', 'changed_rows')
+        """
+        return sorted(self._read_manifest(), key=lambda e: (e['effective_date'], e['published_at']))
+
+    def find(self, as_of) -> Optional[dict]:
+        """Retourne la version en vigueur à une date donnée.
+
+        Args:
+            as_of (str | datetime.date): Date recherchée
+
+        Returns:
+            dict: Entrée du manifeste, ou None si aucune version n'était en vigueur
+        """
+        day = parse_date(as_of).isoformat()
+        in_force = [entry for entry in self.list_versions() if entry['effective_date'] <= day]
+        return in_force[-1] if in_force else None
+
+    def publish(self, data: pd.DataFrame, version: str, effective_date=None) -> dict:
+        """Publie une nouvelle version de l'annuaire.
+
+        Args:
+            data (pandas.DataFrame): Contenu de l'annuaire (colonne 'key')
+            version (str): Version de l'annuaire (empreinte de son contenu)
+            effective_date (str | datetime.date, optional): Date d'entrée en vigueur
+                (par défaut, aujourd'hui)
+
+        Returns:
+            dict: L'entrée du manifeste de la version publiée
+        """
+        effective = parse_date(effective_date or datetime.date.today()).isoformat()
+        with self._lock:
+            os.makedirs(self.root, exist_ok=True)
+            manifest = self._read_manifest()
+            for entry in manifest:
+                if entry['version'] == version and entry['effective_date'] == effective:
+                    return entry # Déjà publiée pour cette date
+
+            known = next((entry for entry in manifest if entry['version'] == version), None)
+            entry = {
+                'version': version,
+                'effective_date': effective,
+                'published_at': datetime.datetime.now().isoformat(timespec='seconds'),
+                'rows': len(data)
+            }
+            if known is not None:
+                # Contenu déjà stocké (retour à une version antérieure) : seul le manifeste change
+                entry.update({k: known[k] for k in ('kind', 'base', 'file', 'changed_rows')})
+            else:
+                entry.update(self._store(data, version, manifest))
+            manifest.append(entry)
+            self._write_atomic(self._manifest_path(),
+                               lambda f: f.write(json.dumps(manifest, ensure_ascii=False, indent=2).encode('utf-8')))
+        print(f"Version {version[:12]} de l'annuaire publiée ({entry['kind']}, en vigueur le {effective}).")
+        return entry
+
+    def _store(self, data, version, manifest):
+        """Enregistre le contenu d'une version (delta si possible, sinon base complète)."""
+        bases = [entry for entry in manifest if entry['kind'] == 'base']
+        if bases:
+            base_entry = max(bases, key=lambda e: e['published_at'])
+            delta = self._make_delta(self._load_base(base_entry), data)
+            if delta is not None:
+                file_name = f"delta_{version[:16]}{VERSION_FILE_EXTENSION}"
+                self._write_atomic(os.path.join(self.root, file_name),
+                                   lambda f: pickle.dump(delta, f, protocol=pickle.HIGHEST_PROTOCOL))
+                return {'kind': 'delta', 'base': base_entry['version'], 'file': file_name,
+                        'changed_rows': len(delta['rows'])}
+
+        file_name = f"base_{version[:16]}{VERSION_FILE_EXTENSION}"
+        self._write_atomic(os.path.join(self.root, file_name),
+                           lambda f: pickle.dump(data, f, protocol=pickle.HIGHEST_PROTOCOL))
+        self._remember_base(version, data)
+        return {'kind': 'base', 'base': version, 'file': file_name, 'changed_rows': len(data)}
+
+    def _make_delta(self, base, data):
+        """Calcule le delta d'une version par rapport à une base.
+
+        Returns:
+            dict: Le delta, ou None si une base complète est préférable (colonnes
+                différentes, clés en double, trop de lignes modifiées)
+        """
+        if list(base.columns) != list(data.columns) or 'key' not in data.columns:
+            return None
+        if not (base['key'].is_unique and data['key'].is_unique):
+            return None
+
+        in_base = data['key'].isin(base['key']).to_numpy()
+        base_rows = base.set_index('key', drop=False).loc[data['key'][in_base]]
+        # Comparaison ligne à ligne par empreinte (valeurs et types)
+        changed = (pd.util.hash_pandas_object(data[in_base], index=False).to_numpy()
+                   != pd.util.hash_pandas_object(base_rows, index=False).to_numpy())
+        keep = ~in_base
+        keep[in_base] = changed
+        if keep.sum() > self.rebase_ratio * max(len(data), 1):
+            return None
+
+        delta = {
+            'columns': list(data.columns),
+            'dtypes': {col: str(dtype) for col, dtype in data.dtypes.items()},
+            'order': data['key'].to_numpy(),
+            'rows': data[keep].reset_index(drop=True)
+        }
+        # Contrôle de la reconstruction : la version doit être restituée à l'identique
+        try:
+            if self._apply_delta(base, delta).equals(data.reset_index(drop=True)):
+                return delta
+        except Exception:
+            pass
+        return None
+
+    @staticmethod
+    def _apply_delta(base, delta):
+        """Reconstruit une version à partir de sa base et de son delta."""
+        combined = pd.concat([base, delta['rows']], ignore_index=True)
+        combined = combined.drop_duplicates(subset='key', keep='last').set_index('key', drop=False)
+        result = combined.loc[delta['order']].reset_index(drop=True)[delta['columns']]
+        return result.astype(delta['dtypes'])
+
+    def _remember_base(self, version, data):
+        self._bases[version] = data
+        self._bases.move_to_end(version)
+        while len(self._bases) > self.cached_bases:
+            self._bases.popitem(last=False)
+
+    def _load_base(self, entry):
+        """Charge une base (gardée en mémoire pour les reconstructions suivantes)."""
+        data = self._bases.get(entry['version'])
+        if data is None:
+            with open(os.path.join(self.root, entry['file']), 'rb') as f:
+                data = pickle.load(f)
+            self._remember_base(entry['version'], data)
+        return data
+
+    def load(self, version: str) -> pd.DataFrame:
+        """Reconstruit le contenu d'une version publiée.
+
+        Args:
+            version (str): Version recherchée
+
+        Returns:
+            pandas.DataFrame: Contenu de l'annuaire dans cette version
+        """
+        manifest = self._read_manifest()
+        entry = next((e for e in manifest if e['version'] == version), None)
+        if entry is None:
+            raise ValueError(f"Version d'annuaire inconnue: {version}")
+        with self._lock:
+            base_entry = next(e for e in manifest if e['version'] == entry['base'] and e['kind'] == 'base')
+            base = self._load_base(base_entry)
+            if entry['kind'] == 'base':
+                return base
+            with open(os.path.join(self.root, entry['file']), 'rb') as f:
+                delta = pickle.load(f)
+        return self._apply_delta(base, delta)
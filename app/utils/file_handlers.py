@@ -5,11 +5,12 @@ import os
 import pandas as pd
 import csv
 
-def import_data(file_path):
+def import_data(file_path, usecols=None):
     """Importe des données depuis un fichier.
     
     Args:
         file_path (str): Chemin vers le fichier à importer
+        usecols (list[str], optional): Colonnes à importer (par défaut, toutes)
         
     Returns:
         pandas.DataFrame: Les données importées
@@ -27,56 +28,72 @@ def import_data(file_path):
     try:
         # Importer selon le type de fichier
         if ext in ['.xlsx', '.xls']:
-            return _import_excel(file_path)
+            return _import_excel(file_path, usecols=usecols)
         elif ext == '.csv':
-            return import_csv(file_path)
+            return import_csv(file_path, usecols=usecols)
         else:
             raise ValueError(f"Format de fichier non supporté: {ext}")
     except Exception as e:
         raise ValueError(f"Erreur lors de l'importation: {str(e)}")
 
-def _import_excel(file_path):
+def _import_excel(file_path, usecols=None):
     """Importe un fichier Excel.
     
     Args:
         file_path (str): Chemin vers le fichier Excel
+        usecols (list[str], optional): Colonnes à importer (par défaut, toutes)
         
     Returns:
         pandas.DataFrame: Les données du fichier Excel
     """
     try:
         # Lecture avec pandas
-        return pd.read_excel(file_path)
+        return pd.read_excel(file_path, usecols=usecols)
     except Exception as e:
         raise ValueError(f"Erreur lors de l'importation Excel: {str(e)}")
 
-def import_csv(file_path):
+def import_csv(file_path, usecols=None):
     """Importe un fichier CSV.
     
     Args:
         file_path (str): Chemin vers le fichier CSV
+        usecols (list[str], optional): Colonnes à importer (par défaut, toutes)
         
     Returns:
         pandas.DataFrame: Les données du fichier CSV
     """
     try:
         # Détection automatique du délimiteur
-        with open(file_path, 'r', newline='', encoding='utf-8') as f:
-            dialect = csv.Sniffer().sniff(f.read(4096))
-            f.seek(0)
+        delimiter = detect_csv_delimiter(file_path)
         
         # Lecture avec pandas en utilisant le délimiteur détecté
-        return pd.read_csv(file_path, sep=dialect.delimiter)
+        return pd.read_csv(file_path, sep=delimiter, usecols=usecols)
     except Exception as e:
         # Fallback sur la lecture standard
         try:
-            return pd.read_csv(file_path)
+            return pd.read_csv(file_path, usecols=usecols)
         except:
             raise ValueError(f"Erreur lors de l'importation CSV: {str(e)}")
 
+def detect_csv_delimiter(file_path):
+    """Détecte le délimiteur d'un fichier CSV à partir de son début.
+    
+    Args:
+        file_path (str): Chemin vers le fichier CSV
+        
+    Returns:
+        str: Le délimiteur détecté
+    """
+    with open(file_path, 'r', newline='', encoding='utf-8') as f:
+        dialect = csv.Sniffer().sniff(f.read(4096))
+    return dialect.delimiter
+
 def export_data(data, file_path, format_type='csv'):
     """Exporte des données vers un fichier.
     
+    Le fichier est d'abord écrit sous un nom temporaire dans le même répertoire puis
+    renommé : un lecteur ne voit jamais un export partiel.
+    
     Args:
         data (pandas.DataFrame): Les données à exporter
         file_path (str): Chemin du fichier de destination
@@ -85,18 +102,26 @@ def export_data(data, file_path, format_type='csv'):
     Returns:
         bool: True si l'export a réussi, False sinon
     """
+    directory, file_name = os.path.split(file_path)
+    _, ext = os.path.splitext(file_name)
+    # L'extension est conservée pour que pandas choisisse le bon moteur Excel
+    tmp_path = os.path.join(directory, f".{file_name}.tmp{ext}")
     try:
         # Créer le répertoire parent si nécessaire
-        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
         
         # Exporter selon le format
         if format_type.lower() == 'excel':
-            data.to_excel(file_path, index=False)
+            data.to_excel(tmp_path, index=False)
         else:
             # Standardiser l'export CSV avec point-virgule et encodage utf-8-sig
-            data.to_csv(file_path, index=False, sep=';', encoding='utf-8-sig')
+            data.to_csv(tmp_path, index=False, sep=';', encoding='utf-8-sig')
+        os.replace(tmp_path, file_path)
         
         return True
     except Exception as e:
         print(f"Erreur lors de l'export: {str(e)}")
-        return False 
\ No newline at end of file
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        return False
@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import os
+import json
+import pickle
+import hashlib
+import threading
+import pandas as pd
+from typing import Optional, Tuple
+
+# Taille maximale par défaut du cache disque (500 Mo)
+DEFAULT_MAX_SIZE_BYTES = 500 * 1024 * 1024
+CACHE_FILE_EXTENSION = '.pkl'
+
+
+class ResultCache:
+    """Cache disque des résultats de traitement, adressé par le contenu des entrées.
+
+    Chaque entrée est identifiée par une empreinte combinant le contenu du fichier
+    importé, la version de l'annuaire et les paramètres de traitement. Les résultats
+    (`processed_data` et dictionnaire `stats`) sont sérialisés au format pickle binaire
+    et la taille totale du cache est bornée par une éviction LRU.
+    """
+
+    def __init__(self, cache_dir=None, max_size_bytes=DEFAULT_MAX_SIZE_BYTES):
+        """Initialise le cache.
+
+        Args:
+            cache_dir (str, optional): Répertoire de stockage du cache
+            max_size_bytes (int, optional): Taille maximale totale du cache en octets
+        """
+        self.cache_dir = cache_dir or os.path.join('app', 'resources', 'cache')
+        self.max_size_bytes = max_size_bytes
+
+    @staticmethod
+    def hash_file(file_path, chunk_size=1024 * 1024):
+        """Calcule l'empreinte SHA-256 du contenu d'un fichier.
+
+        Args:
+            file_path (str): Chemin du fichier
+            chunk_size (int, optional): Taille des blocs lus
+
+        Returns:
+            str: Empreinte hexadécimale du contenu
+        """
+        digest = hashlib.sha256()
+        with open(file_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(chunk_size), b''):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    @staticmethod
+    def hash_dataframe(df):
+        """Calcule une empreinte du contenu d'un DataFrame (colonnes et valeurs).
+
+        Args:
+            df (pandas.DataFrame): Données à empreinter
+
+        Returns:
+            str: Empreinte hexadécimale du contenu
+        """
+        digest = hashlib.sha256()
+        digest.update(json.dumps([str(col) for col in df.columns]).encode('utf-8'))
+        digest.update(pd.util.hash_pandas_object(df, index=False).values.tobytes())
+        return digest.hexdigest()
+
+    @staticmethod
+    def make_key(data_fingerprint, directory_version, params):
+        """Construit la clé de cache d'un traitement.
+
+        Args:
+            data_fingerprint (str): Empreinte des données importées
+            directory_version (str): Version de l'annuaire utilisé
+            params (dict): Paramètres de traitement
+
+        Returns:
+            str: Clé de cache hexadécimale
+        """
+        payload = json.dumps({
+            'data': data_fingerprint,
+            'directory': directory_version,
+            'params': params
+        }, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def _entry_path(self, key):
+        """Retourne le chemin du fichier de cache associé à une clé."""
+        return os.path.join(self.cache_dir, key + CACHE_FILE_EXTENSION)
+
+    def get(self, key) -> Optional[Tuple[pd.DataFrame, dict]]:
+        """Récupère un résultat depuis le cache.
+
+        Args:
+            key (str): Clé de cache
+
+        Returns:
+            tuple: (processed_data, stats) si présent dans le cache, None sinon
+        """
+        entry_path = self._entry_path(key)
+        if not os.path.exists(entry_path):
+            return None
+        try:
+            with open(entry_path, 'rb') as f:
+                entry = pickle.load(f)
+            # Marquer l'entrée comme récemment utilisée (ordre LRU basé sur mtime)
+            os.utime(entry_path, None)
+            return entry['processed_data'], entry['stats']
+        except Exception as e:
+            print(f"Entrée de cache illisible ({key}), elle sera ignorée: {e}")
+            self._remove(entry_path)
+            return None
+
+    def put(self, key, processed_data, stats):
+        """Stocke un résultat dans le cache puis applique l'éviction LRU.
+
+        Args:
+            key (str): Clé de cache
+            processed_data (pandas.DataFrame): Données traitées
+            stats (dict): Dictionnaire des statistiques
+        """
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            entry_path = self._entry_path(key)
+            # Fichier temporaire propre à l'écrivain : plusieurs traitements simultanés
+            # peuvent produire la même entrée
+            tmp_path = f"{entry_path}.{os.getpid()}-{threading.get_ident()}.tmp"
+            with open(tmp_path, 'wb') as f:
+                pickle.dump({'processed_data': processed_data, 'stats': stats}, f,
+                            protocol=pickle.HIGHEST_PROTOCOL)
+            # Remplacement atomique pour ne jamais exposer une entrée partielle
+            os.replace(tmp_path, entry_path)
+            self._evict()
+        except Exception as e:
+            print(f"Erreur lors de l'écriture dans le cache: {e}")
+
+    def _evict(self):
+        """Supprime les entrées les moins récemment utilisées au-delà de la taille maximale."""
+        entries = []
+        total_size = 0
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith(CACHE_FILE_EXTENSION):
+                continue
+            path = os.path.join(self.cache_dir, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+            total_size += stat.st_size
+
+        # Les plus anciennes en premier
+        entries.sort()
+        while total_size > self.max_size_bytes and entries:
+            _, size, path = entries.pop(0)
+            self._remove(path)
+            total_size -= size
+
+    def clear(self):
+        """Vide entièrement le cache."""
+        if not os.path.isdir(self.cache_dir):
+            return
+        for name in os.listdir(self.cache_dir):
+            if name.endswith(CACHE_FILE_EXTENSION):
+                self._remove(os.path.join(self.cache_dir, name))
+
+    @staticmethod
+    def _remove(path):
+        """Supprime un fichier de cache sans lever d'erreur."""
+        try:
+            os.remove(path)
+        except OSError:
+            pass
@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import os
+import re
+import json
+import datetime
+import threading
+import multiprocessing
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional, NamedTuple
+
+SHARD_MANIFEST_NAME = 'manifest.json'
+# Fichier des lignes sans département (clé absente de l'annuaire)
+UNKNOWN_DEPARTMENT = 'inconnu'
+# Nombre de lignes mises en forme à la fois
+EXPORT_BLOCK_ROWS = 100000
+# En dessous de ce nombre de lignes, la mise en forme se fait dans le processus courant
+PARALLEL_EXPORT_MIN_ROWS = 200000
+
+
+class ShardedExport(NamedTuple):
+    """Résultat d'un export par département."""
+    directory: str # Dossier des fichiers
+    manifest_path: str # Manifeste décrivant les fichiers
+    shards: list # Un dictionnaire par fichier (departement, file, rows, bytes)
+
+
+def department_label(value) -> str:
+    """Retourne le libellé de département utilisé dans le nom des fichiers ('01', '2A', 'inconnu')."""
+    if value is None or pd.isna(value):
+        return UNKNOWN_DEPARTMENT
+    label = str(value).strip()
+    if label.endswith('.0') and label[:-2].isdigit():
+        label = label[:-2]
+    if label.isdigit():
+        label = label.zfill(2)
+    return re.sub(r'[^0-9A-Za-z_-]', '_', label) or UNKNOWN_DEPARTMENT
+
+
+def write_csv_blocks(data: pd.DataFrame, file_path: str, block_rows: int = EXPORT_BLOCK_ROWS) -> int:
+    """Écrit un DataFrame en CSV par blocs de lignes (écriture atomique).
+
+    Même format que `export_data` (séparateur ';', encodage utf-8-sig) : chaque bloc
+    est mis en forme d'un seul tenant par le moteur CSV de pandas et l'en-tête n'est
+    écrit qu'une fois.
+
+    Args:
+        data (pandas.DataFrame): Les données à écrire
+        file_path (str): Chemin du fichier
+        block_rows (int, optional): Nombre de lignes par bloc
+
+    Returns:
+        int: Taille du fichier écrit (octets)
+    """
+    tmp_path = f"{file_path}.{os.getpid()}-{threading.get_ident()}.tmp"
+    try:
+        with open(tmp_path, 'w', encoding='utf-8-sig', newline='') as f:
+            if data.empty:
+                data.to_csv(f, index=False, sep=';')
+            for start in range(0, len(data), block_rows):
+                data.iloc[start:start + block_rows].to_csv(f, index=False, sep=';', header=start == 0)
+        os.replace(tmp_path, file_path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return os.path.getsize(file_path)
+
+
+def _format_block(block):
+    """Met en forme un bloc de lignes en texte CSV, sans en-tête (exécuté dans un processus de travail)."""
+    return block.to_csv(index=False, sep=';', header=False, lineterminator=os.linesep)
+
+
+class _EmbeddedLineBreak(Exception):
+    """Une valeur contient un saut de ligne : une ligne de données ne correspond plus à une ligne de texte."""
+
+
+def _write_formatted_shards(ordered, shard_rows, paths, block_rows, executor):
+    """Écrit les fichiers de département à partir de blocs mis en forme (données triées par département).
+
+    Les blocs sont mis en forme dans l'ordre, en parallèle si un pool de processus est
+    fourni, et leurs lignes sont réparties entre les fichiers au fil de l'eau : la
+    mémoire utilisée reste de l'ordre de quelques blocs.
+
+    Returns:
+        list[int]: Taille de chaque fichier (octets)
+
+    Raises:
+        _EmbeddedLineBreak: Si une valeur contient un saut de ligne
+    """
+    header = ordered.iloc[:0].to_csv(index=False, sep=';', lineterminator=os.linesep)
+    blocks = (ordered.iloc[start:start + block_rows] for start in range(0, len(ordered), block_rows))
+    texts = executor.map(_format_block, blocks) if executor is not None else map(_format_block, blocks)
+    suffix = f".{os.getpid()}-{threading.get_ident()}.tmp"
+    shard, remaining, handle = -1, 0, None
+    try:
+        for text in texts:
+            lines = text.split(os.linesep)[:-1]
+            position = 0
+            while position < len(lines):
+                if remaining == 0:
+                    if handle is not None:
+                        handle.close()
+                    shard += 1
+                    if shard >= len(paths):
+                        raise _EmbeddedLineBreak()
+                    remaining = shard_rows[shard]
+                    handle = open(paths[shard] + suffix, 'w', encoding='utf-8-sig', newline='')
+                    handle.write(header)
+                    continue
+                taken = lines[position:position + remaining]
+                handle.write(os.linesep.join(taken) + os.linesep)
+                position += len(taken)
+                remaining -= len(taken)
+        if handle is not None:
+            handle.close()
+            handle = None
+        if shard != len(paths) - 1 or remaining != 0:
+            raise _EmbeddedLineBreak()
+    except BaseException:
+        if handle is not None:
+            handle.close()
+        for path in paths:
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+        raise
+    for path in paths:
+        os.replace(path + suffix, path)
+    return [os.path.getsize(path) for path in paths]
+
+
+def export_by_department(data: pd.DataFrame, output_dir: str, stem: str, column: str = 'departement',
+                         max_workers: Optional[int] = None, block_rows: int = EXPORT_BLOCK_ROWS) -> ShardedExport:
+    """Exporte les données fusionnées en un fichier CSV par département, plus un manifeste.
+
+    Les lignes sont regroupées par département en un seul passage (tri stable), puis
+    mises en forme par blocs de `block_rows` lignes, simultanément dans un pool de
+    processus pour les gros volumes : le débit de l'export croît avec le nombre de
+    cœurs. Chaque fichier a le même format que `export_data` et contient les lignes
+    de son département dans leur ordre d'origine. Les fichiers sont écrits de manière
+    atomique et le manifeste en dernier ; les fichiers d'un export précédent qui ne
+    figurent plus au manifeste sont supprimés.
+
+    Args:
+        data (pandas.DataFrame): Données fusionnées
+        output_dir (str): Dossier de l'export (créé si nécessaire)
+        stem (str): Préfixe des noms de fichiers
+        column (str, optional): Colonne de partition
+        max_workers (int, optional): Nombre de processus (par défaut, le nombre de cœurs)
+        block_rows (int, optional): Nombre de lignes mises en forme à la fois
+
+    Returns:
+        ShardedExport: Les fichiers produits et le manifeste
+
+    Raises:
+        ValueError: Si la colonne de partition est absente des données
+    """
+    if column not in data.columns:
+        raise ValueError(f"Colonne '{column}' absente des données : export par département impossible.")
+    os.makedirs(output_dir, exist_ok=True)
+    manifest_path = os.path.join(output_dir, f"{stem}_{SHARD_MANIFEST_NAME}")
+
+    # Libellé de chaque valeur distincte (plusieurs valeurs peuvent donner le même, ex: '1' et '01')
+    codes, uniques = pd.factorize(data[column], use_na_sentinel=False)
+    value_labels = [department_label(value) for value in uniques]
+    labels = sorted(set(value_labels))
+    label_codes = np.array([labels.index(label) for label in value_labels], dtype=np.int64)[codes]
+    order = np.argsort(label_codes, kind='stable')
+    shard_rows = np.bincount(label_codes, minlength=len(labels)).tolist()
+    ordered = data.iloc[order]
+
+    shards = [{'departement': label, 'file': f"{stem}_{label}.csv", 'rows': int(rows)}
+              for label, rows in zip(labels, shard_rows)]
+    paths = [os.path.join(output_dir, shard['file']) for shard in shards]
+
+    workers = max_workers or os.cpu_count() or 1
+    parallel = len(data) >= PARALLEL_EXPORT_MIN_ROWS and workers > 1
+    # Processus démarrés à neuf (spawn) : appelé depuis l'interface Qt, pas de copie de son état
+    executor = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn')) \
+        if parallel else None
+    try:
+        sizes = _write_formatted_shards(ordered, shard_rows, paths, block_rows, executor)
+    except _EmbeddedLineBreak:
+        # Valeurs multilignes : chaque fichier est mis en forme séparément
+        bounds = np.concatenate([[0], np.cumsum(shard_rows)])
+        sizes = [write_csv_blocks(ordered.iloc[bounds[i]:bounds[i + 1]], path, block_rows)
+                 for i, path in enumerate(paths)]
+    finally:
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
+    for shard, size in zip(shards, sizes):
+        shard['bytes'] = size
+
+    manifest = {
+        'generated_at': datetime.datetime.now().isoformat(timespec='seconds'),
+        'column': column,
+        'rows': int(len(data)),
+        'columns': [str(col) for col in data.columns],
+        'shards': shards
+    }
+    previous = _read_manifest(manifest_path)
+    tmp_path = f"{manifest_path}.{os.getpid()}-{threading.get_ident()}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, manifest_path)
+    if previous is not None:
+        current = {shard['file'] for shard in shards}
+        for shard in previous.get('shards', []):
+            if shard.get('file') not in current:
+                try:
+                    os.remove(os.path.join(output_dir, shard['file']))
+                except OSError:
+                    pass
+    print(f"Export par département: {len(shards)} fichiers écrits dans {output_dir}.")
+    return ShardedExport(output_dir, manifest_path, shards)
+
+
+def _read_manifest(manifest_path):
+    """Lit le manifeste d'un export précédent (None s'il n'existe pas ou est illisible)."""
+    try:
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
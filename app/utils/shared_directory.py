@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import os
+import threading
+import numpy as np
+from utils.arrow_files import ARROW_FILE_EXTENSION, require_pyarrow, write_frame, read_frame
+
+# Dossier des exports (à côté du fichier annuaire)
+SHARED_DIR_NAME = 'partage'
+# Fichiers de l'annuaire partagé : données (Arrow IPC) et index des clés (numpy)
+SHARED_FILE_PREFIX = 'annuaire_'
+SORTED_KEYS_SUFFIX = '_cles.npy'
+KEY_ORDER_SUFFIX = '_ordre.npy'
+# Nombre de versions exportées conservées (annuaire courant et versions datées récentes)
+MAX_SHARED_EXPORTS = 4
+
+
+class SortedKeyIndex:
+    """Index des clés de l'annuaire par recherche dichotomique dans des clés triées.
+
+    Contrairement à `pandas.Index`, aucune table de hachage n'est construite : les
+    clés triées et leur position dans l'annuaire sont lues directement dans des
+    fichiers projetés en mémoire. Expose le sous-ensemble de l'interface de
+    `pandas.Index` utilisé par la jointure (`get_indexer`, `len`).
+    """
+
+    def __init__(self, sorted_keys, order, size):
+        """Initialise l'index.
+
+        Args:
+            sorted_keys (numpy.ndarray): Clés non vides de l'annuaire, triées
+            order (numpy.ndarray): Position dans l'annuaire de chaque clé triée
+            size (int): Nombre de lignes de l'annuaire (les clés vides ne
+                correspondent à aucune clé formatée)
+        """
+        self.sorted_keys = sorted_keys
+        self.order = order
+        self.size = size
+
+    def __len__(self):
+        return self.size
+
+    def get_indexer(self, values):
+        """Retourne la position dans l'annuaire de chaque valeur (-1 si absente).
+
+        Args:
+            values (numpy.ndarray): Clés recherchées
+
+        Returns:
+            numpy.ndarray: Positions des lignes de l'annuaire
+        """
+        values = np.asarray(values, dtype=str)
+        if len(self.sorted_keys) == 0:
+            return np.full(len(values), -1, dtype=np.int64)
+        positions = np.searchsorted(self.sorted_keys, values)
+        positions = np.minimum(positions, len(self.sorted_keys) - 1)
+        found = self.sorted_keys[positions] == values
+        return np.where(found, self.order[positions], -1).astype(np.int64)
+
+
+class SharedDirectory:
+    """Référence légère à un annuaire exporté en fichiers projetables en mémoire.
+
+    L'objet ne contient que des chemins : il est transmis aux processus de travail
+    sans copier l'annuaire. Chaque processus s'y rattache avec `attach`, qui projette
+    les fichiers en mémoire (pages partagées entre tous les processus par le système).
+    """
+
+    def __init__(self, directory_path, data_path, keys_path, order_path, version):
+        self.directory_path = directory_path
+        self.data_path = data_path
+        self.keys_path = keys_path
+        self.order_path = order_path
+        self.version = version
+
+    def attach(self):
+        """Projette l'annuaire en mémoire et retourne un instantané en lecture seule.
+
+        Returns:
+            DirectorySnapshot: L'annuaire et son index des clés
+        """
+        from utils.directory_manager import DirectorySnapshot
+        data = read_frame(self.data_path)
+        key_index = None
+        if self.keys_path is not None:
+            key_index = SortedKeyIndex(np.load(self.keys_path, mmap_mode='r'),
+                                       np.load(self.order_path, mmap_mode='r'), len(data))
+        return DirectorySnapshot(self.directory_path, data, self.version, key_index)
+
+
+def export_shared_directory(snapshot, shared_dir: str) -> SharedDirectory:
+    """Exporte un instantané de l'annuaire en fichiers projetables en mémoire.
+
+    Les fichiers sont nommés d'après la version de l'annuaire et ne sont écrits
+    qu'une fois par version (écriture atomique) ; seuls les exports des versions
+    les plus récentes sont conservés.
+
+    Args:
+        snapshot (DirectorySnapshot): Annuaire à exporter
+        shared_dir (str): Dossier des exports
+
+    Returns:
+        SharedDirectory: Référence à l'annuaire exporté
+    """
+    require_pyarrow()
+    version = snapshot.get_version()
+    stem = os.path.join(shared_dir, SHARED_FILE_PREFIX + version[:16])
+    data_path = stem + ARROW_FILE_EXTENSION
+    keys_path, order_path = stem + SORTED_KEYS_SUFFIX, stem + KEY_ORDER_SUFFIX
+    data = snapshot.get_directory()
+    indexed = snapshot.get_key_index() is not None and 'key' in data.columns
+
+    if not os.path.exists(data_path):
+        os.makedirs(shared_dir, exist_ok=True)
+        suffix = f".{os.getpid()}-{threading.get_ident()}.tmp"
+        if indexed:
+            keys = data['key']
+            present = keys.notna().to_numpy()
+            key_values = keys[present].astype(str).to_numpy(dtype=str)
+            sort_order = np.argsort(key_values, kind='stable')
+            order = np.flatnonzero(present)[sort_order].astype(np.int64)
+            # np.save ajoute l'extension .npy si elle est absente du nom
+            np.save(keys_path + suffix + '.npy', key_values[sort_order])
+            np.save(order_path + suffix + '.npy', order)
+            os.replace(keys_path + suffix + '.npy', keys_path)
+            os.replace(order_path + suffix + '.npy', order_path)
+        # Fichier de données écrit en dernier : sa présence signale un export complet
+        write_frame(data.reset_index(drop=True), data_path + suffix)
+        os.replace(data_path + suffix, data_path)
+        _remove_old_exports(shared_dir)
+
+    return SharedDirectory(snapshot.directory_path, data_path,
+                           keys_path if indexed else None, order_path if indexed else None, version)
+
+
+def _remove_old_exports(shared_dir):
+    """Supprime les exports au-delà des `MAX_SHARED_EXPORTS` versions les plus récentes."""
+    data_files = [os.path.join(shared_dir, name) for name in os.listdir(shared_dir)
+                  if name.startswith(SHARED_FILE_PREFIX) and name.endswith(ARROW_FILE_EXTENSION)]
+    data_files.sort(key=os.path.getmtime, reverse=True)
+    for data_path in data_files[MAX_SHARED_EXPORTS:]:
+        stem = data_path[:-len(ARROW_FILE_EXTENSION)]
+        for path in (data_path, stem + SORTED_KEYS_SUFFIX, stem + KEY_ORDER_SUFFIX):
+            try:
+                os.remove(path)
+            except OSError:
+                pass # Absent, ou encore projeté par un processus (Windows)